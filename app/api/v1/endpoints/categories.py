@@ -1,16 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, status, Request, Response
 from typing import List
 # 💡 УДАЛЕНЫ: joinedload и _get_category_query
-from sqlalchemy.orm import Session
-from sqlalchemy import asc 
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Импортируем Pydantic-схемы
 from app.schemas.category import Category, CategoryCreate 
 from app.dependencies import get_db
+from app.core.http_cache import catalog_etag, cache_headers, is_not_modified, not_modified_response
 
 # Импортируем ORM-модели и CRUD
 from app.models.category import Category as CategoryModel 
 from app.crud import category as crud_category 
+from app.crud.catalog import get_catalog_version
+from app.crud.category_tree import get_category_tree
 
 router = APIRouter(
     prefix="/categories",
@@ -18,48 +20,51 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=List[Category])
-async def read_categories(db: Session = Depends(get_db)):
+async def read_categories(request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     """
     Возвращает список только родительских категорий. 
-    Подкатегории загружаются автоматически благодаря lazy='selectin' в модели.
+    Дерево берется из памяти (CategoryTree), БД читается только после изменений.
+    Если у клиента актуальная версия каталога (ETag), отвечает 304 без запроса категорий.
     """
+    catalog_version, last_modified = await get_catalog_version(db)
+    etag = catalog_etag(catalog_version)
+    headers = cache_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(headers)
     
-    # 💡 ИСПРАВЛЕНИЕ: Простой запрос. Без joinedload.
-    categories_from_db = db.query(CategoryModel).filter(
-        CategoryModel.parent_id.is_(None)
-    ).order_by(
-        asc(CategoryModel.id) 
-    ).all()
+    tree = await get_category_tree(db)
 
-    if not categories_from_db:
+    if not tree.roots:
         raise HTTPException(
-            status_code=status.HTTP_4_NOT_FOUND, 
+            status_code=status.HTTP_404_NOT_FOUND, 
             detail="В базе данных нет доступных категорий."
         )
     
-    # Pydantic (благодаря from_attributes) увидит поле .subcategories 
-    # и выполнит lazy="selectin" для их загрузки.
-    return categories_from_db
+    response.headers.update(headers)
+    return list(tree.roots)
 
 @router.get("/{category_id}", response_model=Category)
-async def read_category(category_id: int, db: Session = Depends(get_db)):
+async def read_category(category_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     """Возвращает категорию по ее ID из БД, включая подкатегории."""
+    catalog_version, last_modified = await get_catalog_version(db)
+    etag = catalog_etag(catalog_version)
+    headers = cache_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(headers)
     
-    # 💡 ИСПРАВЛЕНИЕ: Простой запрос.
-    category = db.query(CategoryModel).filter(
-        CategoryModel.id == category_id
-    ).first()
+    tree = await get_category_tree(db)
+    category = tree.get(category_id)
     
     if category is None:
         raise HTTPException(status_code=404, detail="Category not found")
         
+    response.headers.update(headers)
     return category
 
 @router.post("/", response_model=Category, status_code=status.HTTP_201_CREATED)
-async def create_category_endpoint(category: CategoryCreate, db: Session = Depends(get_db)):
+async def create_category_endpoint(category: CategoryCreate, db: AsyncSession = Depends(get_db)):
     """Создание новой категории (Для Админа)."""
     
-    db_category = crud_category.create_category(db=db, category=category)
+    db_category = await crud_category.create_category(db=db, category=category)
     
-    # Загружаем созданный объект (lazy="selectin" сработает при возврате)
-    return db.query(CategoryModel).filter(CategoryModel.id == db_category.id).first()
\ No newline at end of file
+    return db_category
\ No newline at end of file
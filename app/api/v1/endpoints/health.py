@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from typing import Any, Dict
+
+from app.db.pool import get_pool_metrics
+from app.db.session import engine
+
+router = APIRouter(
+    prefix="/health",
+    tags=["Health"],
+)
+
+@router.get("/db-pool")
+async def read_db_pool_metrics() -> Dict[str, Any]:
+    """
+    Состояние пула соединений с БД: занятые (checked_out), свободные (idle)
+    и overflow-соединения, а также среднее/максимальное время ожидания соединения.
+    """
+    return get_pool_metrics(engine)
@@ -1,115 +1,132 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional, Any, Dict
+import logging
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Query
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Optional, Any, Dict
+from app.core import fast_json
+from app.core.cache import catalog_cache, CatalogPage
 from app.core.config import settings
+from app.core.http_cache import catalog_etag, cache_headers, is_not_modified, not_modified_response
 
 # 💡 Импортируем схемы
-from app.schemas.item import Item as ItemSchema, ItemCreate, ItemUpdate
-from app.schemas.category import Category as CategorySchema 
+from app.schemas.item import Item as ItemSchema, ItemAdminList, ItemCreate, ItemUpdate, item_payload
 
 # 💡 Импортируем модели
 from app.dependencies import get_db
-from app.models.category import Category as CategoryModel 
+from app.db.session import AsyncSessionLocal
 from app.models.item import Item as ItemModel 
 
 # 🛑 Импортируем ВСЕ функции CRUD
-from app.crud.item import get_items, get_item, create_item, update_item, delete_item
-
-def _format_image_url(relative_url: Any) -> str:
-    """Конвертирует относительный путь в абсолютный, с проверкой STATIC_URL."""
-    if not isinstance(settings.STATIC_URL, str) or not settings.STATIC_URL:
-        return ''
-    base_url = settings.STATIC_URL.rstrip('/') + '/'
-    if isinstance(relative_url, str):
-        
-        # Убираем возможный дубликат /static/ (если он есть в БД)
-        if relative_url.startswith('/static/'):
-            relative_url = relative_url.replace('/static/', '', 1).lstrip('/')
-        
-        # Убираем начальный слеш из относительного пути, чтобы избежать двойного слеша
-        relative_url = relative_url.lstrip('/')
-        
-        # 🛑 ФИНАЛЬНОЕ ИСПРАВЛЕНИЕ: Соединяем базовый URL и относительный путь
-        # Пример: base_url (https://apkintim.duckdns.org/) + relative_url (images/файл.jpg)
-        return f"{base_url}{relative_url}"
-    return ''
-def _get_image_urls(item: Any) -> List[str]:
+from app.crud.item import get_items, get_items_page, get_item, create_item, update_item, delete_item, stream_admin_rows
+from app.crud.category_tree import get_category_tree
+from app.crud.catalog import get_catalog_version
+from app.crud.search import search_items
+
+logger = logging.getLogger(__name__)
+
+# Размер страницы клиентского каталога
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# Сколько строк краткого админ-списка читается и кодируется за раз
+ADMIN_LIST_CHUNK_SIZE = 1000
+
+# Адаптер для кодирования всего списка товаров в JSON за один вызов
+_item_list_adapter = TypeAdapter(List[ItemSchema])
+
+async def _serialize_items(items: List[ItemModel], db: AsyncSession) -> List[ItemSchema]:
     """
-    Безопасно извлекает URL из ORM-объекта, проверяя и plural (image_urls), и singular (image_url).
+    Схемы для списка товаров прямо из ORM (from_attributes). Категория уже
+    загружена JOIN-ом, а подкатегории подставляются из CategoryTree.
+    """
+    context = {'category_tree': await get_category_tree(db)}
+
+    result: List[ItemSchema] = []
+    for item in items:
+        if item.category is None:
+            logger.warning(f"Товар {item.id} ссылается на несуществующую категорию {item.category_id}, пропущен.")
+            continue
+        result.append(ItemSchema.model_validate(item, context=context))
+    return result
+
+async def _encode_items(items: List[ItemModel], db: AsyncSession) -> bytes:
     """
-    
-    # 1. Пытаемся получить желаемый plural name: image_urls
-    raw_urls = getattr(item, 'image_urls', None)
-    
-    # 2. Если plural не найден или пуст, пробуем singular name: image_url
-    if raw_urls is None or (isinstance(raw_urls, list) and len(raw_urls) == 0):
-         raw_urls = getattr(item, 'image_url', None)
-         
-    # 3. Обработка: если найдена одна строка, оборачиваем ее в список
-    if isinstance(raw_urls, str):
-        # Если это одна строка, оборачиваем в список, чтобы соответствовать схеме
-        return [raw_urls]
-            
-    # 4. Если это список, возвращаем его. Если None или другой тип, возвращаем пустой список.
-    if isinstance(raw_urls, list):
-        return raw_urls
-    
-    return []
-
-# --- Вспомогательная функция для обогащения (Админ) ---
-def _add_category_to_item(db_item: ItemModel, db: Session) -> ItemSchema:
-    """Извлекает категорию, собирает полный словарь данных (Для Админа)."""
-    
-    category_data: Optional[CategoryModel] = db.query(CategoryModel).filter(
-        CategoryModel.id == db_item.category_id
-    ).first()
-    
-    category_schema: Optional[CategorySchema] = None
-    if category_data:
-        category_schema = CategorySchema.model_validate(category_data)
-        
-    item_data_dict = db_item.__dict__.copy()
-    item_data_dict.pop('_sa_instance_state', None) 
-    item_data_dict['category'] = category_schema 
-
-    # 🛑 ФИКС: Используем безопасную функцию извлечения URL
-    relative_urls = _get_image_urls(db_item)
-    
-    absolute_urls = []
-    for url in relative_urls:
-        if isinstance(url, str): 
-            absolute_urls.append(_format_image_url(url))
-            
-    item_data_dict['image_urls'] = [url for url in absolute_urls if url]
-
-    return ItemSchema.model_validate(item_data_dict)
-
-
-def _process_item_data(item: Any) -> Dict[str, Any]:
+    JSON списка товаров. При CATALOG_FAST_JSON товары не валидируются Pydantic
+    (ни здесь, ни через response_model): dict из ORM + категория из CategoryTree,
+    затем один вызов orjson. Иначе — прежний путь через схемы.
     """
-    (Клиентская функция)
-    Обрабатывает данные одного товара, форматируя URL изображения.
+    if not settings.CATALOG_FAST_JSON:
+        return _item_list_adapter.dump_json(await _serialize_items(items, db))
+
+    tree = await get_category_tree(db)
+    payloads = []
+    for item in items:
+        category = tree.payload(item.category_id)
+        if category is None:
+            if item.category is None:
+                logger.warning(f"Товар {item.id} ссылается на несуществующую категорию {item.category_id}, пропущен.")
+                continue
+            category = {'id': item.category.id, 'name': item.category.name, 'subcategories': []}
+        payloads.append(item_payload(item, category))
+    return fast_json.dumps(payloads)
+
+def _json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+async def _admin_list_chunks(is_active: Optional[bool]) -> AsyncIterator[bytes]:
     """
-    
-    item_dict = item.__dict__.copy() 
-    item_dict.pop('_sa_instance_state', None)
-    
-    # 🛑 ФИКС: Используем безопасную функцию извлечения URL
-    relative_urls = _get_image_urls(item)
-    
-    absolute_urls = []
-    for url in relative_urls:
-        if isinstance(url, str): 
-            absolute_urls.append(_format_image_url(url))
-
-    item_dict['image_urls'] = [url for url in absolute_urls if url]
-    
-    # 4. Удаляем ключ 'category', если он не был загружен (для Pydantic)
-    if 'category' in item_dict:
-        if item_dict['category'] is None or hasattr(item_dict['category'], '__dict__'):
-            item_dict.pop('category', None)
-            
-    return item_dict
+    JSON-массив ItemAdminList по кусочкам. Своя сессия: генератор работает,
+    пока отдается ответ, то есть уже после выхода из эндпоинта.
+    """
+    yield b'['
+    first = True
+    async with AsyncSessionLocal() as db:
+        async for rows in stream_admin_rows(db, is_active=is_active, chunk_size=ADMIN_LIST_CHUNK_SIZE):
+            chunk = fast_json.dumps([
+                {'id': item_id, 'name': name, 'price': price, 'memory': memory, 'color': color}
+                for item_id, name, price, memory, color in rows
+            ])[1:-1]
+            yield chunk if first else b',' + chunk
+            first = False
+    yield b']'
+
+async def _check_category_exists(category_id: Optional[int], db: AsyncSession) -> None:
+    """400 вместо ошибки внешнего ключа, если категории нет."""
+    if category_id is not None and (await get_category_tree(db)).get(category_id) is None:
+        raise HTTPException(status_code=400, detail=f"Категория с ID {category_id} не найдена.")
+
+async def _serialize_item(item: ItemModel, db: AsyncSession) -> ItemSchema:
+    """Схема одного товара (см. _serialize_items)."""
+    context = {'category_tree': await get_category_tree(db)}
+    return ItemSchema.model_validate(item, context=context)
+
+async def _build_catalog_page(db: AsyncSession, filters: Dict[str, Any]) -> CatalogPage:
+    """
+    Собирает JSON страницы клиентского каталога: товары + их категории (одним запросом).
+    Результат кэшируется в catalog_cache, поэтому вызывается только после изменений.
+    """
+    # Версию читаем ДО данных: если запись проскочит между запросами,
+    # ETag окажется старее содержимого, и клиент просто получит 200 еще раз.
+    catalog_version, last_modified = await get_catalog_version(db)
+
+    # Ветка категории (категория + все подкатегории) берется из дерева в памяти
+    query = dict(filters)
+    category_id = query.pop('category_id')
+    if category_id is not None:
+        tree = await get_category_tree(db)
+        query['category_ids'] = tree.descendant_ids(category_id)
+
+    items = await get_items_page(db, **query)
+
+    # Полная страница — значит, дальше могут быть еще товары
+    next_cursor = items[-1].id if len(items) == filters['limit'] else None
+
+    return CatalogPage(
+        body=await _encode_items(items, db),
+        catalog_version=catalog_version,
+        last_modified=last_modified,
+        next_cursor=next_cursor,
+    )
 
 # --- Настройка роутера ---
 router = APIRouter(
@@ -119,45 +136,102 @@ router = APIRouter(
 
 # --- Роуты для Клиента (Telegram Mini App) ---
 @router.get("/", response_model=List[ItemSchema])
-def read_active_items(db: Session = Depends(get_db)):
-    items = get_items(db) 
-    formatted_items_as_dicts = [_process_item_data(item) for item in items]
-    return [ItemSchema.model_validate(data) for data in formatted_items_as_dicts]
+async def read_active_items(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    cursor: Optional[int] = Query(None, ge=0, description="ID последнего товара предыдущей страницы (X-Next-Cursor)"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    category_id: Optional[int] = Query(None, description="Категория, включая все подкатегории"),
+    is_active: bool = True,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    memory: Optional[str] = None,
+    color: Optional[str] = None,
+):
+    """
+    Каталог для клиента с фильтрацией в SQL и keyset-пагинацией.
+    Если страница не последняя, ID для следующего запроса (?cursor=) в заголовке X-Next-Cursor.
+    """
+    filters = dict(
+        after_id=cursor, limit=limit, category_id=category_id, is_active=is_active,
+        min_price=min_price, max_price=max_price, memory=memory, color=color,
+    )
+    # Отдаем заранее закодированную страницу; БД трогаем только после изменений
+    page = await catalog_cache.get_or_build(
+        tuple(filters.items()), lambda: _build_catalog_page(db, filters)
+    )
+
+    etag = catalog_etag(page.catalog_version)
+    headers = cache_headers(etag, page.last_modified)
+    if page.next_cursor is not None:
+        headers["X-Next-Cursor"] = str(page.next_cursor)
+    if is_not_modified(request, etag, page.last_modified):
+        return not_modified_response(headers)
+    return Response(content=page.body, media_type="application/json", headers=headers)
+
+@router.get("/search", response_model=List[ItemSchema])
+async def search_items_endpoint(
+    q: str = Query(..., min_length=1, max_length=100, description="Поисковый запрос; слова ищутся по префиксу"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
+    """Поиск активных товаров по названию, описанию, памяти и цвету (по релевантности)."""
+    items = await search_items(db, q, limit=limit)
+    return _json_response(await _encode_items(items, db))
+
+# 💡 Объявлен до /{item_id}, иначе "all" разбирается как item_id и роут недоступен (422)
+@router.get("/all", response_model=List[ItemSchema])
+async def read_all_items_admin(db: AsyncSession = Depends(get_db), skip: int = 0, limit: int = 100):
+    """
+    Все товары (включая неактивные) для Админа.
+    Один запрос за страницей товаров; категории берутся из CategoryTree, без запроса на товар.
+    """
+    items = await get_items(db, skip=skip, limit=limit)
+    return _json_response(await _encode_items(items, db))
+
+@router.get("/admin-list", response_model=List[ItemAdminList])
+async def read_admin_list(is_active: Optional[bool] = Query(None, description="Только активные/неактивные; по умолчанию все")):
+    """
+    Краткий список товаров для админ-бота: только id, name, price, memory, color.
+    Колонки выбираются кортежами и отдаются потоком, без ORM-объектов и категорий.
+    """
+    return StreamingResponse(_admin_list_chunks(is_active), media_type="application/json")
 
 @router.get("/{item_id}", response_model=ItemSchema)
-def read_item(item_id: int, db: Session = Depends(get_db)):
-    item = get_item(db, item_id=item_id)
+async def read_item(item_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    catalog_version, last_modified = await get_catalog_version(db)
+    # Сначала товар: удаленный или несуществующий — 404, даже при совпавшем ETag
+    item = await get_item(db, item_id=item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Товар не найден")
-    
-    item_data_dict = _process_item_data(item)
-    return ItemSchema.model_validate(item_data_dict)
 
-# --- Роуты для Админа (сокращены для экономии места) ---
-# ... (остальные роуты без изменений)
-# Вы можете оставить их из предыдущей версии или убедиться, что они присутствуют.
+    etag = catalog_etag(catalog_version)
+    headers = cache_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(headers)
 
+    response.headers.update(headers)
+    return await _serialize_item(item, db)
+
+# --- Роуты для Админа ---
 @router.post("/", response_model=ItemSchema, status_code=status.HTTP_201_CREATED)
-def create_item_endpoint(item: ItemCreate, db: Session = Depends(get_db)):
-    new_item = create_item(db=db, item=item)
-    return _add_category_to_item(new_item, db)
+async def create_item_endpoint(item: ItemCreate, db: AsyncSession = Depends(get_db)):
+    await _check_category_exists(item.category_id, db)
+    new_item = await create_item(db=db, item=item)
+    return await _serialize_item(new_item, db)
 
 @router.put("/{item_id}", response_model=ItemSchema)
-def update_item_endpoint(item_id: int, item: ItemUpdate, db: Session = Depends(get_db)):
-    db_item = get_item(db, item_id=item_id)
+async def update_item_endpoint(item_id: int, item: ItemUpdate, db: AsyncSession = Depends(get_db)):
+    db_item = await get_item(db, item_id=item_id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Товар не найден")
-    updated_item = update_item(db=db, db_item=db_item, item_update=item)
-    return _add_category_to_item(updated_item, db)
+    await _check_category_exists(item.category_id, db)
+    updated_item = await update_item(db=db, db_item=db_item, item_update=item)
+    return await _serialize_item(updated_item, db)
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_item_endpoint(item_id: int, db: Session = Depends(get_db)):
-    success = delete_item(db, item_id=item_id)
+async def delete_item_endpoint(item_id: int, db: AsyncSession = Depends(get_db)):
+    success = await delete_item(db, item_id=item_id)
     if not success:
         raise HTTPException(status_code=404, detail=f"Товар с ID {item_id} не найден.")
     return
-
-@router.get("/all", response_model=List[ItemSchema])
-def read_all_items_admin(db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
-    items = get_items(db, skip=skip, limit=limit)
-    return [_add_category_to_item(item, db) for item in items]
\ No newline at end of file
@@ -1,11 +1,16 @@
-import httpx
+import html
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import ValidationError
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # ИМПОРТИРУЕМ OrderSubmission - это модель, которая приходит с фронтенда!
-from app.schemas.order import OrderSubmission, OrderCreate
-from app.core.config import settings 
+from app.schemas.order import Order, OrderSubmission, OrderSubmitResult
+from app.core.outbox import outbox_dispatcher
+from app.crud.order import create_order, find_orders, get_order
+from app.dependencies import get_db
+from app.api.v1.endpoints.price_list import get_admin_user
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -16,11 +21,12 @@ PAYMENT_METHOD_MAP = {
     "credit_installments": "Кредит/Рассрочка", # Объединяем, чтобы избежать путаницы
 }
 
-# URL для отправки сообщений Telegram API
-TELEGRAM_API_URL = f"https://api.telegram.org/bot{settings.BOT_TOKEN}/sendMessage"
-
 def format_order_message(order_data: OrderSubmission, order_id: int) -> str:
-    """Форматирует сообщение о заказе для отправки администратору, используя OrderSubmission."""
+    """
+    Форматирует сообщение о заказе для отправки администратору, используя OrderSubmission.
+    Разметка — HTML (parse_mode='HTML'): данные клиента экранируются через html.escape,
+    поэтому "_", "*" или "[" в ФИО не ломают сообщение (Telegram вернул бы 400).
+    """
     
     items_list = ""
     # 1. 🔥 Будем считать итоговую сумму вручную, игнорируя товары "Под заказ"
@@ -33,75 +39,90 @@ def format_order_message(order_data: OrderSubmission, order_id: int) -> str:
         if item.color and item.color != '-':
             options.append(item.color)
         
-        options_str = f" ({', '.join(options)})" if options else ""
+        options_str = f" ({html.escape(', '.join(options))})" if options else ""
         
         # 2. 🔥 НОВАЯ ЛОГИКА ОТОБРАЖЕНИЯ ЦЕНЫ
         price_str = ""
         if item.price == -1.0:
             # Если цена -1.0, пишем "Под заказ"
-            price_str = "**(Под заказ)**"
+            price_str = "<b>(Под заказ)</b>"
         elif item.price is not None and item.price > 0:
             # Если цена есть, форматируем ее и добавляем к общей сумме
-            price_str = f"**{item.price:,.0f} ₽**"
+            price_str = f"<b>{item.price:,.0f} ₽</b>"
             total_price_calc += item.price
         else:
             # Если цена 0, None или невалидна
             price_str = "(Цена не указана)"
         
         # 3. 🔥 Используем новую price_str
-        items_list += f"— {item.name}{options_str} {price_str}\n" 
+        items_list += f"— {html.escape(item.name)}{options_str} {price_str}\n" 
         
     delivery_str = "Доставка" if order_data.delivery_method == 'delivery' else "Самовывоз"
-    comment_str = order_data.comment or "Нет"
+    comment_str = html.escape(order_data.comment or "Нет")
     payment_value = order_data.payment_method
-    payment_str = PAYMENT_METHOD_MAP.get(payment_value, payment_value or "Не указано")
-    telegram_str = f"👤 Telegram: @{order_data.telegram_username.lstrip('@')}\n" if order_data.telegram_username else ""
+    payment_str = html.escape(PAYMENT_METHOD_MAP.get(payment_value, payment_value or "Не указано"))
+    telegram_str = f"👤 Telegram: @{html.escape(order_data.telegram_username.lstrip('@'))}\n" if order_data.telegram_username else ""
     
     message = (
-        f"🔔 *НОВЫЙ ЗАКАЗ* (ID: {order_id}) 🔔\n\n"
+        f"🔔 <b>НОВЫЙ ЗАКАЗ</b> (ID: {order_id}) 🔔\n\n"
         f"➖➖➖➖➖➖➖➖➖➖\n"
-        f"👤 Клиент: {order_data.fio}\n" 
-        f"📞 Телефон: `{order_data.phone}`\n" 
-        f"📧 Почта: {order_data.email}\n" 
+        f"👤 Клиент: {html.escape(order_data.fio)}\n" 
+        f"📞 Телефон: <code>{html.escape(order_data.phone)}</code>\n" 
+        f"📧 Почта: {html.escape(order_data.email)}\n" 
         f"{telegram_str}\n"
         f"📦 Получение: {delivery_str}\n"
         f"💳 Оплата: {payment_str}\n"
-        f"🏠 Адрес: {order_data.address}\n\n"
+        f"🏠 Адрес: {html.escape(order_data.address)}\n\n"
         f"📝 Комментарий: {comment_str}\n"
         f"➖➖➖➖➖➖➖➖➖➖\n"
-        f"*🛒 Товары (Итого: {len(order_data.items)} позиций):*\n{items_list}\n"
+        f"<b>🛒 Товары (Итого: {len(order_data.items)} позиций):</b>\n{items_list}\n"
         # 4. 🔥 Используем вручную рассчитанную сумму
-        f"💰 *ОБЩАЯ СУММА (для товаров с ценой):* **{total_price_calc:,.0f} ₽**"
+        f"💰 <b>ОБЩАЯ СУММА (для товаров с ценой):</b> <b>{total_price_calc:,.0f} ₽</b>"
     )
     return message
 
-@router.post("/orders/submit", status_code=status.HTTP_201_CREATED) # ИЗМЕНЯЕМ URL на /orders/submit
-async def submit_order(order: OrderSubmission): # ИЗМЕНЯЕМ ТИП НА OrderSubmission
+@router.post("/orders/submit", response_model=OrderSubmitResult, status_code=status.HTTP_201_CREATED) # ИЗМЕНЯЕМ URL на /orders/submit
+async def submit_order(
+    order: OrderSubmission, # ИЗМЕНЯЕМ ТИП НА OrderSubmission
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key", max_length=64,
+        description="Уникальный ключ попытки оформления: повтор с тем же ключом вернет тот же заказ",
+    ),
+):
     
-    # 1. Генерация временного ID (в реальном проекте здесь сохраняется в БД)
-    # Используем уникальный ID на основе хэша
-    new_order_id = abs(hash(order.phone + order.fio)) % 100000 
-
-    # 2. Форматирование и отправка сообщения администратору
-    try:
-        message_text = format_order_message(order, new_order_id)
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                TELEGRAM_API_URL,
-                json={
-                    "chat_id": settings.ADMIN_ID, 
-                    "text": message_text,
-                    "parse_mode": "Markdown"
-                }
-            )
-            response.raise_for_status()
-            logger.info(f"Уведомление о заказе {new_order_id} отправлено админу.")
-            
-    except httpx.HTTPStatusError as e:
-        logger.error(f"Ошибка отправки уведомления в Telegram: {e.response.text}")
-    except Exception as e:
-        logger.error(f"Неизвестная ошибка при отправке уведомления: {e}")
+    # 1. Сохраняем заказ (ID выдает БД) и уведомление админу в той же транзакции.
+    #    Повтор с тем же ключом — тот же заказ, без второго уведомления.
+    db_order, created = await create_order(
+        db, order, idempotency_key,
+        notification=lambda order_id: format_order_message(order, order_id),
+    )
+    if not created:
+        response.status_code = status.HTTP_200_OK
+    else:
+        # 2. Уведомление отправит диспетчер outbox в фоне — ответ не ждет Telegram
+        outbox_dispatcher.wake()
 
     # 3. Возвращаем ответ фронтенду
-    return {"message": "Заказ успешно оформлен", "order_id": new_order_id}
\ No newline at end of file
+    return {"message": "Заказ успешно оформлен", "order_id": db_order.id}
+
+
+@router.get("/orders", response_model=List[Order], dependencies=[Depends(get_admin_user)])
+async def list_orders(
+    phone: Optional[str] = Query(None, description="Телефон в любом формате"),
+    created_from: Optional[datetime] = Query(None, description="Начало периода (включительно)"),
+    created_to: Optional[datetime] = Query(None, description="Конец периода (не включительно)"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+):
+    """Поиск заказов по телефону и/или дате (для админа), новые первыми."""
+    return await find_orders(db, phone=phone, created_from=created_from, created_to=created_to, limit=limit)
+
+
+@router.get("/orders/{order_id}", response_model=Order, dependencies=[Depends(get_admin_user)])
+async def read_order(order_id: int, db: AsyncSession = Depends(get_db)):
+    db_order = await get_order(db, order_id)
+    if db_order is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Заказ не найден")
+    return db_order
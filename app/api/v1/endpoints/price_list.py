@@ -1,17 +1,35 @@
-import io
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.utils import get_column_letter
+import os
+import shutil
+import tempfile
+from functools import partial
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Security
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Security, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import APIKeyHeader
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import AsyncIterator, BinaryIO, List, Dict, Any, Optional
 
 from app.dependencies import get_db
-from app.models.item import Item as ItemModel
+from app.db.session import AsyncSessionLocal
 from app.core.config import settings
+from app.core.cache import catalog_cache
+from app.core.jobs import Job, job_queue
+from app.core.price_list_io import (
+    FILE_CHUNK_SIZE,
+    CsvPriceListWriter,
+    ParquetPriceListWriter,
+    PriceListFormat,
+    UnsupportedPriceListFormat,
+    XlsxPriceListWriter,
+    iter_file_chunks,
+)
+from app.crud.catalog import bump_catalog_version
+from app.crud.price_history import get_batch_started_at, get_price_history, restore_price_snapshot
+from app.crud.price_list import import_price_list, stream_price_list_rows
+from app.models.item import Item as ItemModel
+from app.schemas.price_history import PriceHistoryEntry, PriceSnapshotRestoreResult
 
 router = APIRouter(
     prefix="/price-list",
@@ -22,7 +40,7 @@ router = APIRouter(
 API_KEY_NAME = "X-Admin-Token"
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
 
-async def get_admin_user(api_key: str = Security(api_key_header), db: Session = Depends(get_db)):
+async def get_admin_user(api_key: str = Security(api_key_header), db: AsyncSession = Depends(get_db)):
     """Проверяет, совпадает ли токен из заголовка с токеном в .env"""
     if api_key == settings.ADMIN_API_TOKEN and settings.ADMIN_API_TOKEN != "your_super_secret_api_token_12345":
         return True
@@ -42,126 +60,168 @@ async def get_admin_user(api_key: str = Security(api_key_header), db: Session =
 # --------------------
 
 
-@router.get("/download", dependencies=[Depends(get_admin_user)])
-async def download_price_list(db: Session = Depends(get_db)):
+async def _csv_chunks() -> AsyncIterator[bytes]:
     """
-    Генерирует и отдает Excel-файл со всеми вариантами товаров.
+    CSV целиком потоком: пачка строк из БД -> байты -> клиенту.
+    Своя сессия, т.к. генератор работает уже после выхода из эндпоинта.
     """
-    
-    # ... (логика получения данных и создания файла)
-    items = db.query(ItemModel).order_by(ItemModel.name, ItemModel.id).all()
-    # ... (создание wb, ws, заголовки, стили - БЕЗ ИЗМЕНЕНИЙ)
+    writer = CsvPriceListWriter()
+    yield writer.header()
+    async with AsyncSessionLocal() as db:
+        async for rows in stream_price_list_rows(db, chunk_size=settings.PRICE_LIST_CHUNK_SIZE):
+            yield writer.encode_rows(rows)
 
-    buffer = io.BytesIO()
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Прайс-лист"
 
-    headers = ['ID (Не менять!)', 'Название', 'Память', 'Цвет', 'Цена (Редактировать)']
-    ws.append(headers)
-    
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    column_widths = {'A': 15, 'B': 40, 'C': 15, 'D': 15, 'E': 20}
-
-    for col_letter, width in column_widths.items():
-        ws.column_dimensions[col_letter].width = width
-
-    for cell in ws[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-
-    # Заполняем данными
-    for item in items:
-        # Убедимся, что цена является числом для Excel
-        try:
-             item_price = float(item.price)
-        except (TypeError, ValueError):
-             item_price = 0.0
-             
-        row = [
-            item.id,
-            item.name,
-            item.memory or '—',
-            item.color or '—',
-            item_price
-        ]
-        ws.append(row)
-
-
-    wb.save(buffer)
-    buffer.seek(0)
-    
+@router.get("/download", dependencies=[Depends(get_admin_user)])
+async def download_price_list(
+    format: PriceListFormat = Query(PriceListFormat.xlsx, description="xlsx (по умолчанию), csv или parquet"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Генерирует и отдает прайс-лист со всеми вариантами товаров (Excel, CSV или Parquet).
+
+    Строки читаются из БД пачками (курсор). CSV кодируется и отдается сразу;
+    XLSX/Parquet пишутся во временный файл в пуле потоков и затем отдаются
+    кусками — память не зависит от количества товаров, event loop не блокируется.
+    """
+    if format is PriceListFormat.csv:
+        # Количество заранее неизвестно, поэтому в имени файла его нет
+        return StreamingResponse(
+            _csv_chunks(),
+            media_type=CsvPriceListWriter.media_type,
+            headers={"Content-Disposition": "attachment; filename=price_list_exported.csv"}
+        )
+
+    spool = tempfile.TemporaryFile()
+    try:
+        if format is PriceListFormat.parquet:
+            writer = ParquetPriceListWriter(spool)
+        else:
+            writer = XlsxPriceListWriter(spool)
+        async for rows in stream_price_list_rows(db, chunk_size=settings.PRICE_LIST_CHUNK_SIZE):
+            await run_in_threadpool(writer.write_rows, rows)
+        await run_in_threadpool(writer.close)
+    except UnsupportedPriceListFormat as e:
+        spool.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        spool.close()
+        raise
+
+    # Количество считается при записи, отдельный count() не нужен
     return StreamingResponse(
-        buffer,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        iter_file_chunks(spool),
+        media_type=writer.media_type,
         headers={
-            "Content-Disposition": f"attachment; filename=price_list_exported_{db.query(ItemModel).count()}_items.xlsx"
+            "Content-Disposition": f"attachment; filename=price_list_exported_{writer.count}_items.{writer.extension}"
         }
     )
 
 
-@router.post("/upload", dependencies=[Depends(get_admin_user)])
-async def upload_price_list(file: UploadFile = File(...), db: Session = Depends(get_db)):
+def _save_upload(source: BinaryIO, suffix: str) -> str:
+    """Копирует загруженный файл во временный (UploadFile закрывается вместе с запросом)."""
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as target:
+        shutil.copyfileobj(source, target, FILE_CHUNK_SIZE)
+        return target.name
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+async def _run_price_import(path: str, price_format: PriceListFormat, job: Job, report) -> Dict[str, Any]:
+    """Обработчик задачи импорта: своя сессия БД на время задачи, не на время запроса."""
+    async with AsyncSessionLocal() as db:
+        with open(path, 'rb') as file:
+            return await import_price_list(
+                db, file, price_format,
+                chunk_size=settings.PRICE_LIST_CHUNK_SIZE,
+                on_progress=report,
+            )
+
+
+@router.post("/upload", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(get_admin_user)])
+async def upload_price_list(
+    file: UploadFile = File(...),
+    format: Optional[PriceListFormat] = Query(None, description="xlsx, csv или parquet; по умолчанию — по расширению файла"),
+):
     """
-    Принимает Excel-файл, парсит его и МАССОВО обновляет цены в БД.
+    Принимает прайс-лист (Excel, CSV или Parquet) и ставит импорт в очередь.
+
+    Ответ приходит сразу: {"job_id": ..., "status": "queued"}. Ход и итог
+    (счетчики строк, ошибки) — в GET /price-list/jobs/{job_id}.
+    Сам импорт (см. import_price_list) пишет только измененные цены.
     """
     
-    if not file.filename.lower().endswith('.xlsx'):
-        raise HTTPException(status_code=400, detail="Неверный формат. Нужен .xlsx файл.")
+    price_format = format or PriceListFormat.from_filename(file.filename)
+    if price_format is None:
+        raise HTTPException(status_code=400, detail="Неверный формат. Нужен .xlsx, .csv или .parquet файл.")
 
+    path = await run_in_threadpool(_save_upload, file.file, f".{price_format.value}")
     try:
-        wb = openpyxl.load_workbook(io.BytesIO(await file.read()))
-        ws = wb.active
-
-        updates = []
-        errors = []
-        
-        # 2. Парсим строки
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            if not row or row[0] is None:
-                continue 
-
-            try:
-                item_id = int(row[0])
-                new_price_raw = row[4] 
-
-                # 💡 Улучшенная обработка цены из колонки 'E' (индекс 4)
-                if isinstance(new_price_raw, (int, float)):
-                    new_price = float(new_price_raw)
-                elif isinstance(new_price_raw, str):
-                    new_price = float(new_price_raw.replace(',', '.'))
-                else:
-                    raise ValueError("Цена не является числом или строкой.")
-                
-                if item_id <= 0:
-                    raise ValueError("ID должен быть положительным числом.")
-                # 💡 ИСПРАВЛЕНО: Цена не может быть отрицательной, но может быть 0
-                if new_price < 0:
-                    raise ValueError("Цена не может быть отрицательной.") 
-                    
-                updates.append({'id': item_id, 'price': new_price})
-                
-            except Exception as e:
-                item_id_for_log = row[0] if row and row[0] is not None else '?' 
-                errors.append(f"Строка с ID {item_id_for_log}: неверный формат. Ошибка: {str(e)[:50]}...")
-
-        if not updates:
-            raise HTTPException(status_code=400, detail="Файл не содержит валидных данных для обновления цен.")
-
-        # 3. МАССОВОЕ ОБНОВЛЕНИЕ
-        db.bulk_update_mappings(ItemModel, updates)
-        db.commit()
-
-        return {
-            "status": "success",
-            "updated": len(updates),
-            "skipped": len(errors),
-            "errors": errors if errors else None
-        }
-        
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Критическая ошибка обработки файла: {str(e)}")
\ No newline at end of file
+        job = await job_queue.submit(
+            "price_list_import",
+            partial(_run_price_import, path, price_format),
+            on_discard=partial(_remove_file, path),
+        )
+    except BaseException:
+        # Задача не попала в очередь — файл никто не удалит
+        _remove_file(path)
+        raise
+    return {"job_id": job.id, "status": job.status}
+
+
+@router.get("/jobs/{job_id}", dependencies=[Depends(get_admin_user)])
+async def get_price_list_job(job_id: str):
+    """
+    Статус задачи импорта: queued / running / done / failed.
+    progress — счетчики обработанных строк, result — итог (как раньше отдавал /upload), error — причина сбоя.
+    """
+    job = await job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена.")
+    return job.to_dict()
+
+
+@router.get("/history/{item_id}", response_model=List[PriceHistoryEntry], dependencies=[Depends(get_admin_user)])
+async def read_price_history(
+    item_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+):
+    """История цены товара, новые изменения первыми."""
+    if await db.get(ItemModel, item_id) is None:
+        raise HTTPException(status_code=404, detail="Товар не найден")
+    return await get_price_history(db, item_id, limit=limit)
+
+
+@router.post("/snapshots/restore", response_model=PriceSnapshotRestoreResult, dependencies=[Depends(get_admin_user)])
+async def restore_prices(
+    at: Optional[datetime] = Query(None, description="Вернуть цены на этот момент (без часового пояса — UTC)"),
+    before_batch_id: Optional[str] = Query(None, description="Вернуть цены, какими они были до операции (batch_id загрузки)"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Восстанавливает цены всего каталога из истории — на момент at или до
+    операции before_batch_id (например, неудачной загрузки прайс-листа).
+    Откат сам записывается в историю и тоже может быть отменен.
+    """
+    if (at is None) == (before_batch_id is None):
+        raise HTTPException(status_code=400, detail="Укажите ровно один параметр: at или before_batch_id.")
+
+    inclusive = True
+    if before_batch_id is not None:
+        at = await get_batch_started_at(db, before_batch_id)
+        if at is None:
+            raise HTTPException(status_code=404, detail="Операция с таким batch_id не найдена.")
+        inclusive = False
+
+    result = await restore_price_snapshot(db, at, inclusive=inclusive)
+    if result["restored"]:
+        await bump_catalog_version(db)
+    await db.commit()
+    catalog_cache.invalidate()
+    return result
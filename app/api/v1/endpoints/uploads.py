@@ -1,74 +1,154 @@
-import os
-import uuid
-from typing import List
-import aiofiles 
-from fastapi import APIRouter, File, UploadFile, HTTPException, status, Request
+import asyncio
+import logging
+from typing import Any, Dict, List
+from fastapi import APIRouter, Depends, HTTPException, status, Request
 from urllib.parse import urlunparse # 💡 НОВЫЙ ИМПОРТ
 
+from app.api.v1.endpoints.price_list import get_admin_user
+from app.core.config import settings
+from app.core.image_uploads import (
+    StoredImage, UploadRejected, adopt_direct_upload, direct_upload_key, receive_images,
+)
+from app.core.images import build_srcset, load_manifest, process_and_store, variant_payloads
+from app.core.storage import DirectUploadUnsupported, content_type_for, storage
+from app.schemas.item import ItemImage
+from app.schemas.upload import DirectUpload, DirectUploadComplete, DirectUploadRequest
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 # --- Конфигурация ---
-UPLOAD_FOLDER = "uploaded_images"
-STATIC_BASE_PATH = "static/images"
-
-os.makedirs(UPLOAD_FOLDER, exist_ok=True) 
+# Тело разбирается потоково (app.core.image_uploads), без File(...) в сигнатуре,
+# поэтому форму для Swagger описываем вручную
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files"],
+                    "properties": {
+                        "files": {
+                            "type": "array",
+                            "items": {"type": "string", "format": "binary"},
+                            "description": "Список файлов изображений для загрузки",
+                        }
+                    },
+                }
+            }
+        },
+    }
+}
 # --------------------
 
 
-@router.post("/upload/images/", response_model=List[str], status_code=status.HTTP_201_CREATED)
-async def upload_images(
-    request: Request,
-    files: List[UploadFile] = File(..., description="Список файлов изображений для загрузки")
-):
+@router.post(
+    "/upload/images/", response_model=List[str], status_code=status.HTTP_201_CREATED, openapi_extra=UPLOAD_OPENAPI
+)
+async def upload_images(request: Request):
     """
     Принимает список файлов, сохраняет их локально асинхронно и возвращает список полных URL-адресов.
+    Файл с тем же содержимым хранится один раз: вернется ссылка на уже загруженный.
+    Уменьшенные копии создаются сразу и подхватываются при создании товара с этими URL.
+    Размер и тип проверяются по ходу приема (см. app.core.image_uploads).
+    """
+    return [image['url'] for image in await _save_images(request)]
+
+
+@router.post(
+    "/upload/images/processed/", response_model=List[ItemImage], status_code=status.HTTP_201_CREATED,
+    openapi_extra=UPLOAD_OPENAPI,
+)
+async def upload_images_processed(request: Request):
+    """
+    То же, что /upload/images/, но с подробностями по каждому файлу:
+    размеры, URL уменьшенных копий (WebP), srcset и заглушка-превью.
+    """
+    return await _save_images(request)
+
+
+@router.post("/upload/images/presign/", response_model=DirectUpload, dependencies=[Depends(get_admin_user)])
+async def presign_image_upload(upload: DirectUploadRequest):
+    """
+    Прямая загрузка (только S3, для админа): выдает presigned POST, по которому бот
+    загружает файл в хранилище сам, не пропуская байты через API.
+    Тип и размер (UPLOAD_MAX_FILE_SIZE) проверяет само хранилище.
+    """
+    try:
+        key = direct_upload_key(upload.filename)
+        post = await storage.presigned_upload(key, content_type_for(key), settings.UPLOAD_MAX_FILE_SIZE)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except DirectUploadUnsupported as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"key": key, **post}
+
+
+@router.post(
+    "/upload/images/complete/", response_model=List[ItemImage], status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(get_admin_user)],
+)
+async def complete_image_upload(request: Request, upload: DirectUploadComplete):
     """
-    uploaded_urls = []
-    
-    if len(files) > 5:
+    Завершение прямой загрузки: файлы проверяются (сигнатура, размер), переносятся
+    под имя по хешу и обрабатываются. Ответ — как у /upload/images/processed/.
+    """
+    if len(upload.keys) > settings.UPLOAD_MAX_FILES:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Максимум 5 файлов за раз."
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Максимум {settings.UPLOAD_MAX_FILES} файлов за раз."
         )
-        
+    base_url = urlunparse((request.url.scheme, request.url.netloc, '', '', '', '')).rstrip('/')
+    results = await asyncio.gather(*(adopt_direct_upload(key) for key in upload.keys), return_exceptions=True)
+    for result in results:
+        if isinstance(result, UploadRejected):
+            raise HTTPException(status_code=result.status_code, detail=result.detail)
+        if isinstance(result, BaseException):
+            raise result
+    return list(await asyncio.gather(*(_describe_image(image, base_url) for image in results)))
+
+
+async def _save_images(request: Request) -> List[Dict[str, Any]]:
     # 💡 ИСПРАВЛЕНИЕ 404: Формируем базовый URL (например, http://localhost:8888)
     # Это гарантирует, что даже если FE и BE на разных портах, ссылка будет работать.
     base_url = urlunparse((request.url.scheme, request.url.netloc, '', '', '', '')).rstrip('/')
-    
-    allowed_extensions = {'.png', '.jpg', '.jpeg', '.webp'}
-    
-    for file in files:
-        filename = file.filename
-        
-        # 1. Проверка расширения
-        _, ext = os.path.splitext(filename)
-        ext = ext.lower()
-        if ext not in allowed_extensions:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Недопустимый тип файла: {filename}. Разрешены: {', '.join(allowed_extensions)}"
-            )
-
-        # 2. Генерируем уникальное имя файла
-        unique_filename = f"{uuid.uuid4().hex}{ext}"
-        file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-
-        # 3. АСИНХРОННО сохраняем файл на диск
+
+    # 1. Потоковый прием: лимиты, сигнатуры, временные файлы и перенос по хешу
+    try:
+        stored = await receive_images(request)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except OSError as e:
+        logger.error(f"Ошибка сохранения загруженных файлов: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
+            detail=f"Не удалось сохранить файлы. Ошибка: {str(e)}"
+        )
+
+    # 2. Уменьшенные копии — для всех файлов одновременно (пул процессов)
+    return list(await asyncio.gather(*(_describe_image(image, base_url) for image in stored)))
+
+
+async def _describe_image(stored: StoredImage, base_url: str) -> Dict[str, Any]:
+    """
+    URL файла и его уменьшенные копии с заглушкой (для повторной загрузки — уже
+    готовые). Если обработка не удалась — только оригинал, загрузка не ломается.
+    """
+    image = {'url': storage.url(stored.relative_path, base_url)}
+    manifest = await load_manifest(stored.relative_path)
+    if manifest is None:
         try:
-            async with aiofiles.open(file_path, "wb") as buffer:
-                while content := await file.read(1024 * 1024):
-                    await buffer.write(content)
-            
-            # 4. Формируем ПОЛНЫЙ публичный URL
-            public_url = f"{base_url}/{STATIC_BASE_PATH}/{unique_filename}"
-            uploaded_urls.append(public_url)
-            
+            manifest = await process_and_store(stored.relative_path)
         except Exception as e:
-            print(f"Ошибка сохранения файла {file.filename}: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
-                detail=f"Не удалось сохранить файл {file.filename}. Ошибка: {str(e)}"
-            )
-            
-    return uploaded_urls
+            logger.warning(f"Не удалось обработать изображение {stored.filename}: {e}")
+            return image
+    variants = variant_payloads(manifest, base_url)
+    image.update(
+        width=manifest['width'],
+        height=manifest['height'],
+        placeholder=manifest['placeholder'],
+        variants=variants,
+        srcset=build_srcset(variants),
+    )
+    return image
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Hashable, Optional
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class CatalogPage:
+    """Готовая к отдаче (уже закодированная в JSON) страница каталога."""
+    body: bytes
+    # Версия каталога в БД (catalog_version), из которой собрана страница
+    catalog_version: int = 0
+    last_modified: Optional[datetime] = None
+    # ID последнего товара страницы, если за ней есть продолжение
+    next_cursor: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    built_at: float
+    page: CatalogPage
+
+
+class CatalogCache:
+    """
+    Версионированный in-memory кэш страниц каталога.
+
+    Ключ — нормализованные параметры запроса (фильтры, курсор, лимит),
+    хранится не больше max_entries последних страниц (LRU).
+    Любая запись в товары/категории вызывает invalidate(): номер версии
+    увеличивается, а все страницы сбрасываются. Страницы пересобираются
+    лениво — при первом чтении после изменения, одним запросом на ключ.
+    CATALOG_CACHE_TTL ограничивает устаревание, когда воркеров uvicorn
+    несколько и инвалидация из другого процесса сюда не доходит.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version = 0
+        self._snapshots: "OrderedDict[Hashable, CatalogSnapshot]" = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        """Помечает все страницы устаревшими (вызывается после каждой записи)."""
+        self.version += 1
+        self._snapshots.clear()
+
+    def _get_fresh(self, key: Hashable) -> Optional[CatalogSnapshot]:
+        snapshot = self._snapshots.get(key)
+        if snapshot is None or snapshot.version != self.version:
+            return None
+        if self.ttl > 0 and time.monotonic() - snapshot.built_at >= self.ttl:
+            return None
+        self._snapshots.move_to_end(key)
+        return snapshot
+
+    async def get_or_build(self, key: Hashable, build: Callable[[], Awaitable[CatalogPage]]) -> CatalogPage:
+        """Возвращает актуальную страницу по ключу, при необходимости собирая ее через build()."""
+        snapshot = self._get_fresh(key)
+        if snapshot is not None:
+            return snapshot.page
+
+        async with self._lock:
+            # Пока ждали блокировку, страницу мог собрать другой запрос
+            snapshot = self._get_fresh(key)
+            if snapshot is not None:
+                return snapshot.page
+
+            # Версию фиксируем ДО сборки: если во время сборки случится запись,
+            # страница сразу окажется устаревшей и будет пересобрана при следующем чтении.
+            version = self.version
+            page = await build()
+            if version == self.version:
+                self._snapshots[key] = CatalogSnapshot(version=version, built_at=time.monotonic(), page=page)
+                if len(self._snapshots) > self.max_entries:
+                    self._snapshots.popitem(last=False)
+            return page
+
+
+catalog_cache = CatalogCache(
+    ttl=settings.CATALOG_CACHE_TTL,
+    max_entries=settings.CATALOG_CACHE_MAX_ENTRIES,
+)
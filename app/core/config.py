@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -10,6 +12,63 @@ class Settings(BaseSettings):
     API_URL: str 
     ADMIN_ID: int 
     STATIC_URL: str = "https://apkintim.duckdns.org"
+    ADMIN_API_TOKEN: str = "your_super_secret_api_token_12345"
+
+    # Пул соединений с БД
+    DB_POOL_SIZE: int = 10          # постоянные соединения
+    DB_MAX_OVERFLOW: int = 20       # временные соединения сверх DB_POOL_SIZE
+    DB_POOL_TIMEOUT: float = 10.0   # сколько ждать свободного соединения (сек)
+    DB_POOL_RECYCLE: int = 1800     # пересоздавать соединения старше N секунд (-1 — никогда)
+    DB_POOL_PRE_PING: bool = True   # проверять соединение перед выдачей из пула
+
+    # Кэш каталога: максимальный возраст страницы (сек), 0 — только явная инвалидация
+    CATALOG_CACHE_TTL: float = 30.0
+    CATALOG_CACHE_MAX_ENTRIES: int = 128  # сколько разных страниц/фильтров держать в памяти
+    # Списки товаров кодируются напрямую в JSON (orjson), без повторной валидации Pydantic
+    CATALOG_FAST_JSON: bool = True
+
+    # Прайс-лист: сколько строк читается из БД / пишется в файл за одну пачку
+    PRICE_LIST_CHUNK_SIZE: int = 1000
+
+    # Фоновые задачи (импорт прайс-листа): "memory" или "sqlite" (общий для всех воркеров uvicorn)
+    JOBS_STORE: str = "memory"
+    JOBS_SQLITE_PATH: str = "jobs.db"
+    JOBS_WORKERS: int = 2           # сколько задач выполняется одновременно
+    JOBS_TTL: float = 86400.0       # сколько секунд хранить статус завершенной задачи
+
+    # Обработка загруженных изображений (пул процессов)
+    IMAGE_VARIANT_WIDTHS: List[int] = [320, 640, 1280]   # ширины уменьшенных копий (srcset)
+    IMAGE_VARIANT_FORMATS: List[str] = ["webp"]          # можно добавить "avif", если Pillow собран с ним
+    IMAGE_QUALITY: int = 80
+    IMAGE_WORKERS: int = 2
+
+    # Ограничения загрузки изображений (проверяются по ходу приема, до записи всего файла)
+    UPLOAD_MAX_FILES: int = 5
+    UPLOAD_MAX_FILE_SIZE: int = 10 * 1024 * 1024    # байт на файл
+    UPLOAD_MAX_TOTAL_SIZE: int = 25 * 1024 * 1024   # байт на запрос
+
+    # Хранилище изображений: "local" (папка uploaded_images) или "s3" (см. app.core.storage)
+    STORAGE_BACKEND: str = "local"
+    S3_BUCKET: str = ""
+    S3_ENDPOINT_URL: Optional[str] = None        # для MinIO/moto: http://localhost:9000
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    S3_PUBLIC_URL: Optional[str] = None          # адрес раздачи (CDN); по умолчанию endpoint/bucket
+    S3_MULTIPART_CHUNK_SIZE: int = 8 * 1024 * 1024
+    S3_PRESIGN_EXPIRES: int = 900                # секунд на прямую загрузку
+
+    # Уведомления через outbox (см. app.core.outbox)
+    OUTBOX_POLL_INTERVAL: float = 5.0    # как часто проверять повторы и чужие записи
+    OUTBOX_BATCH_SIZE: int = 20
+    OUTBOX_LEASE: float = 60.0           # сколько секунд сообщение закреплено за воркером
+    OUTBOX_MAX_ATTEMPTS: int = 12
+    OUTBOX_RETRY_BASE: float = 2.0       # первая задержка повтора, далее x2
+    OUTBOX_RETRY_MAX: float = 900.0
+    TELEGRAM_API_BASE: str = "https://api.telegram.org"
+    TELEGRAM_CHAT_INTERVAL: float = 1.0  # Telegram: ~1 сообщение в секунду в один чат
+    TELEGRAM_GLOBAL_RATE: float = 25.0   # и до 30 в секунду всего
+
     class Config:
         env_file = ".env"
         env_file_encoding = 'utf-8'
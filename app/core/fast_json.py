@@ -0,0 +1,21 @@
+"""
+Быстрое кодирование JSON для горячих списков (каталог, поиск, админ-список).
+
+Данные из БД уже проверены схемой при записи, поэтому здесь они не проходят
+через Pydantic второй раз: строки/ORM-объекты превращаются в простые dict и
+кодируются orjson одним вызовом. Если orjson не установлен — стандартный json.
+"""
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson есть в requirements.txt
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """Компактный UTF-8 JSON (тот же вид, что у Pydantic dump_json)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
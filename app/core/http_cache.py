@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response, status
+
+
+# Для файлов, имя которых зависит от содержимого (хеш): под этим URL
+# никогда не окажется другой файл, перепроверять его не нужно.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def catalog_etag(catalog_version: int) -> str:
+    """Строгий ETag для версии каталога."""
+    return f'"catalog-{catalog_version}"'
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    """
+    Заголовки условного кэширования. no-cache: клиент хранит ответ,
+    но каждый раз перепроверяет его (и обычно получает дешевый 304).
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Проверяет If-None-Match (приоритетно) и If-Modified-Since из запроса."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        return "*" in candidates or etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # Last-Modified передается с точностью до секунды
+        return last_modified.replace(microsecond=0) <= since
+
+    return False
+
+
+def not_modified_response(headers: Dict[str, str]) -> Response:
+    """Пустой ответ 304 с теми же заголовками валидации."""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
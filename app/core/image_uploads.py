@@ -0,0 +1,327 @@
+"""
+Потоковый прием изображений из multipart/form-data.
+
+Стандартный UploadFile сначала целиком сохраняет тело запроса, и только
+потом эндпоинт может что-то проверить. Здесь тело разбирается по мере
+поступления (python-multipart), поэтому плохая загрузка отклоняется сразу:
+- Content-Length больше UPLOAD_MAX_TOTAL_SIZE — до чтения тела;
+- лишний файл или недопустимое расширение — по заголовкам части;
+- не PNG/JPEG/WebP по сигнатуре (magic bytes) — по первым байтам;
+- превышение UPLOAD_MAX_FILE_SIZE / UPLOAD_MAX_TOTAL_SIZE — на том куске,
+  где лимит превышен.
+
+Каждый файл пишет своя задача через ограниченную очередь: прием из сети и
+запись на диск идут параллельно, а завершение файлов (хеш, перенос на место)
+выполняется одновременно. Файл пишется во временный (TMP_FOLDER) и
+переносится в хранилище под имя по хешу содержимого (локально — атомарным
+os.replace); при любой ошибке недописанные временные файлы удаляются.
+
+Прямая загрузка в S3 (presigned POST, см. app.core.storage) проверяется
+после загрузки клиентом: adopt_direct_upload.
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import aiofiles
+from fastapi import Request, status
+from fastapi.concurrency import run_in_threadpool
+from python_multipart.multipart import MultipartParser, parse_options_header
+from python_multipart.exceptions import MultipartParseError
+
+from app.core.config import settings
+from app.core.images import content_path
+from app.core.storage import INCOMING_PREFIX, TMP_FOLDER, content_type_for, storage
+
+ALLOWED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+# Запас на служебную разметку multipart сверх суммарного размера файлов
+_MULTIPART_OVERHEAD = 64 * 1024
+# Сколько кусков может ждать записи на диск, пока прием из сети не притормозит
+_QUEUE_SIZE = 8
+# Столько байт достаточно, чтобы опознать любой из форматов ниже
+_SNIFF_SIZE = 12
+
+
+class UploadRejected(Exception):
+    """Загрузка отклонена; status_code и detail передаются в HTTPException."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class StoredImage:
+    filename: str
+    # Путь относительно UPLOAD_FOLDER (ab/cd/<sha256>.<ext>)
+    relative_path: str
+
+
+def _format_size(size: int) -> str:
+    return f"{size / (1024 * 1024):.3g} МБ" if size >= 1024 * 1024 else f"{size / 1024:.3g} КБ"
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Расширение по сигнатуре файла или None, если это не PNG/JPEG/WebP."""
+    if head.startswith(b'\xff\xd8\xff'):
+        return '.jpg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return '.png'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return '.webp'
+    return None
+
+
+class _FileSink:
+    """Прием одного файла: проверки по ходу, запись в отдельной задаче через очередь."""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.temp_path = os.path.join(TMP_FOLDER, f"{uuid.uuid4().hex}.part")
+        self.size = 0
+        self.ext: Optional[str] = None
+        self._head = b''
+        self._digest = hashlib.sha256()
+        self._queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(maxsize=_QUEUE_SIZE)
+        self._task = asyncio.create_task(self._write())
+
+    async def _write(self) -> str:
+        async with aiofiles.open(self.temp_path, 'wb') as file:
+            while (chunk := await self._queue.get()) is not None:
+                await file.write(chunk)
+        relative_path = content_path(self._digest.hexdigest(), self.ext)
+        if await storage.exists(relative_path):
+            # Такое содержимое уже загружено — храним один раз
+            os.remove(self.temp_path)
+        else:
+            await storage.put_file(relative_path, self.temp_path)
+        return relative_path
+
+    def _sniff(self, data: bytes, final: bool) -> None:
+        self._head += data[:_SNIFF_SIZE - len(self._head)]
+        if len(self._head) < _SNIFF_SIZE and not final:
+            return
+        self.ext = sniff_image_type(self._head)
+        if self.ext is None:
+            raise UploadRejected(
+                status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                f"Файл {self.filename} не является изображением PNG, JPEG или WebP."
+            )
+
+    async def feed(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > settings.UPLOAD_MAX_FILE_SIZE:
+            raise UploadRejected(
+                status.HTTP_413_CONTENT_TOO_LARGE,
+                f"Файл {self.filename} больше {_format_size(settings.UPLOAD_MAX_FILE_SIZE)}."
+            )
+        if self.ext is None:
+            self._sniff(data, final=False)
+        self._digest.update(data)
+        await self._put(data)
+
+    async def close(self) -> None:
+        """Конец части: файл дописывается и переносится на место в фоне (см. result)."""
+        if self.ext is None:
+            self._sniff(b'', final=True)
+        await self._put(None)
+
+    async def _put(self, item: Optional[bytes]) -> None:
+        """
+        Кладет кусок в очередь записи. Если запись упала (например, закончилось
+        место), очередь больше никто не читает: ждем место в очереди и задачу
+        записи вместе и поднимаем её ошибку, а не висим на полной очереди.
+        """
+        if self._task.done():
+            await self._task
+        if not self._queue.full():
+            self._queue.put_nowait(item)
+            return
+        put = asyncio.ensure_future(self._queue.put(item))
+        try:
+            done, _ = await asyncio.wait((put, self._task), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if not put.done():
+                put.cancel()
+        if put in done:
+            return
+        await self._task
+        raise RuntimeError(f"Запись файла {self.filename} завершилась до конца данных.")
+
+    async def result(self) -> StoredImage:
+        return StoredImage(self.filename, await self._task)
+
+    async def discard(self) -> None:
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+def _multipart_boundary(request: Request) -> bytes:
+    content_type, params = parse_options_header(request.headers.get('content-type', ''))
+    boundary = params.get(b'boundary')
+    if content_type != b'multipart/form-data' or not boundary:
+        raise UploadRejected(status.HTTP_400_BAD_REQUEST, "Ожидается multipart/form-data с файлами.")
+    return boundary
+
+
+def _check_content_length(request: Request) -> None:
+    content_length = request.headers.get('content-length')
+    if content_length and content_length.isdigit() and \
+            int(content_length) > settings.UPLOAD_MAX_TOTAL_SIZE + _MULTIPART_OVERHEAD:
+        raise UploadRejected(
+            status.HTTP_413_CONTENT_TOO_LARGE,
+            f"Суммарный размер файлов больше {_format_size(settings.UPLOAD_MAX_TOTAL_SIZE)}."
+        )
+
+
+async def receive_images(request: Request) -> List[StoredImage]:
+    """
+    Принимает файлы изображений из тела запроса (любое имя поля, части без
+    filename игнорируются) и возвращает их в порядке следования.
+    Бросает UploadRejected; временные файлы при этом удаляются.
+    """
+    _check_content_length(request)
+    boundary = _multipart_boundary(request)
+
+    # Колбэки парсера синхронные: собираем события и обрабатываем их после каждого куска
+    events: List[Tuple[str, bytes]] = []
+    callbacks = {
+        'on_part_begin': lambda: events.append(('part_begin', b'')),
+        'on_header_field': lambda data, start, end: events.append(('header_field', data[start:end])),
+        'on_header_value': lambda data, start, end: events.append(('header_value', data[start:end])),
+        'on_header_end': lambda: events.append(('header_end', b'')),
+        'on_headers_finished': lambda: events.append(('headers_finished', b'')),
+        'on_part_data': lambda data, start, end: events.append(('part_data', data[start:end])),
+        'on_part_end': lambda: events.append(('part_end', b'')),
+    }
+    parser = MultipartParser(boundary, callbacks)
+
+    sinks: List[_FileSink] = []
+    current: Optional[_FileSink] = None
+    headers: dict = {}
+    field, value = b'', b''
+    total_size = 0
+
+    async def handle(kind: str, data: bytes) -> None:
+        nonlocal current, headers, field, value, total_size
+        if kind == 'part_begin':
+            headers, field, value = {}, b'', b''
+        elif kind == 'header_field':
+            field += data
+        elif kind == 'header_value':
+            value += data
+        elif kind == 'header_end':
+            headers[field.lower()] = value
+            field, value = b'', b''
+        elif kind == 'headers_finished':
+            _, options = parse_options_header(headers.get(b'content-disposition', b''))
+            filename = options.get(b'filename')
+            if filename is None:
+                return
+            filename = filename.decode('utf-8', 'replace')
+            if len(sinks) >= settings.UPLOAD_MAX_FILES:
+                raise UploadRejected(
+                    status.HTTP_400_BAD_REQUEST, f"Максимум {settings.UPLOAD_MAX_FILES} файлов за раз."
+                )
+            if os.path.splitext(filename)[1].lower() not in ALLOWED_EXTENSIONS:
+                raise UploadRejected(
+                    status.HTTP_400_BAD_REQUEST,
+                    f"Недопустимый тип файла: {filename}. Разрешены: {', '.join(ALLOWED_EXTENSIONS)}"
+                )
+            current = _FileSink(filename)
+            sinks.append(current)
+        elif kind == 'part_data' and current is not None:
+            total_size += len(data)
+            if total_size > settings.UPLOAD_MAX_TOTAL_SIZE:
+                raise UploadRejected(
+                    status.HTTP_413_CONTENT_TOO_LARGE,
+                    f"Суммарный размер файлов больше {_format_size(settings.UPLOAD_MAX_TOTAL_SIZE)}."
+                )
+            await current.feed(data)
+        elif kind == 'part_end' and current is not None:
+            await current.close()
+            current = None
+
+    try:
+        async for chunk in request.stream():
+            try:
+                parser.write(chunk)
+            except MultipartParseError as e:
+                raise UploadRejected(status.HTTP_400_BAD_REQUEST, f"Некорректное тело запроса: {e}")
+            for kind, data in events:
+                await handle(kind, data)
+            events.clear()
+        parser.finalize()
+        if current is not None:
+            raise UploadRejected(status.HTTP_400_BAD_REQUEST, "Тело запроса оборвалось на середине файла.")
+        if not sinks:
+            raise UploadRejected(status.HTTP_400_BAD_REQUEST, "В запросе нет файлов.")
+        return list(await asyncio.gather(*(sink.result() for sink in sinks)))
+    except BaseException:
+        await asyncio.gather(*(sink.discard() for sink in sinks), return_exceptions=True)
+        raise
+
+
+def direct_upload_key(filename: str) -> str:
+    """Ключ для прямой загрузки клиентом; расширение проверяется как при обычной загрузке."""
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise UploadRejected(
+            status.HTTP_400_BAD_REQUEST,
+            f"Недопустимый тип файла: {filename}. Разрешены: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+    return f"{INCOMING_PREFIX}{uuid.uuid4().hex}{ext}"
+
+
+def _hash_file(path: str) -> Tuple[str, int, bytes]:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as file:
+        head = file.read(_SNIFF_SIZE)
+        file.seek(0)
+        while chunk := file.read(1024 * 1024):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size, head
+
+
+async def adopt_direct_upload(key: str) -> StoredImage:
+    """
+    Проверяет файл, загруженный клиентом напрямую в хранилище (incoming/...), теми же
+    правилами, что и потоковую загрузку, и переносит его под имя по хешу.
+    Объект incoming/ удаляется в любом случае.
+    """
+    if not key.startswith(INCOMING_PREFIX) or '/' in key[len(INCOMING_PREFIX):]:
+        raise UploadRejected(status.HTTP_400_BAD_REQUEST, f"Недопустимый ключ загрузки: {key}")
+
+    filename = key[len(INCOMING_PREFIX):]
+    try:
+        async with storage.local_copy(key) as path:
+            digest, size, head = await run_in_threadpool(_hash_file, path)
+            if size > settings.UPLOAD_MAX_FILE_SIZE:
+                raise UploadRejected(
+                    status.HTTP_413_CONTENT_TOO_LARGE,
+                    f"Файл {filename} больше {_format_size(settings.UPLOAD_MAX_FILE_SIZE)}."
+                )
+            ext = sniff_image_type(head)
+            if ext is None:
+                raise UploadRejected(
+                    status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                    f"Файл {filename} не является изображением PNG, JPEG или WebP."
+                )
+            relative_path = content_path(digest, ext)
+            if not await storage.exists(relative_path):
+                # Копия на стороне хранилища: байты повторно через API не идут
+                await storage.copy(key, relative_path)
+    except FileNotFoundError:
+        raise UploadRejected(status.HTTP_404_NOT_FOUND, f"Файл {key} не загружен в хранилище.")
+    finally:
+        await storage.delete(key)
+    return StoredImage(filename, relative_path)
@@ -0,0 +1,188 @@
+"""
+Имена и обработка загруженных изображений (сами файлы — в app.core.storage).
+
+Файлы адресуются по содержимому: имя — SHA-256 от байтов, путь разбит на
+подпапки по первым символам хеша (ab/cd/abcd...ef.jpg), чтобы в одной папке
+не копились сотни тысяч файлов. Одно и то же фото, присланное повторно
+(например, для каждого цвета в боте), хранится один раз, а имя файла никогда
+не меняется — его можно кешировать навсегда (immutable).
+
+Обработка: уменьшенные копии (WebP, по настройке и AVIF) нескольких ширин,
+копия в исходном размере (ее /static/images/ отдает вместо оригинала по Accept)
+и крошечная заглушка (data: URI) для мгновенной отрисовки, пока грузится картинка.
+Кодирование — чисто CPU-работа, поэтому выполняется в пуле процессов
+(process_image), а не в event loop и не в пуле потоков (GIL).
+Копии и манифест {stem}.json кладутся в хранилище рядом с оригиналом;
+манифест читается при записи товара (load_manifest), чтобы сохранить
+варианты в item_images.
+"""
+import asyncio
+import base64
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.storage import TMP_FOLDER, UPLOAD_FOLDER, storage
+
+logger = logging.getLogger(__name__)
+
+# Ширина заглушки: ~100-300 байт, растягивается на клиенте с blur
+PLACEHOLDER_WIDTH = 16
+
+# Одинаковые форматы с разными расширениями хранятся под одним именем
+_CANONICAL_EXTENSIONS = {".jpeg": ".jpg"}
+
+_CONTENT_HASH_RE = re.compile(r"[0-9a-f]{64}")
+_CONTENT_NAME_RE = re.compile(r"[0-9a-f]{64}(_\d+w)?\.(jpg|png|webp|avif)")
+
+
+def content_path(digest: str, ext: str) -> str:
+    """Путь файла относительно UPLOAD_FOLDER по хешу содержимого: ab/cd/<digest>.jpg."""
+    ext = _CANONICAL_EXTENSIONS.get(ext.lower(), ext.lower())
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def manifest_key(relative_path: str) -> str:
+    """Манифест лежит рядом с оригиналом: ab/cd/<digest>.jpg -> ab/cd/<digest>.json."""
+    return os.path.splitext(relative_path)[0] + ".json"
+
+
+async def load_manifest(relative_path: str) -> Optional[Dict[str, Any]]:
+    """Манифест обработанного изображения из хранилища или None (не обработано)."""
+    data = await storage.get_bytes(manifest_key(relative_path))
+    try:
+        return json.loads(data) if data is not None else None
+    except ValueError:
+        return None
+
+
+def read_local_manifest(relative_path: str) -> Optional[Dict[str, Any]]:
+    """Манифест из UPLOAD_FOLDER без хранилища (для раздачи файлов самим API)."""
+    try:
+        with open(os.path.join(UPLOAD_FOLDER, manifest_key(relative_path)), encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def process_image(source_path: str, relative_path: str, output_dir: str) -> Dict[str, Any]:
+    """
+    Создает варианты изображения source_path (ключ relative_path) и манифест
+    в output_dir, повторяя структуру ключей. Выполняется в отдельном процессе:
+    только стандартные типы на входе и выходе.
+
+    Пути вариантов — ключи хранилища (абсолютные URL вычисляются при записи товара).
+    """
+    from PIL import Image, ImageOps, features
+
+    folder, filename = os.path.split(relative_path)
+    stem = os.path.splitext(filename)[0]
+
+    with Image.open(source_path) as original:
+        # Фото с телефона часто повернуты через EXIF — применяем поворот к пикселям
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+    width, height = image.size
+
+    formats = [fmt for fmt in settings.IMAGE_VARIANT_FORMATS if features.check(fmt)]
+    # Не увеличиваем: ширины больше оригинала заменяются копией в исходном размере.
+    # Она есть всегда — и у фото шире max(IMAGE_VARIANT_WIDTHS), иначе им нечего
+    # отдать вместо оригинала по Accept (см. app.core.static_files)
+    widths = sorted({min(target, width) for target in settings.IMAGE_VARIANT_WIDTHS} | {width})
+
+    variants = []
+    for fmt in formats:
+        for target_width in widths:
+            target_height = max(1, round(height * target_width / width))
+            resized = image if target_width == width else image.resize((target_width, target_height), Image.LANCZOS)
+            name = f"{folder}/{stem}_{target_width}w.{fmt}" if folder else f"{stem}_{target_width}w.{fmt}"
+            target = os.path.join(output_dir, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            resized.save(target, fmt.upper(), quality=settings.IMAGE_QUALITY)
+            variants.append({"path": name, "width": target_width, "height": target_height, "format": fmt})
+
+    placeholder_height = max(1, round(height * PLACEHOLDER_WIDTH / width))
+    buffer = io.BytesIO()
+    image.resize((PLACEHOLDER_WIDTH, placeholder_height), Image.BILINEAR).save(buffer, "WEBP", quality=30)
+    placeholder = "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+    return {"width": width, "height": height, "variants": variants, "placeholder": placeholder}
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _pool
+
+
+async def process_and_store(relative_path: str) -> Dict[str, Any]:
+    """
+    Создает копии изображения relative_path в пуле процессов и кладет их в
+    хранилище. Манифест сохраняется последним: если он есть, копии уже на месте.
+    """
+    loop = asyncio.get_running_loop()
+    async with storage.local_copy(relative_path) as source_path:
+        output_dir = tempfile.mkdtemp(dir=TMP_FOLDER)
+        try:
+            manifest = await loop.run_in_executor(
+                _get_pool(), process_image, source_path, relative_path, output_dir
+            )
+            await asyncio.gather(*(
+                storage.put_file(variant["path"], os.path.join(output_dir, variant["path"]))
+                for variant in manifest["variants"]
+            ))
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+    await storage.put_bytes(manifest_key(relative_path), json.dumps(manifest).encode("utf-8"))
+    return manifest
+
+
+def shutdown_image_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+def build_srcset(variants: Optional[List[Dict[str, Any]]]) -> str:
+    """Строка для <img srcset> из вариантов первого формата: "url 320w, url 640w"."""
+    if not variants:
+        return ""
+    fmt = variants[0]["format"]
+    return ", ".join(f"{v['url']} {v['width']}w" for v in variants if v["format"] == fmt)
+
+
+def variant_payloads(manifest: Dict[str, Any], base_url: str) -> List[Dict[str, Any]]:
+    """Варианты из манифеста с абсолютными URL (форма схемы ImageVariant)."""
+    return [
+        {
+            "url": storage.url(variant["path"], base_url),
+            "width": variant["width"],
+            "height": variant["height"],
+            "format": variant["format"],
+        }
+        for variant in manifest["variants"]
+    ]
+
+
+def is_content_addressed(relative_path: str) -> bool:
+    """Оригинал (<hash>.jpg) или его копия (<hash>_320w.webp): содержимое по этому имени не меняется."""
+    return _CONTENT_NAME_RE.fullmatch(os.path.basename(relative_path)) is not None
+
+
+def content_hash_of(relative_path: str) -> Optional[str]:
+    """Хеш содержимого из имени файла (ab/cd/<hash>.jpg) или None для старых имен (uuid)."""
+    stem = os.path.splitext(os.path.basename(relative_path))[0]
+    return stem if _CONTENT_HASH_RE.fullmatch(stem) else None
+
@@ -0,0 +1,318 @@
+"""
+Фоновые задачи (импорт прайс-листа и т.п.): очередь с пулом воркеров и
+хранилище статусов, которое можно заменить.
+
+Эндпоинт ставит задачу в очередь и сразу возвращает её ID, а клиент
+опрашивает статус (GET /price-list/jobs/{id}). Хранилище выбирается
+настройкой JOBS_STORE:
+- "memory" — словарь в памяти процесса (по умолчанию; один воркер uvicorn);
+- "sqlite" — файл JOBS_SQLITE_PATH: статус виден всем воркерам uvicorn и
+  переживает перезапуск.
+
+У каждой задачи есть владелец — процесс, в очереди которого она стоит
+(pid, время запуска процесса и boot_id системы). При старте воркер помечает
+failed только незавершенные задачи, чей владелец уже не существует: задачи
+соседних воркеров, которые еще выполняются, не трогаются.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+FINISHED_STATUSES = (JOB_DONE, JOB_FAILED)
+
+
+def _boot_id() -> str:
+    """ID текущей загрузки системы (Linux); пустая строка, если недоступно."""
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as file:
+            return file.read().strip()
+    except OSError:
+        return ""
+
+
+def _process_start_time(pid: int) -> str:
+    """Время запуска процесса (такты с загрузки системы, /proc); пустая строка, если недоступно."""
+    try:
+        with open(f"/proc/{pid}/stat") as file:
+            stat = file.read()
+    except OSError:
+        return ""
+    # Имя процесса в скобках может содержать пробелы — поля считаем после ")"; starttime — 22-е поле
+    return stat.rsplit(")", 1)[1].split()[19]
+
+
+def process_owner() -> str:
+    """Владелец задач текущего процесса: "pid:время запуска:boot_id"."""
+    pid = os.getpid()
+    return f"{pid}:{_process_start_time(pid)}:{_boot_id()}"
+
+
+def owner_is_alive(owner: Optional[str]) -> bool:
+    """
+    Существует ли процесс-владелец. Время запуска и boot_id отличают его от
+    другого процесса с тем же pid (после перезапуска контейнера или системы).
+    """
+    try:
+        pid_text, start_time, boot_id = (owner or "").split(":", 2)
+        pid = int(pid_text)
+    except ValueError:
+        # Задачи без владельца (созданы до его появления) — владелец неизвестен
+        return False
+    if boot_id != _boot_id():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return _process_start_time(pid) == start_time
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str = JOB_QUEUED
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    # Промежуточные счетчики (например, сколько строк уже обработано)
+    progress: Dict[str, Any] = field(default_factory=dict)
+    # Итог успешной задачи
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    # Процесс, в очереди которого задача (см. process_owner)
+    owner: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class JobStore(ABC):
+    """Хранилище статусов задач. Все методы асинхронные, чтобы реализация могла ходить в БД/сеть."""
+
+    def __init__(self, ttl: float):
+        # Сколько секунд хранить завершенные задачи
+        self.ttl = ttl
+
+    @abstractmethod
+    async def save(self, job: Job) -> None:
+        """Создает или перезаписывает задачу."""
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Job]:
+        ...
+
+    @abstractmethod
+    async def fail_orphaned(self, reason: str) -> int:
+        """Помечает failed незавершенные задачи, чей процесс-владелец уже не существует."""
+
+    async def update(self, job: Job, **changes: Any) -> Job:
+        for key, value in changes.items():
+            setattr(job, key, value)
+        job.updated_at = time.time()
+        await self.save(job)
+        return job
+
+
+class InMemoryJobStore(JobStore):
+
+    def __init__(self, ttl: float):
+        super().__init__(ttl)
+        self._jobs: Dict[str, Job] = {}
+
+    def _prune(self) -> None:
+        deadline = time.time() - self.ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in FINISHED_STATUSES and job.updated_at < deadline
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def save(self, job: Job) -> None:
+        if job.id not in self._jobs:
+            self._prune()
+        self._jobs[job.id] = job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def fail_orphaned(self, reason: str) -> int:
+        # Память процесса после перезапуска пуста — чужих задач здесь не бывает
+        return 0
+
+
+class SQLiteJobStore(JobStore):
+    """Задачи в отдельном SQLite-файле (stdlib sqlite3, вызовы — в пуле потоков)."""
+
+    def __init__(self, path: str, ttl: float):
+        super().__init__(ttl)
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, status TEXT NOT NULL, updated_at REAL NOT NULL, data TEXT NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # Соединение на поток: sqlite3 не разрешает делить его между потоками
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _save(self, job: Job) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, status, updated_at, data) VALUES (?, ?, ?, ?)",
+                (job.id, job.status, job.updated_at, json.dumps(job.to_dict(), ensure_ascii=False)),
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (*FINISHED_STATUSES, time.time() - self.ttl),
+            )
+
+    def _get(self, job_id: str) -> Optional[Job]:
+        row = self._connect().execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job(**json.loads(row[0])) if row else None
+
+    def _fail_orphaned(self, reason: str) -> int:
+        failed = 0
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT data FROM jobs WHERE status NOT IN (?, ?)", FINISHED_STATUSES
+            ).fetchall()
+            for (data,) in rows:
+                job = Job(**json.loads(data))
+                if owner_is_alive(job.owner):
+                    continue
+                job.status, job.error, job.updated_at = JOB_FAILED, reason, time.time()
+                # Условие на status: владелец мог успеть завершить задачу
+                conn.execute(
+                    "UPDATE jobs SET status = ?, updated_at = ?, data = ? WHERE id = ? AND status NOT IN (?, ?)",
+                    (job.status, job.updated_at, json.dumps(job.to_dict(), ensure_ascii=False), job.id,
+                     *FINISHED_STATUSES),
+                )
+                failed += 1
+        return failed
+
+    async def save(self, job: Job) -> None:
+        await run_in_threadpool(self._save, job)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await run_in_threadpool(self._get, job_id)
+
+    async def fail_orphaned(self, reason: str) -> int:
+        return await run_in_threadpool(self._fail_orphaned, reason)
+
+
+def create_job_store() -> JobStore:
+    """Хранилище по настройке JOBS_STORE."""
+    if settings.JOBS_STORE == "sqlite":
+        return SQLiteJobStore(settings.JOBS_SQLITE_PATH, ttl=settings.JOBS_TTL)
+    if settings.JOBS_STORE == "memory":
+        return InMemoryJobStore(ttl=settings.JOBS_TTL)
+    raise ValueError(f"Неизвестное хранилище задач JOBS_STORE={settings.JOBS_STORE!r}")
+
+
+# Обработчик задачи: получает задачу и функцию для отчета о прогрессе, возвращает итог
+JobHandler = Callable[[Job, Callable[[Dict[str, Any]], Awaitable[None]]], Awaitable[Dict[str, Any]]]
+
+
+class JobQueue:
+    """
+    Очередь задач с фиксированным числом воркеров (asyncio-задачи в процессе API).
+    Тяжелая синхронная работа внутри обработчиков уходит в пул потоков.
+    """
+
+    def __init__(self, store: JobStore, workers: int):
+        self.store = store
+        self.workers = workers
+        self._queue: "asyncio.Queue[tuple]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self.owner: Optional[str] = None
+
+    async def start(self) -> None:
+        # Владелец определяется в процессе, который обслуживает запросы (воркер uvicorn)
+        self.owner = process_owner()
+        failed = await self.store.fail_orphaned("Задача прервана перезапуском сервера.")
+        if failed:
+            logger.warning(f"{failed} незавершенных задач помечены как failed после перезапуска.")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Задачи, до которых очередь не дошла: failed и очистка (временные файлы)
+        while not self._queue.empty():
+            job, _, on_discard = self._queue.get_nowait()
+            try:
+                await self.store.update(job, status=JOB_FAILED, error="Задача отменена остановкой сервера.")
+            finally:
+                if on_discard is not None:
+                    on_discard()
+                self._queue.task_done()
+
+    async def submit(self, kind: str, handler: JobHandler, on_discard: Optional[Callable[[], None]] = None) -> Job:
+        """
+        Ставит задачу в очередь и сразу возвращает её (status=queued).
+        on_discard вызывается после завершения задачи в любом случае (очистка временных файлов).
+        """
+        job = Job(id=uuid.uuid4().hex, kind=kind, owner=self.owner)
+        await self.store.save(job)
+        self._queue.put_nowait((job, handler, on_discard))
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            job, handler, on_discard = await self._queue.get()
+            try:
+                await self._run(job, handler)
+            finally:
+                if on_discard is not None:
+                    on_discard()
+                self._queue.task_done()
+
+    async def _run(self, job: Job, handler: JobHandler) -> None:
+        await self.store.update(job, status=JOB_RUNNING)
+
+        async def report(progress: Dict[str, Any]) -> None:
+            await self.store.update(job, progress=progress)
+
+        try:
+            result = await handler(job, report)
+        except asyncio.CancelledError:
+            await self.store.update(job, status=JOB_FAILED, error="Задача прервана остановкой сервера.")
+            raise
+        except Exception as e:
+            logger.exception(f"Задача {job.kind} {job.id} завершилась с ошибкой")
+            await self.store.update(job, status=JOB_FAILED, error=str(e))
+        else:
+            await self.store.update(job, status=JOB_DONE, result=result)
+
+
+job_queue = JobQueue(create_job_store(), workers=settings.JOBS_WORKERS)
@@ -0,0 +1,182 @@
+"""
+Диспетчер outbox: отправляет уведомления из таблицы outbox в фоне.
+
+Данные и сообщение о них пишутся в одной транзакции (см. app.crud.outbox),
+поэтому уведомление не теряется при сбое Telegram и не уходит о данных,
+которые не сохранились. Запрос клиента ждет только запись в БД.
+
+- Один общий httpx.AsyncClient с пулом соединений (keep-alive к api.telegram.org).
+- Повтор с экспоненциальной задержкой и разбросом (OUTBOX_RETRY_BASE * 2^n,
+  не больше OUTBOX_RETRY_MAX); после OUTBOX_MAX_ATTEMPTS — status=failed.
+  Ответы 4xx (кроме 429) не повторяются: запрос некорректен.
+- Лимиты Telegram: не чаще TELEGRAM_CHAT_INTERVAL в один чат и
+  TELEGRAM_GLOBAL_RATE сообщений в секунду всего; на 429 диспетчер
+  ждет retry_after из ответа.
+- Просыпается сразу после новой записи (wake) и раз в OUTBOX_POLL_INTERVAL —
+  чтобы подобрать повторы и сообщения, записанные другими воркерами.
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+from app.crud.outbox import OUTBOX_CHANNEL_TELEGRAM, claim_due_messages, mark_failed_attempt, mark_sent
+from app.crud.price_history import utc_now
+from app.db.session import AsyncSessionLocal
+from app.models.outbox import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramRateLimiter:
+    """Интервал между сообщениями в один чат и общий темп отправки."""
+
+    def __init__(self, chat_interval: float, global_rate: float):
+        self.chat_interval = chat_interval
+        self.global_interval = 1.0 / global_rate
+        self._chat_next: Dict[str, float] = {}
+        self._global_next = 0.0
+        self._paused_until = 0.0
+
+    async def wait(self, chat_id: str) -> None:
+        while True:
+            now = time.monotonic()
+            ready_at = max(self._chat_next.get(chat_id, 0.0), self._global_next, self._paused_until)
+            if ready_at <= now:
+                break
+            await asyncio.sleep(ready_at - now)
+        self._chat_next[chat_id] = now + self.chat_interval
+        self._global_next = now + self.global_interval
+
+    def pause(self, seconds: float) -> None:
+        """Telegram ответил 429: до retry_after не отправляем ничего."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class OutboxDispatcher:
+
+    def __init__(self, batch_size: int, poll_interval: float, lease: float,
+                 max_attempts: int, retry_base: float, retry_max: float):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.limiter = TelegramRateLimiter(settings.TELEGRAM_CHAT_INTERVAL, settings.TELEGRAM_GLOBAL_RATE)
+        self.telegram_url = f"{settings.TELEGRAM_API_BASE.rstrip('/')}/bot{settings.BOT_TOKEN}/sendMessage"
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    async def start(self) -> None:
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+        )
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            # Флаг + wake: в Python < 3.12 wait_for может потерять cancel(),
+            # если событие сработало одновременно с отменой
+            self._stopping = True
+            self.wake()
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def wake(self) -> None:
+        """Есть новые сообщения (вызывается после commit)."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            self._wake.clear()
+            try:
+                processed = await self.dispatch_batch()
+            except Exception:
+                logger.exception("Ошибка диспетчера outbox")
+                processed = 0
+            if processed >= self.batch_size:
+                # Пачка была полной — возможно, ждут еще
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def dispatch_batch(self) -> int:
+        """Отправляет одну пачку готовых сообщений; возвращает их количество."""
+        async with AsyncSessionLocal() as db:
+            messages = await claim_due_messages(db, limit=self.batch_size, lease=self.lease)
+            for message in messages:
+                failure = await self._send(message)
+                if failure is None:
+                    await mark_sent(db, message.id)
+                    continue
+                error, retry_at = failure
+                if retry_at is None:
+                    logger.error(f"Уведомление {message.id} не отправлено окончательно: {error}")
+                else:
+                    logger.warning(f"Уведомление {message.id} не отправлено, повтор в {retry_at:%H:%M:%S}: {error}")
+                await mark_failed_attempt(db, message.id, error, retry_at)
+        return len(messages)
+
+    def _retry_at(self, attempts: int, delay: Optional[float] = None) -> Optional[datetime]:
+        """Время следующей попытки после attempts неудачных или None, если попытки кончились."""
+        if attempts >= self.max_attempts:
+            return None
+        if delay is None:
+            # Экспонента с разбросом: повторы разных сообщений не совпадают по времени
+            delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+        return utc_now() + timedelta(seconds=delay)
+
+    async def _send(self, message: OutboxMessage) -> Optional[Tuple[str, Optional[datetime]]]:
+        """None — отправлено; иначе (ошибка, время повтора или None — не повторять)."""
+        attempts = message.attempts + 1
+        if message.channel != OUTBOX_CHANNEL_TELEGRAM:
+            return f"Неизвестный канал {message.channel!r}", None
+
+        await self.limiter.wait(str(message.payload.get("chat_id")))
+        try:
+            response = await self._client.post(self.telegram_url, json=message.payload)
+        except httpx.HTTPError as e:
+            return f"{type(e).__name__}: {e}", self._retry_at(attempts)
+
+        if response.is_success:
+            return None
+        if response.status_code == 429:
+            try:
+                retry_after = float(response.json().get("parameters", {}).get("retry_after", 1))
+            except ValueError:
+                retry_after = 1.0
+            self.limiter.pause(retry_after)
+            return f"429 Too Many Requests, retry_after={retry_after:g}", self._retry_at(attempts, retry_after)
+        error = f"{response.status_code}: {response.text[:500]}"
+        if response.status_code >= 500:
+            return error, self._retry_at(attempts)
+        # 400/403 и т.п.: повтор не поможет (неверный текст, бот заблокирован)
+        return error, None
+
+
+outbox_dispatcher = OutboxDispatcher(
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL,
+    lease=settings.OUTBOX_LEASE,
+    max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+    retry_base=settings.OUTBOX_RETRY_BASE,
+    retry_max=settings.OUTBOX_RETRY_MAX,
+)
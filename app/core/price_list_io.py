@@ -0,0 +1,360 @@
+"""
+Форматы файла прайс-листа (без обращения к БД): XLSX, CSV и Parquet.
+
+Запись идет построчно, пачками из app.crud.price_list, в файл-приемник
+(обычно временный файл), так что память не растет с размером каталога.
+Методы синхронные и вызываются из пула потоков, а не в event loop.
+Во всех форматах одни и те же колонки: ID, Название, Память, Цвет, Цена.
+"""
+import csv
+import io
+import math
+from dataclasses import dataclass, field
+from enum import Enum
+from itertools import islice
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill
+
+PRICE_LIST_HEADERS = ['ID (Не менять!)', 'Название', 'Память', 'Цвет', 'Цена (Редактировать)']
+PRICE_LIST_SHEET_TITLE = "Прайс-лист"
+# Машиночитаемые имена колонок (CSV-заголовок и колонки Parquet)
+PRICE_LIST_FIELDS = ['id', 'name', 'memory', 'color', 'price']
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+# Сколько строк Parquet читается за один batch
+PARQUET_BATCH_SIZE = 10_000
+# Сколько сообщений об ошибочных строках возвращать в ответе загрузки
+MAX_REPORTED_ERRORS = 50
+
+# Размер кусков, которыми готовый файл отдается клиенту
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+class PriceListFormat(str, Enum):
+    xlsx = "xlsx"
+    csv = "csv"
+    parquet = "parquet"
+
+    @classmethod
+    def from_filename(cls, filename: Optional[str]) -> Optional["PriceListFormat"]:
+        """Формат по расширению файла или None, если расширение незнакомое."""
+        extension = (filename or '').rsplit('.', 1)[-1].lower()
+        return cls.__members__.get(extension)
+
+
+class UnsupportedPriceListFormat(Exception):
+    """Формат не поддерживается этой установкой (нет зависимости)."""
+
+
+def _import_pyarrow():
+    """pyarrow нужен только для Parquet, поэтому импортируется по требованию."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise UnsupportedPriceListFormat("Формат Parquet недоступен: на сервере не установлен pyarrow.") from e
+    return pyarrow
+
+
+def price_list_row(item_id: int, name: str, memory: Optional[str], color: Optional[str], price) -> list:
+    """Строка файла: пустые характеристики как '—', цена всегда числом."""
+    try:
+        item_price = float(price)
+    except (TypeError, ValueError):
+        item_price = 0.0
+    return [item_id, name, memory or '—', color or '—', item_price]
+
+
+class XlsxPriceListWriter:
+    """
+    XLSX в режиме write_only: openpyxl сбрасывает строки во временный XML
+    по мере добавления и не держит в памяти объекты ячеек.
+    """
+    extension = "xlsx"
+    media_type = XLSX_MEDIA_TYPE
+
+    def __init__(self, target: BinaryIO):
+        self.target = target
+        self.count = 0
+        self._wb = openpyxl.Workbook(write_only=True)
+        self._ws = self._wb.create_sheet(PRICE_LIST_SHEET_TITLE)
+
+        column_widths = {'A': 15, 'B': 40, 'C': 15, 'D': 15, 'E': 20}
+        for col_letter, width in column_widths.items():
+            self._ws.column_dimensions[col_letter].width = width
+
+        header_font = Font(bold=True, color="FFFFFF")
+        header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+        header_alignment = Alignment(horizontal="center", vertical="center")
+        header_cells: List[WriteOnlyCell] = []
+        for title in PRICE_LIST_HEADERS:
+            cell = WriteOnlyCell(self._ws, value=title)
+            cell.font = header_font
+            cell.fill = header_fill
+            cell.alignment = header_alignment
+            header_cells.append(cell)
+        self._ws.append(header_cells)
+
+    def write_rows(self, rows: Iterable[tuple]) -> None:
+        for row in rows:
+            self._ws.append(price_list_row(*row))
+            self.count += 1
+
+    def close(self) -> None:
+        self._wb.save(self.target)
+
+
+class CsvPriceListWriter:
+    """
+    CSV (UTF-8 с BOM, чтобы Excel правильно открыл кириллицу). Не требует
+    временного файла: encode_rows() возвращает готовые байты пачки, и их
+    можно сразу отдавать клиенту.
+    """
+    extension = "csv"
+    media_type = CSV_MEDIA_TYPE
+
+    def __init__(self):
+        self.count = 0
+
+    def header(self) -> bytes:
+        return '\ufeff'.encode('utf-8') + self._encode([PRICE_LIST_FIELDS])
+
+    def encode_rows(self, rows: Iterable[tuple]) -> bytes:
+        lines = [price_list_row(*row) for row in rows]
+        self.count += len(lines)
+        return self._encode(lines)
+
+    @staticmethod
+    def _encode(lines: Iterable[list]) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerows(lines)
+        return buffer.getvalue().encode('utf-8')
+
+
+class ParquetPriceListWriter:
+    """Parquet: каждая пачка строк записывается отдельной колоночной группой (row group)."""
+    extension = "parquet"
+    media_type = PARQUET_MEDIA_TYPE
+
+    def __init__(self, target: BinaryIO):
+        pa = _import_pyarrow()
+        self._pa = pa
+        self.count = 0
+        self._schema = pa.schema([
+            ('id', pa.int64()),
+            ('name', pa.string()),
+            ('memory', pa.string()),
+            ('color', pa.string()),
+            ('price', pa.float64()),
+        ])
+        self._writer = pa.parquet.ParquetWriter(target, self._schema)
+
+    def write_rows(self, rows: Iterable[tuple]) -> None:
+        lines = [price_list_row(*row) for row in rows]
+        if not lines:
+            return
+        columns = [list(column) for column in zip(*lines)]
+        self._writer.write_batch(self._pa.record_batch(columns, schema=self._schema))
+        self.count += len(lines)
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def _read_xlsx_rows(file: BinaryIO) -> Iterator[tuple]:
+    # read_only: строки читаются из XML по одной, без объектов ячеек для всего листа
+    wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        # Размер листа из файла бывает неверным (файлы не из Excel) — читаем до конца
+        ws.reset_dimensions()
+        yield from ws.iter_rows(min_row=2, values_only=True)
+    finally:
+        wb.close()
+
+
+def _read_csv_rows(file: BinaryIO) -> Iterator[tuple]:
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        # Разделитель угадываем по началу файла: русский Excel сохраняет CSV через ';'
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(text, dialect)
+        next(reader, None)  # заголовок
+        for row in reader:
+            # Пустые ячейки как в XLSX — None
+            yield tuple(value.strip() or None for value in row)
+    finally:
+        # Не закрываем файл загрузки вместе с оберткой
+        text.detach()
+
+
+def _read_parquet_rows(file: BinaryIO) -> Iterator[tuple]:
+    pa = _import_pyarrow()
+    parquet_file = pa.parquet.ParquetFile(file)
+    missing = {'id', 'price'} - set(parquet_file.schema_arrow.names)
+    if missing:
+        raise ValueError(f"В файле Parquet нет колонок: {', '.join(sorted(missing))}")
+    columns = [name for name in PRICE_LIST_FIELDS if name in parquet_file.schema_arrow.names]
+    for batch in parquet_file.iter_batches(batch_size=PARQUET_BATCH_SIZE, columns=columns):
+        data = batch.to_pydict()
+        values = [data.get(name, [None] * batch.num_rows) for name in PRICE_LIST_FIELDS]
+        yield from zip(*values)
+
+
+_READERS = {
+    PriceListFormat.xlsx: _read_xlsx_rows,
+    PriceListFormat.csv: _read_csv_rows,
+    PriceListFormat.parquet: _read_parquet_rows,
+}
+
+
+def read_price_list_rows(file: BinaryIO, price_format: PriceListFormat) -> Iterator[tuple]:
+    """
+    Строки данных (без заголовка) загруженного прайс-листа в порядке колонок
+    ID, Название, Память, Цвет, Цена — одинаково для всех форматов.
+    """
+    return _READERS[price_format](file)
+
+
+def parse_price_row(row: tuple) -> Optional[Tuple[int, float]]:
+    """
+    (ID, цена) из строки файла; None для пустой строки.
+    ValueError с описанием, если ID или цена неверные.
+    """
+    if not row or row[0] is None:
+        return None
+
+    try:
+        item_id = int(row[0])
+    except (TypeError, ValueError):
+        raise ValueError("ID должен быть целым числом.")
+    new_price_raw = row[4] if len(row) > 4 else None
+
+    # 💡 Улучшенная обработка цены из колонки 'E' (индекс 4)
+    if isinstance(new_price_raw, (int, float)):
+        new_price = float(new_price_raw)
+    elif isinstance(new_price_raw, str):
+        new_price = float(new_price_raw.replace(',', '.'))
+    else:
+        raise ValueError("Цена не является числом или строкой.")
+
+    if item_id <= 0:
+        raise ValueError("ID должен быть положительным числом.")
+    # float() принимает "nan" и "inf" — такие цены в БД не пишем
+    if not math.isfinite(new_price):
+        raise ValueError("Цена должна быть конечным числом.")
+    # 💡 ИСПРАВЛЕНО: Цена не может быть отрицательной, но может быть 0
+    if new_price < 0:
+        raise ValueError("Цена не может быть отрицательной.")
+    return item_id, new_price
+
+
+@dataclass
+class PriceImportStats:
+    """Итоги разбора загруженного прайс-листа."""
+    changed: int = 0
+    unchanged: int = 0
+    unknown: int = 0
+    invalid: int = 0
+    # Первые MAX_REPORTED_ERRORS сообщений (остальные только считаются)
+    errors: List[str] = field(default_factory=list)
+    # ID, уже встреченные в файле: повтор считается неверной строкой
+    seen_ids: Set[int] = field(default_factory=set, repr=False)
+
+    @property
+    def valid(self) -> int:
+        """Строки с корректными ID и ценой (независимо от того, есть ли товар)."""
+        return self.changed + self.unchanged + self.unknown
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            'processed': self.valid + self.invalid,
+            'changed': self.changed,
+            'unchanged': self.unchanged,
+            'unknown': self.unknown,
+            'invalid': self.invalid,
+        }
+
+    def add_error(self, row: tuple, error: Exception) -> None:
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            item_id_for_log = row[0] if row and row[0] is not None else '?'
+            self.errors.append(f"Строка с ID {item_id_for_log}: неверный формат. Ошибка: {str(error)[:50]}...")
+
+    def add_duplicate(self, item_id: int) -> None:
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"Строка с ID {item_id}: ID повторяется в файле, применена первая строка.")
+
+    def add_unknown(self, item_id: int) -> None:
+        self.unknown += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"Строка с ID {item_id}: товар не найден.")
+
+
+def next_price_chunk(
+    rows: Iterator[tuple],
+    chunk_size: int,
+    current_prices: Dict[int, float],
+    stats: PriceImportStats,
+) -> Optional[List[Dict[str, float]]]:
+    """
+    ИЗМЕНЕННЫЕ цены [{'id': ..., 'price': ..., 'old_price': ...}] из следующих chunk_size
+    строк файла (список может быть пустым; None — файл закончился).
+
+    Каждая строка сравнивается с current_prices (id -> цена в БД): цена
+    без изменений и неизвестный ID в пачку не попадают, а только
+    учитываются в stats, как и неверные строки. Повтор ID в файле считается
+    неверной строкой (применяется первая): иначе один товар попал бы в пачку
+    дважды, а UPDATE ... FROM (VALUES ...) с повторами применяет любую из строк.
+    Синхронная: вызывается из пула потоков, пачка за пачкой.
+    """
+    chunk: List[Dict[str, float]] = []
+    read = 0
+    for row in islice(rows, chunk_size):
+        read += 1
+        try:
+            parsed = parse_price_row(row)
+        except ValueError as e:
+            stats.add_error(row, e)
+            continue
+        if parsed is None:
+            continue
+
+        item_id, new_price = parsed
+        if item_id in stats.seen_ids:
+            stats.add_duplicate(item_id)
+            continue
+        stats.seen_ids.add(item_id)
+        if item_id not in current_prices:
+            stats.add_unknown(item_id)
+        elif current_prices[item_id] == new_price:
+            stats.unchanged += 1
+        else:
+            chunk.append({'id': item_id, 'price': new_price, 'old_price': current_prices[item_id]})
+            stats.changed += 1
+    return chunk if read else None
+
+
+def iter_file_chunks(file: BinaryIO, chunk_size: int = FILE_CHUNK_SIZE):
+    """
+    Отдает файл с начала кусками и закрывает его в конце.
+    Синхронный генератор: StreamingResponse сам читает его в пуле потоков.
+    """
+    try:
+        file.seek(0)
+        while chunk := file.read(chunk_size):
+            yield chunk
+    finally:
+        file.close()
@@ -0,0 +1,168 @@
+"""
+Раздача загруженных изображений (/static/images/).
+
+Файлы с именем по хешу содержимого (см. app.core.images) отдаются с
+Cache-Control: immutable и строгим ETag = имя файла (хеш и формат) — браузер и
+Telegram WebView берут их из кэша без запросов к серверу, а при
+перепроверке сравнение не зависит от mtime на конкретном узле.
+
+Если клиент принимает AVIF/WebP (заголовок Accept), вместо оригинала
+отдается полноразмерная копия в этом формате (она в разы меньше JPEG/PNG),
+с Vary: Accept. Range-запросы и 304 обрабатывает FileResponse.
+
+Zero-copy: FileResponse отдает файл через расширение ASGI
+http.response.pathsend, если сервер его поддерживает (например, Granian),
+и тогда файл уходит через sendfile без чтения в Python. Под uvicorn файл
+читается кусками FILE_CHUNK_SIZE. Для продакшена каталог UPLOAD_FOLDER
+можно отдавать nginx напрямую (sendfile on) — имена неизменяемые, поэтому
+кэширование от этого не меняется.
+
+Для старых файлов (имена uuid) поведение StaticFiles не меняется:
+валидация по ETag/Last-Modified.
+
+Служебные файлы из UPLOAD_FOLDER наружу не отдаются (404): временная папка
+tmp/ (недописанные загрузки) и манифесты обработки (*.json).
+"""
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.core.http_cache import IMMUTABLE_CACHE_CONTROL
+from app.core.images import is_content_addressed, read_local_manifest
+from app.core.storage import TMP_FOLDER, UPLOAD_FOLDER
+
+# Форматы в порядке предпочтения (лучшее сжатие — первым)
+PREFERRED_FORMATS = ("avif", "webp")
+_MEDIA_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+# Папки и расширения в UPLOAD_FOLDER, которые не раздаются
+PRIVATE_DIRS = frozenset([os.path.relpath(TMP_FOLDER, UPLOAD_FOLDER)])
+PRIVATE_EXTENSIONS = frozenset([".json"])
+
+# Кусок чтения, если сервер не умеет pathsend (у FileResponse по умолчанию 64 КБ)
+FILE_CHUNK_SIZE = 256 * 1024
+
+# Копия (<hash>_320w.webp) своих копий не имеет — манифест для нее не ищется
+_VARIANT_NAME_RE = re.compile(r"[0-9a-f]{64}_\d+w\.\w+")
+
+# Полноразмерные копии по пути оригинала (LRU). Найденный манифест для
+# неизменяемого имени уже не поменяется и хранится без срока; отсутствие
+# манифеста — только MISSING_MANIFEST_TTL секунд: обработка загрузки может
+# дописать его позже.
+_MAX_CACHED_MANIFESTS = 10_000
+MISSING_MANIFEST_TTL = 60.0
+_full_size_variants: "OrderedDict[str, Tuple[Dict[str, str], Optional[float]]]" = OrderedDict()
+
+
+class ImageFileResponse(FileResponse):
+    chunk_size = FILE_CHUNK_SIZE
+
+
+def _read_full_size_variants(relative_path: str) -> Optional[Dict[str, str]]:
+    """Копии в исходном размере из манифеста на диске (None — манифеста нет)."""
+    manifest = read_local_manifest(relative_path)
+    if manifest is None:
+        return None
+    return {
+        variant["format"]: variant["path"]
+        for variant in manifest["variants"]
+        if variant["width"] == manifest["width"]
+    }
+
+
+async def full_size_variants(relative_path: str) -> Dict[str, str]:
+    """{формат: путь} копий изображения в исходном размере (из манифеста)."""
+    if _VARIANT_NAME_RE.fullmatch(os.path.basename(relative_path)):
+        return {}
+    cached = _full_size_variants.get(relative_path)
+    if cached is not None:
+        variants, expires_at = cached
+        if expires_at is None or time.monotonic() < expires_at:
+            _full_size_variants.move_to_end(relative_path)
+            return variants
+
+    # Чтение манифеста — в пуле потоков, как stat у StaticFiles; кэш меняется только в цикле событий
+    variants = await run_in_threadpool(_read_full_size_variants, relative_path)
+    expires_at = None
+    if variants is None:
+        variants, expires_at = {}, time.monotonic() + MISSING_MANIFEST_TTL
+    _full_size_variants[relative_path] = (variants, expires_at)
+    _full_size_variants.move_to_end(relative_path)
+    if len(_full_size_variants) > _MAX_CACHED_MANIFESTS:
+        _full_size_variants.popitem(last=False)
+    return variants
+
+
+def accepts(accept: str, media_type: str) -> bool:
+    """Есть ли media_type в заголовке Accept с q > 0 (подстановки image/* не учитываются)."""
+    for part in accept.split(","):
+        value, *params = [item.strip() for item in part.split(";")]
+        if value.lower() != media_type:
+            continue
+        for param in params:
+            name, _, q = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    return float(q) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def is_private(path: str) -> bool:
+    """Служебный файл (tmp/, манифест), который не должен раздаваться."""
+    parts = os.path.normpath(path).split(os.sep)
+    return parts[0] in PRIVATE_DIRS or os.path.splitext(path)[1].lower() in PRIVATE_EXTENSIONS
+
+
+def choose_variant(accept: str, variants: Dict[str, str]) -> Optional[str]:
+    """Путь лучшей копии, которую принимает клиент, или None (отдать оригинал)."""
+    for fmt in PREFERRED_FORMATS:
+        if fmt in variants and accepts(accept, _MEDIA_TYPES[fmt]):
+            return variants[fmt]
+    return None
+
+
+class ImageStaticFiles(StaticFiles):
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if is_private(path):
+            raise HTTPException(status_code=404)
+        variants = await full_size_variants(path) if is_content_addressed(path) else {}
+        if not variants:
+            return await super().get_response(path, scope)
+
+        variant_path = choose_variant(Headers(scope=scope).get("accept", ""), variants)
+        response = await super().get_response(variant_path or path, scope)
+        # Ответ по одному URL зависит от Accept — кэши должны это учитывать
+        response.headers["Vary"] = "Accept"
+        return response
+
+    def file_response(
+        self,
+        full_path: "os.PathLike[str] | str",
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        headers = {}
+        name = os.path.basename(full_path)
+        if is_content_addressed(name):
+            # Строгий ETag по содержимому вместо mtime+size (одинаков на всех узлах).
+            # Имя целиком, с расширением: копии <hash>_1280w.avif и .webp — разные байты
+            headers = {"ETag": f'"{name}"', "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+
+        response = ImageFileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,361 @@
+"""
+Хранилище загруженных изображений, которое можно заменить.
+
+Выбирается настройкой STORAGE_BACKEND:
+- "local" — папка UPLOAD_FOLDER, раздается самим API по /static/images/
+  (по умолчанию; подходит для одного узла);
+- "s3" — бакет S3-совместимого хранилища (AWS S3, MinIO, Yandex Object
+  Storage...). Файлы раздаются хранилищем/CDN по S3_PUBLIC_URL, поэтому
+  узлов API за балансировщиком может быть сколько угодно. Нужен boto3.
+
+Ключ объекта — путь относительно корня хранилища (ab/cd/<sha256>.jpg, см.
+app.core.images.content_path). Все записываемые объекты неизменяемы.
+
+Прямая загрузка (только S3): клиент получает presigned POST на ключ
+incoming/<uuid>.<ext> и отправляет файл в хранилище сам, минуя API; затем
+API проверяет объект и переносит его под имя по хешу (см.
+app.core.image_uploads.adopt_direct_upload). Для брошенных загрузок на
+префикс incoming/ стоит повесить lifecycle-правило (удаление через сутки).
+
+Для проверки без AWS подойдет локальный MinIO:
+
+    docker run -p 9000:9000 minio/minio server /data
+    STORAGE_BACKEND=s3 S3_ENDPOINT_URL=http://localhost:9000 S3_BUCKET=images \
+    S3_ACCESS_KEY_ID=minioadmin S3_SECRET_ACCESS_KEY=minioadmin
+
+или moto (moto.server.ThreadedMotoServer) с тем же S3_ENDPOINT_URL.
+"""
+import os
+import shutil
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.http_cache import IMMUTABLE_CACHE_CONTROL
+
+# Папка с загруженными файлами и путь, по которому она раздается (см. app.main)
+UPLOAD_FOLDER = "uploaded_images"
+STATIC_BASE_PATH = "static/images"
+
+# Недописанные загрузки и рабочие файлы обработки (локально при любом хранилище)
+TMP_FOLDER = os.path.join(UPLOAD_FOLDER, "tmp")
+
+# Префикс ключей для прямой загрузки клиентом (до проверки и переноса)
+INCOMING_PREFIX = "incoming/"
+
+_CONTENT_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+    ".avif": "image/avif",
+    ".json": "application/json",
+}
+
+
+def content_type_for(key: str) -> str:
+    return _CONTENT_TYPES.get(os.path.splitext(key)[1].lower(), "application/octet-stream")
+
+
+class DirectUploadUnsupported(Exception):
+    """Хранилище не поддерживает прямую загрузку (presigned URL)."""
+
+
+class ImageStorage(ABC):
+    """Хранилище объектов по ключу. Методы асинхронные: реализации ходят в сеть/на диск."""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def put_file(self, key: str, path: str) -> None:
+        """Переносит локальный файл path в хранилище (после вызова path не существует)."""
+
+    @abstractmethod
+    async def put_bytes(self, key: str, data: bytes) -> None:
+        ...
+
+    @abstractmethod
+    async def get_bytes(self, key: str) -> Optional[bytes]:
+        """Содержимое объекта или None, если его нет."""
+
+    @abstractmethod
+    async def download(self, key: str, path: str) -> None:
+        """Копирует объект в локальный файл path; FileNotFoundError, если объекта нет."""
+
+    @abstractmethod
+    async def copy(self, source_key: str, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Удаляет объект (отсутствующий — не ошибка)."""
+
+    @abstractmethod
+    def url(self, key: str, base_url: str) -> str:
+        """Публичный URL объекта; base_url — адрес API (http(s)://host), если файлы раздает он."""
+
+    @abstractmethod
+    def key_from_url(self, url: str) -> Optional[Tuple[str, str]]:
+        """(base_url, ключ) для ссылки на объект этого хранилища, иначе None."""
+
+    async def presigned_upload(self, key: str, content_type: str, max_size: int) -> Dict[str, Any]:
+        """URL и поля формы для загрузки файла клиентом напрямую в хранилище."""
+        raise DirectUploadUnsupported("Прямая загрузка доступна только при STORAGE_BACKEND=s3.")
+
+    @asynccontextmanager
+    async def local_copy(self, key: str) -> AsyncIterator[str]:
+        """Локальный путь к объекту на время работы с ним (например, для Pillow)."""
+        path = os.path.join(TMP_FOLDER, f"{uuid.uuid4().hex}{os.path.splitext(key)[1]}")
+        try:
+            await self.download(key, path)
+            yield path
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _safe_key(key: str) -> str:
+    # Ключ не должен выводить за пределы корня хранилища
+    if key.startswith("/") or ".." in key.split("/"):
+        raise ValueError(f"Недопустимый ключ объекта: {key!r}")
+    return key
+
+
+class LocalImageStorage(ImageStorage):
+    """Папка на диске; файлы раздает app.core.static_files.ImageStaticFiles."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, _safe_key(key))
+
+    def _replace(self, path: str, key: str) -> None:
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+
+    def _write(self, key: str, data: bytes) -> None:
+        # Через временный файл: читатель никогда не увидит недописанный объект
+        temp_path = os.path.join(TMP_FOLDER, f"{uuid.uuid4().hex}.part")
+        with open(temp_path, "wb") as file:
+            file.write(data)
+        self._replace(temp_path, key)
+
+    def _read(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self.path(key), "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def _copy(self, source: str, key: str) -> None:
+        temp_path = os.path.join(TMP_FOLDER, f"{uuid.uuid4().hex}.part")
+        shutil.copyfile(source, temp_path)
+        self._replace(temp_path, key)
+
+    async def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    async def put_file(self, key: str, path: str) -> None:
+        self._replace(path, key)
+
+    async def put_bytes(self, key: str, data: bytes) -> None:
+        await run_in_threadpool(self._write, key, data)
+
+    async def get_bytes(self, key: str) -> Optional[bytes]:
+        return await run_in_threadpool(self._read, key)
+
+    async def download(self, key: str, path: str) -> None:
+        await run_in_threadpool(shutil.copyfile, self.path(key), path)
+
+    async def copy(self, source_key: str, key: str) -> None:
+        await run_in_threadpool(self._copy, self.path(source_key), key)
+
+    async def delete(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def url(self, key: str, base_url: str) -> str:
+        return f"{base_url}/{STATIC_BASE_PATH}/{key}"
+
+    def key_from_url(self, url: str) -> Optional[Tuple[str, str]]:
+        marker = f"/{STATIC_BASE_PATH}/"
+        if marker not in url:
+            return None
+        base_url, key = url.split(marker, 1)
+        key = key.split("?", 1)[0]
+        if key.startswith("/") or ".." in key.split("/"):
+            return None
+        return base_url, key
+
+    @asynccontextmanager
+    async def local_copy(self, key: str) -> AsyncIterator[str]:
+        # Файл уже на диске — копировать незачем
+        yield self.path(key)
+
+
+def _import_boto3():
+    try:
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config
+        from botocore.exceptions import ClientError
+    except ImportError as e:
+        raise RuntimeError("Для STORAGE_BACKEND=s3 нужен пакет boto3 (pip install boto3).") from e
+    return boto3, TransferConfig, Config, ClientError
+
+
+class S3ImageStorage(ImageStorage):
+    """
+    Бакет S3-совместимого хранилища. boto3 синхронный, поэтому вызовы идут в
+    пуле потоков; файлы больше S3_MULTIPART_CHUNK_SIZE загружаются multipart
+    (части параллельно).
+    """
+
+    def __init__(self, bucket: str, endpoint_url: Optional[str], region: str,
+                 access_key_id: Optional[str], secret_access_key: Optional[str],
+                 public_url: Optional[str], multipart_chunk_size: int, presign_expires: int):
+        boto3, TransferConfig, Config, self._client_error = _import_boto3()
+        if not bucket:
+            raise ValueError("Для STORAGE_BACKEND=s3 задайте S3_BUCKET.")
+        self.bucket = bucket
+        self.presign_expires = presign_expires
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            # MinIO и большинство S3-совместимых хранилищ понимают только path-style
+            config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_chunk_size, multipart_chunksize=multipart_chunk_size
+        )
+        if public_url:
+            self.public_url = public_url.rstrip("/")
+        elif endpoint_url:
+            self.public_url = f"{endpoint_url.rstrip('/')}/{bucket}"
+        else:
+            self.public_url = f"https://{bucket}.s3.{region}.amazonaws.com"
+
+    def _is_missing(self, error: Exception) -> bool:
+        code = error.response.get("Error", {}).get("Code")
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    def _extra_args(self, key: str) -> Dict[str, str]:
+        return {"ContentType": content_type_for(key), "CacheControl": IMMUTABLE_CACHE_CONTROL}
+
+    def _exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except self._client_error as e:
+            if self._is_missing(e):
+                return False
+            raise
+        return True
+
+    def _put_file(self, key: str, path: str) -> None:
+        self.client.upload_file(
+            path, self.bucket, key, ExtraArgs=self._extra_args(key), Config=self.transfer_config
+        )
+        os.remove(path)
+
+    def _get_bytes(self, key: str) -> Optional[bytes]:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        except self._client_error as e:
+            if self._is_missing(e):
+                return None
+            raise
+
+    def _download(self, key: str, path: str) -> None:
+        try:
+            self.client.download_file(self.bucket, key, path, Config=self.transfer_config)
+        except self._client_error as e:
+            if self._is_missing(e):
+                raise FileNotFoundError(key) from e
+            raise
+
+    async def exists(self, key: str) -> bool:
+        return await run_in_threadpool(self._exists, _safe_key(key))
+
+    async def put_file(self, key: str, path: str) -> None:
+        await run_in_threadpool(self._put_file, _safe_key(key), path)
+
+    async def put_bytes(self, key: str, data: bytes) -> None:
+        await run_in_threadpool(
+            self.client.put_object, Bucket=self.bucket, Key=_safe_key(key), Body=data, **self._extra_args(key)
+        )
+
+    async def get_bytes(self, key: str) -> Optional[bytes]:
+        return await run_in_threadpool(self._get_bytes, _safe_key(key))
+
+    async def download(self, key: str, path: str) -> None:
+        await run_in_threadpool(self._download, _safe_key(key), path)
+
+    async def copy(self, source_key: str, key: str) -> None:
+        # Копирование на стороне хранилища, байты через API не идут
+        await run_in_threadpool(
+            self.client.copy_object,
+            Bucket=self.bucket, Key=_safe_key(key),
+            CopySource={"Bucket": self.bucket, "Key": _safe_key(source_key)},
+            MetadataDirective="REPLACE", **self._extra_args(key),
+        )
+
+    async def delete(self, key: str) -> None:
+        await run_in_threadpool(self.client.delete_object, Bucket=self.bucket, Key=_safe_key(key))
+
+    def url(self, key: str, base_url: str) -> str:
+        return f"{self.public_url}/{key}"
+
+    def key_from_url(self, url: str) -> Optional[Tuple[str, str]]:
+        prefix = f"{self.public_url}/"
+        if not url.startswith(prefix):
+            return None
+        key = url[len(prefix):].split("?", 1)[0]
+        if ".." in key.split("/"):
+            return None
+        return self.public_url, key
+
+    async def presigned_upload(self, key: str, content_type: str, max_size: int) -> Dict[str, Any]:
+        # Хранилище само отклонит файл другого типа или больше max_size
+        post = await run_in_threadpool(
+            self.client.generate_presigned_post,
+            Bucket=self.bucket, Key=_safe_key(key),
+            Fields={"Content-Type": content_type},
+            Conditions=[{"Content-Type": content_type}, ["content-length-range", 1, max_size]],
+            ExpiresIn=self.presign_expires,
+        )
+        return {"url": post["url"], "fields": post["fields"], "expires_in": self.presign_expires}
+
+
+def create_storage() -> ImageStorage:
+    """Хранилище по настройке STORAGE_BACKEND."""
+    os.makedirs(TMP_FOLDER, exist_ok=True)
+    if settings.STORAGE_BACKEND == "s3":
+        return S3ImageStorage(
+            bucket=settings.S3_BUCKET,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            public_url=settings.S3_PUBLIC_URL,
+            multipart_chunk_size=settings.S3_MULTIPART_CHUNK_SIZE,
+            presign_expires=settings.S3_PRESIGN_EXPIRES,
+        )
+    if settings.STORAGE_BACKEND == "local":
+        return LocalImageStorage(UPLOAD_FOLDER)
+    raise ValueError(f"Неизвестное хранилище изображений STORAGE_BACKEND={settings.STORAGE_BACKEND!r}")
+
+
+storage = create_storage()
@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.catalog import CatalogVersion
+
+# Единственная строка таблицы catalog_version
+CATALOG_VERSION_ID = 1
+
+async def bump_catalog_version(db: AsyncSession) -> None:
+    """
+    Увеличивает версию каталога в текущей транзакции.
+    commit() делает вызывающий код — вместе с самим изменением товаров.
+    """
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        update(CatalogVersion)
+        .where(CatalogVersion.id == CATALOG_VERSION_ID)
+        .values(version=CatalogVersion.version + 1, updated_at=now)
+    )
+    if result.rowcount == 0:
+        db.add(CatalogVersion(id=CATALOG_VERSION_ID, version=1, updated_at=now))
+
+async def get_catalog_version(db: AsyncSession) -> Tuple[int, Optional[datetime]]:
+    """Возвращает (версия, время последнего изменения) каталога."""
+    row = (await db.execute(
+        select(CatalogVersion.version, CatalogVersion.updated_at)
+        .where(CatalogVersion.id == CATALOG_VERSION_ID)
+    )).first()
+    if row is None:
+        return 0, None
+    version, updated_at = row
+    # SQLite не хранит часовой пояс — приводим к UTC явно
+    if updated_at is not None and updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return version, updated_at
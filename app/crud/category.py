@@ -1,20 +1,19 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import catalog_cache
+from app.crud.catalog import bump_catalog_version
+from app.crud.category_tree import category_tree_cache
 from app.models.category import Category as CategoryModel
 from app.schemas.category import CategoryCreate
 
-def get_category(db: Session, category_id: int) -> Optional[CategoryModel]:
-    """Получить категорию по ID."""
-    return db.query(CategoryModel).filter(CategoryModel.id == category_id).first()
-
-def get_categories(db: Session, skip: int = 0, limit: int = 100) -> List[CategoryModel]:
-    """Получить список всех категорий."""
-    return db.query(CategoryModel).offset(skip).limit(limit).all()
-
-def create_category(db: Session, category: CategoryCreate) -> CategoryModel:
+async def create_category(db: AsyncSession, category: CategoryCreate) -> CategoryModel:
     """Создать новую категорию."""
-    db_category = CategoryModel(name=category.name)
+    # Пустой список подкатегорий задаем явно: у новой категории их нет.
+    # refresh() не вызываем — он сбросил бы загруженную связь subcategories.
+    db_category = CategoryModel(name=category.name, subcategories=[])
     db.add(db_category)
-    db.commit()
-    db.refresh(db_category)
\ No newline at end of file
+    await bump_catalog_version(db)
+    await db.commit()
+    category_tree_cache.invalidate()
+    catalog_cache.invalidate()
+    return db_category
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.category import Category as CategoryModel
+from app.schemas.category import Category as CategorySchema
+
+logger = logging.getLogger(__name__)
+
+
+class CategoryTree:
+    """
+    Неизменяемое дерево категорий, собранное из одного плоского SELECT.
+
+    Для каждой категории заранее посчитаны: готовая схема с вложенными
+    подкатегориями, цепочка предков (от корня) и множество потомков
+    (включая саму категорию). Все карты доступны только для чтения.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, str, Optional[int]]]):
+        names: Dict[int, str] = {}
+        children: Dict[Optional[int], List[int]] = defaultdict(list)
+        for category_id, name, parent_id in rows:
+            names[category_id] = name
+            children[parent_id].append(category_id)
+        for child_ids in children.values():
+            child_ids.sort()
+
+        # Обход в глубину от корней (без рекурсии). Категории, недостижимые
+        # от корня (например, из-за цикла в parent_id), в дерево не попадают.
+        ancestors: Dict[int, Tuple[int, ...]] = {}
+        order: List[int] = []
+        stack = [(root_id, ()) for root_id in reversed(children[None])]
+        while stack:
+            category_id, path = stack.pop()
+            if category_id in ancestors:
+                continue
+            ancestors[category_id] = path
+            order.append(category_id)
+            child_path = path + (category_id,)
+            stack.extend((child_id, child_path) for child_id in reversed(children[category_id]))
+
+        skipped = len(names) - len(order)
+        if skipped:
+            logger.warning(f"{skipped} категорий недостижимы от корня дерева и пропущены.")
+
+        # Схемы и потомки собираются снизу вверх, дочерние схемы переиспользуются.
+        # model_construct без валидации: данные из БД уже приняты, и одно
+        # устаревшее значение (например, name длиннее max_length) не должно
+        # ронять весь каталог.
+        schemas: Dict[int, CategorySchema] = {}
+        payloads: Dict[int, Dict[str, Any]] = {}
+        descendants: Dict[int, FrozenSet[int]] = {}
+        for category_id in reversed(order):
+            child_ids = [child_id for child_id in children[category_id] if child_id in schemas]
+            schemas[category_id] = CategorySchema.model_construct(
+                id=category_id,
+                name=names[category_id],
+                subcategories=[schemas[child_id] for child_id in child_ids],
+            )
+            # То же самое простым dict для app.core.fast_json (без model_dump на каждый товар)
+            payloads[category_id] = {
+                'id': category_id,
+                'name': names[category_id],
+                'subcategories': [payloads[child_id] for child_id in child_ids],
+            }
+            descendants[category_id] = frozenset([category_id]).union(
+                *(descendants[child_id] for child_id in child_ids)
+            )
+
+        self.nodes: Mapping[int, CategorySchema] = MappingProxyType(schemas)
+        self.payloads: Mapping[int, Dict[str, Any]] = MappingProxyType(payloads)
+        self.ancestors: Mapping[int, Tuple[int, ...]] = MappingProxyType(ancestors)
+        self.descendants: Mapping[int, FrozenSet[int]] = MappingProxyType(descendants)
+        self.roots: Tuple[CategorySchema, ...] = tuple(schemas[root_id] for root_id in children[None])
+
+    def get(self, category_id: int) -> Optional[CategorySchema]:
+        """Схема категории (с подкатегориями) или None."""
+        return self.nodes.get(category_id)
+
+    def payload(self, category_id: int) -> Optional[Dict[str, Any]]:
+        """Категория с подкатегориями в виде dict (не изменять!) или None."""
+        return self.payloads.get(category_id)
+
+    def descendant_ids(self, category_id: int) -> FrozenSet[int]:
+        """ID категории и всех ее подкатегорий (пусто, если категории нет)."""
+        return self.descendants.get(category_id, frozenset())
+
+
+class CategoryTreeCache:
+    """
+    Держит CategoryTree в памяти процесса. create_category вызывает
+    invalidate(), и следующее чтение пересобирает дерево одним запросом.
+    CATALOG_CACHE_TTL ограничивает устаревание при нескольких воркерах.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.version = 0
+        self._tree: Optional[CategoryTree] = None
+        self._tree_version = -1
+        self._built_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        self.version += 1
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._tree is not None
+            and self._tree_version == self.version
+            and (self.ttl <= 0 or time.monotonic() - self._built_at < self.ttl)
+        )
+
+    async def get(self, db: AsyncSession) -> CategoryTree:
+        if self._is_fresh():
+            return self._tree
+
+        async with self._lock:
+            if self._is_fresh():
+                return self._tree
+
+            version = self.version
+            rows = await db.execute(select(CategoryModel.id, CategoryModel.name, CategoryModel.parent_id))
+            tree = CategoryTree(rows)
+            self._tree, self._tree_version, self._built_at = tree, version, time.monotonic()
+            return tree
+
+
+category_tree_cache = CategoryTreeCache(ttl=settings.CATALOG_CACHE_TTL)
+
+async def get_category_tree(db: AsyncSession) -> CategoryTree:
+    """Актуальное дерево категорий (из памяти или одним запросом к БД)."""
+    return await category_tree_cache.get(db)
@@ -1,90 +1,177 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import catalog_cache
+from app.core.images import content_hash_of, load_manifest, variant_payloads
+from app.core.storage import storage
+from app.crud.catalog import bump_catalog_version
+from app.crud.price_history import PRICE_SOURCE_CREATE, PRICE_SOURCE_MANUAL, record_price_changes
+from app.models.image import ItemImage
 from app.models.item import Item as ItemModel
-from app.schemas.item import ItemCreate, ItemUpdate
-from typing import List, Optional
+from app.schemas.item import ItemCreate, ItemUpdate, format_image_url
+from typing import AsyncIterator, Collection, List, Optional, Tuple
 from sqlalchemy import select
-# --- Вспомогательные функции для работы с image_urls ---
-
-# 1. Конвертирует список URL в строку для сохранения в БД
-def _list_to_str(urls: List[str]) -> str:
-    """Преобразует список URL в строку, разделенную запятыми, для хранения в базе данных."""
-    # Убеждаемся, что все элементы - строки и объединяем их.
-    return ",".join(str(url).strip() for url in urls) if urls else ""
-
-# 2. Конвертирует строку из БД обратно в список URL
-def _str_to_list(url_str: Optional[str]) -> List[str]:
-    """Преобразует строку URL из базы данных обратно в список."""
-    if not url_str:
-        return []
-    # Фильтруем пустые строки, которые могут возникнуть из-за лишних запятых
-    return [url.strip() for url in url_str.split(',') if url.strip()]
+# --- Вспомогательные функции для работы с изображениями ---
+
+async def _build_images(urls: List[str]) -> List[ItemImage]:
+    """
+    Строки изображений товара по списку URL (порядок = позиция в галерее).
+    Абсолютный URL вычисляется здесь, один раз при записи, а не при каждом чтении.
+    """
+    images = []
+    for url in urls:
+        absolute_url = format_image_url(str(url).strip()) if url else ''
+        if not absolute_url:
+            continue
+        image = ItemImage(position=len(images), url=absolute_url)
+        # Для загруженных через /upload/images/ — хеш, размеры, уменьшенные копии и заглушка
+        parts = storage.key_from_url(absolute_url)
+        if parts:
+            base_url, relative_path = parts
+            image.content_hash = content_hash_of(relative_path)
+            metadata = await load_manifest(relative_path)
+            if metadata:
+                image.width, image.height = metadata['width'], metadata['height']
+                image.placeholder = metadata.get('placeholder')
+                image.variants = variant_payloads(metadata, base_url)
+        images.append(image)
+    return images
 
 # ----------------------------------------------------------------------
 # --- CRUD-операции ---
 # ----------------------------------------------------------------------
 
-def get_item(db: Session, item_id: int) -> Optional[ItemModel]:
+async def get_item(db: AsyncSession, item_id: int) -> Optional[ItemModel]:
     """Получить товар по ID."""
-    return db.query(ItemModel).filter(ItemModel.id == item_id).first()
+    return await db.get(ItemModel, item_id)
 
-def get_items(db: Session, skip: int = 0, limit: int = 100) -> List[ItemModel]:
+async def get_items(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[ItemModel]:
     """
     Получает список всех товаров из базы данных.
     """
     # Используем SQLAlchemy 2.0 style select
-    statement = select(ItemModel).offset(skip).limit(limit)
+    statement = select(ItemModel).order_by(ItemModel.id).offset(skip).limit(limit)
     
     # Выполняем запрос и возвращаем список объектов модели
-    items = db.execute(statement).scalars().all()
+    items = (await db.scalars(statement)).all()
     
-    return items
+    return list(items)
+
+
+async def get_items_page(
+    db: AsyncSession,
+    *,
+    after_id: Optional[int] = None,
+    limit: int = 100,
+    category_ids: Optional[Collection[int]] = None,
+    is_active: Optional[bool] = True,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    memory: Optional[str] = None,
+    color: Optional[str] = None,
+) -> List[ItemModel]:
+    """
+    Страница товаров с фильтрами и keyset-пагинацией по id.
+
+    Вместо OFFSET используется условие id > after_id (ID последнего товара
+    предыдущей страницы), поэтому любая страница читается по индексу
+    за одинаковое время. category_ids — категория вместе со всеми подкатегориями
+    (см. CategoryTree.descendant_ids).
+    """
+    statement = select(ItemModel)
+
+    if after_id is not None:
+        statement = statement.where(ItemModel.id > after_id)
+    if category_ids is not None:
+        statement = statement.where(ItemModel.category_id.in_(category_ids))
+    if is_active is not None:
+        statement = statement.where(ItemModel.is_active == is_active)
+    if min_price is not None:
+        statement = statement.where(ItemModel.price >= min_price)
+    if max_price is not None:
+        statement = statement.where(ItemModel.price <= max_price)
+    if memory is not None:
+        statement = statement.where(ItemModel.memory == memory)
+    if color is not None:
+        statement = statement.where(ItemModel.color == color)
 
+    statement = statement.order_by(ItemModel.id).limit(limit)
+    return list((await db.scalars(statement)).all())
 
-def get_active_items(db: Session, skip: int = 0, limit: int = 100) -> List[ItemModel]:
-    """Получить список активных товаров."""
-    return db.query(ItemModel).filter(ItemModel.is_active == True).offset(skip).limit(limit).all()
 
-def create_item(db: Session, item: ItemCreate) -> ItemModel:
+# Колонки краткого списка для Админа (схема ItemAdminList)
+ADMIN_LIST_COLUMNS = (ItemModel.id, ItemModel.name, ItemModel.price, ItemModel.memory, ItemModel.color)
+
+async def stream_admin_rows(
+    db: AsyncSession,
+    *,
+    is_active: Optional[bool] = None,
+    chunk_size: int = 1000,
+) -> AsyncIterator[List[Tuple[int, str, float, Optional[str], Optional[str]]]]:
+    """
+    Краткий список товаров (id, name, price, memory, color) пачками по chunk_size.
+    Выбираются только эти колонки, без ORM-объектов, изображений и категорий;
+    строки читаются курсором (yield_per), а не загружаются все сразу.
+    """
+    statement = select(*ADMIN_LIST_COLUMNS).order_by(ItemModel.id)
+    if is_active is not None:
+        statement = statement.where(ItemModel.is_active == is_active)
+
+    result = await db.stream(statement.execution_options(yield_per=chunk_size))
+    async for partition in result.tuples().partitions():
+        yield partition
+
+async def create_item(db: AsyncSession, item: ItemCreate) -> ItemModel:
     """Создать новый товар, используя model_dump для автоматического сбора полей."""
     
-    # 1. Преобразуем список URL в строку для сохранения в БД
-    image_urls_str = _list_to_str(item.image_urls)
-    
-    # 2. 💡 Рефакторинг: Используем model_dump, чтобы автоматически получить все поля,
+    # 1. 💡 Рефакторинг: Используем model_dump, чтобы автоматически получить все поля,
     # исключая 'image_urls' (которое является списком)
     item_data = item.model_dump(exclude={'image_urls'})
 
-    # 3. Создаем модель, используя распакованные данные и добавляя строку URL
+    # 2. Создаем модель, используя распакованные данные; изображения — отдельными строками
     db_item = ItemModel(
         **item_data,
-        image_url=image_urls_str  # Сохраняем строку в правильное поле БД (image_url)
+        images=await _build_images(item.image_urls),
     )
     
     db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    # flush — чтобы получить ID для первой записи в истории цен
+    await db.flush()
+    await record_price_changes(db, [(db_item.id, None, db_item.price)], source=PRICE_SOURCE_CREATE)
+    await bump_catalog_version(db)
+    await db.commit()
+    catalog_cache.invalidate()
+    await db.refresh(db_item)
     return db_item
 
-def update_item(db: Session, db_item: ItemModel, item_update: ItemUpdate) -> ItemModel:
+async def update_item(db: AsyncSession, db_item: ItemModel, item_update: ItemUpdate) -> ItemModel:
     """Обновить существующий товар."""
     update_data = item_update.model_dump(exclude_unset=True)
 
     # 💡 ИСПРАВЛЕНИЕ: Обрабатываем обновление списка URL-адресов.
     if 'image_urls' in update_data:
-        image_urls_list = update_data.pop('image_urls')
-        # Преобразуем список URL в строку для сохранения в БД.
-        # Заменяем Pydantic-ключ 'image_urls' на SQLAlchemy-ключ 'image_url'.
-        update_data['image_url'] = _list_to_str(image_urls_list) 
+        image_urls_list = update_data.pop('image_urls') or []
+        # Старые строки изображений удаляются (delete-orphan), новые вставляются.
+        # flush() между ними нужен, чтобы не нарушить уникальность (item_id, position).
+        db_item.images = []
+        await db.flush()
+        db_item.images = await _build_images(image_urls_list)
+
+    # Изменение цены попадает в историю (в той же транзакции)
+    if update_data.get('price') is not None and update_data['price'] != db_item.price:
+        await record_price_changes(
+            db, [(db_item.id, db_item.price, update_data['price'])], source=PRICE_SOURCE_MANUAL
+        )
 
     for key, value in update_data.items():
         # Устанавливаем атрибуты модели БД на основе данных обновления
         setattr(db_item, key, value)
         
-    db.commit()
-    db.refresh(db_item)
+    await bump_catalog_version(db)
+    await db.commit()
+    catalog_cache.invalidate()
+    await db.refresh(db_item)
     return db_item
 
-def delete_item(db: Session, item_id: int) -> bool:
+async def delete_item(db: AsyncSession, item_id: int) -> bool:
     """
     Удаляет товар из базы данных по ID.
 
@@ -92,14 +179,13 @@ def delete_item(db: Session, item_id: int) -> bool:
     :param item_id: ID удаляемого товара.
     :return: True, если товар был найден и удален, False в противном случае.
     """
-    # Предполагается, что Item — это ваша модель SQLAlchemy
-    from app.models.item import Item # Убедитесь, что эта строка соответствует вашему пути импорта
-    
-    db_item = db.query(Item).filter(Item.id == item_id).first()
+    db_item = await db.get(ItemModel, item_id)
     
     if db_item is None:
         return False # Товар не найден
         
-    db.delete(db_item)
-    db.commit()
+    await db.delete(db_item)
+    await bump_catalog_version(db)
+    await db.commit()
+    catalog_cache.invalidate()
     return True # Успешно удалено
\ No newline at end of file
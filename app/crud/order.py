@@ -0,0 +1,120 @@
+import re
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud.outbox import OUTBOX_CHANNEL_TELEGRAM, enqueue_message
+from app.crud.price_history import as_utc, utc_now
+from app.models.order import Order as OrderModel, OrderItem as OrderItemModel
+from app.schemas.order import OrderSubmission
+
+ORDER_STATUS_NEW = "new"
+
+
+def normalize_phone(phone: str) -> str:
+    """Только цифры; российский номер с 8 в начале приводится к 7 (8 999... == +7 999...)."""
+    digits = re.sub(r"\D", "", phone)
+    if len(digits) == 11 and digits.startswith("8"):
+        digits = "7" + digits[1:]
+    return digits[:20]
+
+
+async def get_order_by_idempotency_key(db: AsyncSession, idempotency_key: str) -> Optional[OrderModel]:
+    return await db.scalar(select(OrderModel).where(OrderModel.idempotency_key == idempotency_key))
+
+
+async def create_order(
+    db: AsyncSession,
+    order: OrderSubmission,
+    idempotency_key: Optional[str] = None,
+    notification: Optional[Callable[[int], str]] = None,
+) -> Tuple[OrderModel, bool]:
+    """
+    Сохраняет заказ и его позиции в одной транзакции: INSERT заказа (ID из
+    последовательности БД) + один INSERT на все позиции (executemany).
+
+    Возвращает (заказ, создан ли он сейчас). С idempotency_key повторный
+    запрос возвращает уже сохраненный заказ, в том числе при гонке двух
+    одновременных запросов (уникальный индекс).
+
+    notification(order_id) — текст уведомления админу: оно пишется в outbox
+    в той же транзакции и отправляется в фоне (app.core.outbox).
+    """
+    if idempotency_key:
+        existing = await get_order_by_idempotency_key(db, idempotency_key)
+        if existing is not None:
+            return existing, False
+
+    db_order = OrderModel(
+        idempotency_key=idempotency_key,
+        created_at=utc_now(),
+        status=ORDER_STATUS_NEW,
+        fio=order.fio,
+        phone=order.phone,
+        phone_digits=normalize_phone(order.phone),
+        email=order.email,
+        telegram_username=order.telegram_username,
+        address=order.address,
+        comment=order.comment,
+        delivery_method=order.delivery_method,
+        payment_method=order.payment_method,
+        total_price=order.total_price,
+    )
+    db.add(db_order)
+    try:
+        await db.flush()
+        if order.items:
+            await db.execute(insert(OrderItemModel), [
+                {
+                    'order_id': db_order.id,
+                    'position': position,
+                    'name': item.name,
+                    'price': item.price,
+                    'memory': item.memory,
+                    'color': item.color,
+                }
+                for position, item in enumerate(order.items)
+            ])
+        if notification is not None:
+            enqueue_message(db, OUTBOX_CHANNEL_TELEGRAM, {
+                'chat_id': settings.ADMIN_ID,
+                'text': notification(db_order.id),
+                # Текст размечен HTML, данные клиента экранированы (см. format_order_message)
+                'parse_mode': 'HTML',
+            })
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        if idempotency_key:
+            existing = await get_order_by_idempotency_key(db, idempotency_key)
+            if existing is not None:
+                return existing, False
+        raise
+    return db_order, True
+
+
+async def get_order(db: AsyncSession, order_id: int) -> Optional[OrderModel]:
+    return await db.get(OrderModel, order_id)
+
+
+async def find_orders(
+    db: AsyncSession,
+    phone: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    limit: int = 100,
+) -> List[OrderModel]:
+    """Заказы по телефону (в любом формате) и/или периоду, новые первыми."""
+    statement = select(OrderModel)
+    if phone:
+        statement = statement.where(OrderModel.phone_digits == normalize_phone(phone))
+    if created_from is not None:
+        statement = statement.where(OrderModel.created_at >= as_utc(created_from))
+    if created_to is not None:
+        statement = statement.where(OrderModel.created_at < as_utc(created_to))
+    statement = statement.order_by(OrderModel.created_at.desc(), OrderModel.id.desc()).limit(limit)
+    return list((await db.scalars(statement)).all())
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.price_history import utc_now
+from app.models.outbox import OutboxMessage
+
+OUTBOX_CHANNEL_TELEGRAM = "telegram"
+
+OUTBOX_PENDING = "pending"
+OUTBOX_SENT = "sent"
+OUTBOX_FAILED = "failed"
+
+
+def enqueue_message(db: AsyncSession, channel: str, payload: Dict[str, Any]) -> OutboxMessage:
+    """
+    Добавляет сообщение в outbox текущей транзакции (без commit): оно будет
+    отправлено, только если транзакция с данными зафиксирована.
+    """
+    now = utc_now()
+    message = OutboxMessage(
+        channel=channel, payload=payload, status=OUTBOX_PENDING, attempts=0, available_at=now, created_at=now,
+    )
+    db.add(message)
+    return message
+
+
+async def claim_due_messages(db: AsyncSession, limit: int, lease: float) -> List[OutboxMessage]:
+    """
+    Забирает до limit готовых к отправке сообщений и сдвигает их available_at на
+    lease секунд (аренда): другие воркеры их не возьмут, а если процесс упадет
+    во время отправки, сообщение вернется в работу после окончания аренды.
+    В Postgres строки блокируются FOR UPDATE SKIP LOCKED — воркеры не ждут друг друга.
+    """
+    now = utc_now()
+    statement = (
+        select(OutboxMessage)
+        .where(OutboxMessage.status == OUTBOX_PENDING, OutboxMessage.available_at <= now)
+        .order_by(OutboxMessage.available_at, OutboxMessage.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    messages = list((await db.scalars(statement)).all())
+    if messages:
+        await db.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_([message.id for message in messages]))
+            .values(available_at=now + timedelta(seconds=lease))
+        )
+    await db.commit()
+    return messages
+
+
+async def mark_sent(db: AsyncSession, message_id: int) -> None:
+    await db.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.id == message_id)
+        .values(status=OUTBOX_SENT, sent_at=utc_now(), attempts=OutboxMessage.attempts + 1, last_error=None)
+    )
+    await db.commit()
+
+
+async def mark_failed_attempt(
+    db: AsyncSession, message_id: int, error: str, retry_at: Optional[datetime]
+) -> None:
+    """Неудачная попытка: повтор в retry_at или окончательная ошибка (retry_at=None)."""
+    values: Dict[str, Any] = {'attempts': OutboxMessage.attempts + 1, 'last_error': error[:2000]}
+    if retry_at is None:
+        values['status'] = OUTBOX_FAILED
+    else:
+        values['available_at'] = retry_at
+    await db.execute(update(OutboxMessage).where(OutboxMessage.id == message_id).values(**values))
+    await db.commit()
@@ -0,0 +1,124 @@
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import DateTime, String, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.item import Item as ItemModel
+from app.models.price_history import PriceHistory
+
+PRICE_SOURCE_CREATE = "create"
+PRICE_SOURCE_MANUAL = "manual"
+PRICE_SOURCE_UPLOAD = "upload"
+PRICE_SOURCE_RESTORE = "restore"
+
+
+def new_batch_id() -> str:
+    return uuid.uuid4().hex
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def as_utc(moment: datetime) -> datetime:
+    """Время без часового пояса считаем UTC (так же оно хранится в SQLite)."""
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+async def record_price_changes(
+    db: AsyncSession,
+    changes: Iterable[Tuple[int, Optional[float], float]],
+    source: str,
+    batch_id: Optional[str] = None,
+    changed_at: Optional[datetime] = None,
+) -> None:
+    """
+    Добавляет в журнал изменения (item_id, old_price, price) одним
+    INSERT на пачку (executemany). commit() делает вызывающий код.
+    """
+    changed_at = changed_at or utc_now()
+    rows = [
+        {
+            'item_id': item_id, 'old_price': old_price, 'price': price,
+            'changed_at': changed_at, 'source': source, 'batch_id': batch_id,
+        }
+        for item_id, old_price, price in changes
+    ]
+    if rows:
+        await db.execute(insert(PriceHistory), rows)
+
+
+async def get_price_history(db: AsyncSession, item_id: int, limit: int = 100) -> List[PriceHistory]:
+    """Изменения цены товара, новые первыми."""
+    statement = (
+        select(PriceHistory)
+        .where(PriceHistory.item_id == item_id)
+        .order_by(PriceHistory.changed_at.desc(), PriceHistory.id.desc())
+        .limit(limit)
+    )
+    return list((await db.scalars(statement)).all())
+
+
+async def get_batch_started_at(db: AsyncSession, batch_id: str) -> Optional[datetime]:
+    """Время операции batch_id (None, если такой нет)."""
+    return await db.scalar(select(func.min(PriceHistory.changed_at)).where(PriceHistory.batch_id == batch_id))
+
+
+def _snapshot_at(moment: datetime, inclusive: bool):
+    """Подзапрос (item_id, price): последняя цена каждого товара на момент moment."""
+    moment_filter = PriceHistory.changed_at <= moment if inclusive else PriceHistory.changed_at < moment
+    ranked = (
+        select(
+            PriceHistory.item_id,
+            PriceHistory.price,
+            func.row_number().over(
+                partition_by=PriceHistory.item_id,
+                order_by=(PriceHistory.changed_at.desc(), PriceHistory.id.desc()),
+            ).label('rn'),
+        )
+        .where(moment_filter)
+        .subquery('ranked')
+    )
+    return select(ranked.c.item_id, ranked.c.price).where(ranked.c.rn == 1).subquery('snapshot')
+
+
+async def restore_price_snapshot(db: AsyncSession, moment: datetime, inclusive: bool = True) -> Dict[str, object]:
+    """
+    Возвращает цены всех товаров к состоянию на момент moment (без commit).
+
+    Оба шага — по одному оператору на весь каталог, без строк в Python:
+    INSERT ... SELECT пишет откат в журнал, UPDATE ... FROM меняет цены.
+    Затрагиваются только товары, чья цена отличается от снимка; товары без
+    истории на тот момент (созданные позже) не меняются.
+    """
+    moment = as_utc(moment)
+    batch_id = new_batch_id()
+    changed_at = utc_now()
+    snapshot = _snapshot_at(moment, inclusive)
+    differs = ItemModel.price != snapshot.c.price
+
+    await db.execute(
+        insert(PriceHistory).from_select(
+            ['item_id', 'old_price', 'price', 'changed_at', 'source', 'batch_id'],
+            select(
+                ItemModel.id,
+                ItemModel.price,
+                snapshot.c.price,
+                literal(changed_at, DateTime(timezone=True)),
+                literal(PRICE_SOURCE_RESTORE, String),
+                literal(batch_id, String),
+            ).join(snapshot, snapshot.c.item_id == ItemModel.id).where(differs),
+        )
+    )
+    # Строки отката выше (если и попадут в снимок) несут ту же цену — результат не меняется
+    result = await db.execute(
+        update(ItemModel)
+        .where(ItemModel.id == snapshot.c.item_id, differs)
+        .values(price=snapshot.c.price)
+        .execution_options(synchronize_session=False)
+    )
+    return {"restored": result.rowcount, "batch_id": batch_id, "snapshot_at": moment}
@@ -0,0 +1,133 @@
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Float, Integer, column, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import catalog_cache
+from app.core.price_list_io import PriceImportStats, PriceListFormat, next_price_chunk, read_price_list_rows
+from app.crud.catalog import bump_catalog_version
+from app.crud.price_history import PRICE_SOURCE_UPLOAD, new_batch_id, record_price_changes, utc_now
+from app.models.item import Item as ItemModel
+
+# Колонки прайс-листа в порядке файла: ID, Название, Память, Цвет, Цена
+PRICE_LIST_COLUMNS = (ItemModel.id, ItemModel.name, ItemModel.memory, ItemModel.color, ItemModel.price)
+
+PriceListRow = Tuple[int, str, Optional[str], Optional[str], Optional[float]]
+
+
+async def stream_price_list_rows(db: AsyncSession, chunk_size: int = 1000) -> AsyncIterator[List[PriceListRow]]:
+    """
+    Строки прайс-листа пачками по chunk_size.
+    Только нужные колонки, курсором (yield_per; в Postgres — серверный курсор),
+    поэтому в памяти одновременно не больше одной пачки.
+    """
+    statement = (
+        select(*PRICE_LIST_COLUMNS)
+        .order_by(ItemModel.name, ItemModel.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    result = await db.stream(statement)
+    async for partition in result.tuples().partitions():
+        yield partition
+
+
+async def get_current_prices(db: AsyncSession) -> Dict[int, Optional[float]]:
+    """Текущие цены всех товаров {id: price} — одним запросом по двум колонкам."""
+    result = await db.execute(select(ItemModel.id, ItemModel.price))
+    return dict(result.tuples().all())
+
+
+async def apply_price_updates(
+    db: AsyncSession,
+    updates: List[Dict[str, float]],
+    batch_id: Optional[str] = None,
+    changed_at: Optional[datetime] = None,
+) -> None:
+    """
+    Записывает одну пачку цен [{'id': ..., 'price': ..., 'old_price': ...}] (без commit)
+    и добавляет её в историю цен (один INSERT на пачку).
+
+    Postgres: один UPDATE ... FROM (VALUES ...) на пачку — один оператор и
+    один проход по индексу вместо отдельного UPDATE на каждую строку.
+    Остальные СУБД (SQLite) не умеют VALUES с именами колонок, там —
+    executemany UPDATE по первичному ключу.
+    """
+    if not updates:
+        return
+
+    await record_price_changes(
+        db,
+        ((row['id'], row.get('old_price'), row['price']) for row in updates),
+        source=PRICE_SOURCE_UPLOAD, batch_id=batch_id, changed_at=changed_at,
+    )
+
+    if db.get_bind().dialect.name == "postgresql":
+        new_prices = values(
+            column('id', Integer), column('price', Float), name='new_prices'
+        ).data([(row['id'], row['price']) for row in updates])
+        await db.execute(
+            update(ItemModel)
+            .where(ItemModel.id == new_prices.c.id)
+            .values(price=new_prices.c.price)
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        await db.execute(update(ItemModel), [{'id': row['id'], 'price': row['price']} for row in updates])
+
+
+class PriceListImportError(ValueError):
+    """Файл прочитан, но применить его нельзя (например, нет ни одной валидной строки)."""
+
+
+async def import_price_list(
+    db: AsyncSession,
+    file: BinaryIO,
+    price_format: PriceListFormat,
+    chunk_size: int = 1000,
+    on_progress: Optional[Callable[[Dict[str, int]], Awaitable[None]]] = None,
+) -> Dict[str, Any]:
+    """
+    Применяет прайс-лист: разбор в пуле потоков пачками по chunk_size строк,
+    сравнение с текущими ценами, запись только измененных строк. Все пачки —
+    в одной транзакции. После каждой пачки вызывается on_progress(счетчики).
+    """
+    rows = read_price_list_rows(file, price_format)
+    stats = PriceImportStats()
+    # Все изменения загрузки — одна операция в истории цен (для отката)
+    batch_id, changed_at = new_batch_id(), utc_now()
+    try:
+        current_prices = await get_current_prices(db)
+        while (chunk := await run_in_threadpool(
+            next_price_chunk, rows, chunk_size, current_prices, stats
+        )) is not None:
+            await apply_price_updates(db, chunk, batch_id=batch_id, changed_at=changed_at)
+            if on_progress is not None:
+                await on_progress(stats.counts())
+
+        if not stats.valid:
+            raise PriceListImportError("Файл не содержит валидных данных для обновления цен.")
+
+        if stats.changed:
+            await bump_catalog_version(db)
+            await db.commit()
+            catalog_cache.invalidate()
+    except BaseException:
+        await db.rollback()
+        raise
+    finally:
+        rows.close()
+
+    return {
+        "status": "success",
+        "updated": stats.changed,
+        "unchanged": stats.unchanged,
+        "unknown": stats.unknown,
+        "invalid": stats.invalid,
+        # Совместимость со старыми клиентами: все непримененные строки с ошибками
+        "skipped": stats.unknown + stats.invalid,
+        "errors": stats.errors if stats.errors else None,
+        # Откат этой загрузки: POST /price-list/snapshots/restore?before_batch_id=...
+        "batch_id": batch_id if stats.changed else None,
+    }
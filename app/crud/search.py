@@ -0,0 +1,165 @@
+import heapq
+import re
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, func, literal_column, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import catalog_cache
+from app.core.config import settings
+from app.models.item import Item as ItemModel, SEARCH_VECTOR_SQL
+
+# Вес совпадения по полю для in-memory индекса: название важнее описания
+FIELD_WEIGHTS = {"name": 1.0, "memory": 0.6, "color": 0.6, "description": 0.2}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(value: Optional[str]) -> List[str]:
+    """Разбивает строку на слова в нижнем регистре."""
+    return _TOKEN_RE.findall(value.lower()) if value else []
+
+def _prefix_tsquery(terms: Sequence[str]) -> str:
+    """'iphone 15' -> 'iphone:* & 15:*' (все слова обязательны, каждое как префикс)."""
+    return " & ".join(f"{term}:*" for term in terms)
+
+# ----------------------------------------------------------------------
+# --- Postgres: tsvector + GIN-индекс ---
+# ----------------------------------------------------------------------
+
+async def _search_postgres(
+    db: AsyncSession, terms: Sequence[str], limit: int, is_active: Optional[bool]
+) -> List[ItemModel]:
+    vector = literal_column(SEARCH_VECTOR_SQL)
+    query = func.to_tsquery(text("'simple'"), _prefix_tsquery(terms))
+    rank = func.ts_rank(vector, query)
+
+    statement = select(ItemModel).where(vector.op("@@")(query))
+    if is_active is not None:
+        statement = statement.where(ItemModel.is_active == is_active)
+    statement = statement.order_by(rank.desc(), ItemModel.id).limit(limit)
+    return list((await db.scalars(statement)).all())
+
+# ----------------------------------------------------------------------
+# --- In-memory индекс (SQLite / dev) ---
+# ----------------------------------------------------------------------
+
+class ItemSearchIndex:
+    """
+    Обратный индекс по словам товаров с поиском по префиксу.
+    Слова хранятся в отсортированном списке, поэтому все слова с нужным
+    префиксом находятся двоичным поиском, без перебора каталога.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, bool, Optional[str], Optional[str], Optional[str], Optional[str]]]):
+        postings: Dict[str, Dict[int, float]] = {}
+        self.is_active: Dict[int, bool] = {}
+
+        for item_id, is_active, name, description, memory, color in rows:
+            self.is_active[item_id] = bool(is_active)
+            fields = {"name": name, "description": description, "memory": memory, "color": color}
+            for field, value in fields.items():
+                weight = FIELD_WEIGHTS[field]
+                for token in tokenize(value):
+                    item_weights = postings.setdefault(token, {})
+                    if item_weights.get(item_id, 0.0) < weight:
+                        item_weights[item_id] = weight
+
+        self._postings = postings
+        self._tokens = sorted(postings)
+
+    def _match_prefix(self, prefix: str) -> Dict[int, float]:
+        """{item_id: вес} для всех слов, начинающихся с prefix (точное совпадение весит больше)."""
+        matches: Dict[int, float] = {}
+        position = bisect_left(self._tokens, prefix)
+        while position < len(self._tokens) and self._tokens[position].startswith(prefix):
+            token = self._tokens[position]
+            bonus = 1.0 if token == prefix else 0.5
+            for item_id, weight in self._postings[token].items():
+                score = weight * bonus
+                if matches.get(item_id, 0.0) < score:
+                    matches[item_id] = score
+            position += 1
+        return matches
+
+    def search(self, terms: Sequence[str], limit: int, is_active: Optional[bool] = True) -> List[int]:
+        """ID товаров, где встречаются ВСЕ слова запроса, по убыванию релевантности."""
+        scores: Optional[Dict[int, float]] = None
+        for term in terms:
+            matches = self._match_prefix(term)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {item_id: score + matches[item_id] for item_id, score in scores.items() if item_id in matches}
+            if not scores:
+                return []
+
+        candidates = (
+            (score, -item_id) for item_id, score in (scores or {}).items()
+            if is_active is None or self.is_active.get(item_id) == is_active
+        )
+        # Полная сортировка не нужна — берем только limit лучших
+        return [-negative_id for _, negative_id in heapq.nlargest(limit, candidates)]
+
+
+class _MemoryIndexHolder:
+    """Держит in-memory индекс и пересобирает его после изменений каталога."""
+
+    def __init__(self):
+        self.index: Optional[ItemSearchIndex] = None
+        self.version = -1
+        self.built_at = 0.0
+
+    def is_fresh(self) -> bool:
+        ttl = settings.CATALOG_CACHE_TTL
+        return (
+            self.index is not None
+            and self.version == catalog_cache.version
+            and (ttl <= 0 or time.monotonic() - self.built_at < ttl)
+        )
+
+    async def get(self, db: AsyncSession) -> ItemSearchIndex:
+        if not self.is_fresh():
+            version = catalog_cache.version
+            rows = await db.execute(
+                select(
+                    ItemModel.id, ItemModel.is_active, ItemModel.name,
+                    ItemModel.description, ItemModel.memory, ItemModel.color,
+                )
+            )
+            self.index = ItemSearchIndex(rows.tuples())
+            self.version = version
+            self.built_at = time.monotonic()
+        return self.index
+
+
+_memory_index = _MemoryIndexHolder()
+
+async def _search_memory(
+    db: AsyncSession, terms: Sequence[str], limit: int, is_active: Optional[bool]
+) -> List[ItemModel]:
+    index = await _memory_index.get(db)
+    item_ids = index.search(terms, limit=limit, is_active=is_active)
+    if not item_ids:
+        return []
+    items = {item.id: item for item in await db.scalars(select(ItemModel).where(ItemModel.id.in_(item_ids)))}
+    return [items[item_id] for item_id in item_ids if item_id in items]
+
+# ----------------------------------------------------------------------
+
+async def search_items(
+    db: AsyncSession, query: str, limit: int = 20, is_active: Optional[bool] = True
+) -> List[ItemModel]:
+    """
+    Поиск товаров по названию, описанию, памяти и цвету.
+    Каждое слово запроса ищется как префикс ('айф 12' найдет 'Айфон 12 Pro'),
+    результаты отсортированы по релевантности.
+    Postgres ищет по GIN-индексу, остальные БД (SQLite) — по in-memory индексу.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return await _search_postgres(db, terms, limit, is_active)
+    return await _search_memory(db, terms, limit, is_active)
@@ -0,0 +1,77 @@
+import logging
+import time
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+logger = logging.getLogger(__name__)
+
+
+class PoolWaitStats:
+    """Накопительная статистика получения соединений из пула."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait_seconds: float) -> None:
+        self.checkouts += 1
+        self.total_wait += wait_seconds
+        self.max_wait = max(self.max_wait, wait_seconds)
+
+
+pool_wait_stats = PoolWaitStats()
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool, который замеряет время ожидания соединения.
+    В замер входит и ожидание свободного слота, и pre-ping, и открытие
+    нового соединения — то есть все, что запрос ждет до первого SQL.
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            pool_wait_stats.timeouts += 1
+            logger.warning(
+                "Пул соединений исчерпан: %s. Проверьте DB_POOL_SIZE / DB_MAX_OVERFLOW.",
+                self.status(),
+            )
+            raise
+        finally:
+            pool_wait_stats.record(time.perf_counter() - started)
+
+
+def get_pool_metrics(engine: AsyncEngine) -> Dict[str, Any]:
+    """Снимок состояния пула: занятые, свободные и overflow-соединения, время ожидания."""
+    pool = engine.sync_engine.pool
+    stats = pool_wait_stats
+    metrics: Dict[str, Any] = {"pool_class": type(pool).__name__}
+
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        metrics.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            # overflow() отрицателен, пока в пуле есть незанятые слоты
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+        )
+
+    metrics.update(
+        checkouts=stats.checkouts,
+        timeouts=stats.timeouts,
+        avg_wait_ms=round(stats.total_wait / stats.checkouts * 1000, 3) if stats.checkouts else 0.0,
+        max_wait_ms=round(stats.max_wait * 1000, 3),
+    )
+    return metrics
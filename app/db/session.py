@@ -1,10 +1,40 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from app.core.config import settings
+from app.db.pool import InstrumentedAsyncPool
 
-# Настройка движка и сессии
-engine = create_engine(
-    settings.DATABASE_URL # Только для SQLite
-    
+# Синхронные драйверы из DATABASE_URL заменяем на их асинхронные аналоги,
+# чтобы .env не приходилось менять при переходе на AsyncSession.
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def _to_async_url(database_url: str):
+    """Возвращает URL базы данных с асинхронным драйвером."""
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.drivername)
+    return url.set(drivername=driver) if driver else url
+
+# Настройка асинхронного движка и сессии.
+# Параметры пула берутся из Settings, чтобы подбирать их под нагрузку без правки кода.
+engine = create_async_engine(
+    _to_async_url(settings.DATABASE_URL),
+    poolclass=InstrumentedAsyncPool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+
+# expire_on_commit=False: после commit объекты остаются читаемыми
+# без повторного (ленивого) запроса, который в async-режиме запрещен.
+AsyncSessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
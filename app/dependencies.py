@@ -1,9 +1,10 @@
-from app.db.session import SessionLocal
+from typing import AsyncIterator
 
-def get_db():
-    """Зависимость для получения сессии базы данных."""
-    db = SessionLocal()
-    try:
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionLocal
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """Зависимость для получения асинхронной сессии базы данных."""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
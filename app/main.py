@@ -49,6 +49,8 @@
 #     tags=["orders"]
 # )
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from app.api.v1.endpoints import items
 # --- ИМПОРТЫ РОУТЕРОВ ---
@@ -57,27 +59,47 @@ from app.api.v1.endpoints import orders
 # 💡 НОВЫЙ ИМПОРТ ДЛЯ ЗАГРУЗКИ ФАЙЛОВ
 from app.api.v1.endpoints import uploads
 # 💡 НОВЫЙ ИМПОРТ ДЛЯ РАЗДАЧИ СТАТИЧЕСКИХ ФАЙЛОВ
-from fastapi.staticfiles import StaticFiles 
+from app.core.static_files import ImageStaticFiles
+from app.core.storage import UPLOAD_FOLDER
 # 💡 НОВЫЙ ИМПОРТ ДЛЯ ПРАЙС-ЛИСТА
 from app.api.v1.endpoints import price_list
+from app.api.v1.endpoints import health
 # -------------------------
 
 # Импортируем только те модели SQLAlchemy, которые мы используем
 from app.db.base import Base 
 from app.db.session import engine 
-from app.models import item, category
+from app.models import item, category, catalog, image, price_history, order, outbox
+
+# Фоновые воркеры (запуск и остановка — в lifespan)
+from app.core.jobs import job_queue
+from app.core.outbox import outbox_dispatcher
+from app.core.images import shutdown_image_pool
 
 from fastapi.middleware.cors import CORSMiddleware
 
-# Создаем таблицы в БД.
-Base.metadata.create_all(bind=engine) 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Создаем таблицы в БД (metadata.create_all синхронный, поэтому через run_sync).
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    # Воркеры фоновых задач (импорт прайс-листа)
+    await job_queue.start()
+    # Отправка уведомлений из outbox (заказы -> Telegram)
+    await outbox_dispatcher.start()
+    yield
+    await outbox_dispatcher.stop()
+    await job_queue.stop()
+    shutdown_image_pool()
+    # Закрываем пул соединений при остановке приложения
+    await engine.dispose()
 
 app = FastAPI(
     title="Telegram Mini App Shop Backend",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
-app.mount("/static/images", StaticFiles(directory="uploaded_images"), name="static_images")
 # Настройки CORS
 origins = [
     "http://127.0.0.1:5500", 
@@ -93,17 +115,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Заголовок пагинации каталога должен быть доступен JS Mini App
+    expose_headers=["X-Next-Cursor"],
 )
 
 # 💡 РЕГИСТРАЦИЯ СТАТИЧЕСКОЙ ПАПКИ 
 # Путь /static/images/ будет обслуживать содержимое папки 'uploaded_images'
-app.mount("/static/images", StaticFiles(directory="uploaded_images"), name="static_images")
+# (immutable-кэш для имен по хешу, выбор WebP/AVIF по Accept — см. app.core.static_files)
+app.mount("/static/images", ImageStaticFiles(directory=UPLOAD_FOLDER), name="static_images")
 
 
 # Подключаем роуты для товаров
 app.include_router(
     items.router, 
-    prefix="/api/v1/items", 
+    prefix="/api/v1", 
     tags=["Items (Products)"]
 )
 
@@ -131,4 +156,9 @@ app.include_router(
     price_list.router,
     prefix="/api/v1",
     tags=["Price List"]
+)
+app.include_router(
+    health.router,
+    prefix="/api/v1",
+    tags=["Health"]
 )
\ No newline at end of file
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, DateTime
+
+from app.db.base import Base
+
+class CatalogVersion(Base):
+    """
+    Версия каталога (одна строка). Увеличивается в той же транзакции,
+    что и любая запись в товары/категории, поэтому общая для всех воркеров.
+    Используется как ETag / Last-Modified клиентских роутов.
+    """
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
@@ -24,11 +24,15 @@ class Category(Base):
     # 2. Связь "Один-ко-Многим" (one-to-many)
     #    'subcategories' - это список дочерних объектов Category, 
     #    которые ссылаются на этот 'id'.
+    #    Для самоссылающейся связи mapper-level 'selectin' не срабатывал,
+    #    и каждый уровень дерева догружался отдельным запросом. Теперь роуты
+    #    читают дерево из CategoryTree (app/crud/category_tree.py), а здесь
+    #    'raise' не дает случайно сделать ленивый запрос в async-сессии.
     subcategories = relationship(
         "Category",
         back_populates="parent", # Связь с 'parent'
         cascade="all, delete-orphan", # Обычная каскадная операция
-        lazy="selectin" # Оставляем 'selectin', так как это надежный метод
+        lazy="raise"
     )
 
     def __repr__(self):
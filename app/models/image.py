@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, JSON, UniqueConstraint
+
+from app.core.images import build_srcset
+from app.db.base import Base
+
+class ItemImage(Base):
+    """Изображение товара (вместо строки URL через запятую в items.image_url)."""
+    __tablename__ = "item_images"
+
+    id = Column(Integer, primary_key=True)
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), nullable=False)
+    # Порядок в галерее товара (0 — главное фото)
+    position = Column(Integer, nullable=False, default=0)
+
+    # Абсолютный URL, вычисляется один раз при записи
+    url = Column(String, nullable=False)
+
+    # Метаданные (заполняются, если известны при загрузке)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)
+    # Уменьшенные копии/другие форматы: [{"url": ..., "width": ..., "format": ...}, ...]
+    variants = Column(JSON, nullable=True)
+    # Крошечная копия для мгновенной отрисовки (data:image/webp;base64,...)
+    placeholder = Column(Text, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("item_id", "position", name="uq_item_images_item_position"),
+    )
+
+    @property
+    def srcset(self) -> str:
+        """Строка для <img srcset> (см. app.core.images.build_srcset)."""
+        return build_srcset(self.variants)
+
+    def __repr__(self):
+        return f"<ItemImage(item_id={self.item_id}, position={self.position})>"
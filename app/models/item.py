@@ -1,6 +1,16 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Index, text
+from sqlalchemy.orm import relationship
 
 from app.db.base import Base
+from app.models.image import ItemImage
+
+# Документ для полнотекстового поиска (Postgres). То же выражение используется
+# в запросе (app/crud/search.py), поэтому оно задано строкой без параметров:
+# иначе планировщик не сопоставит запрос с GIN-индексом.
+SEARCH_VECTOR_SQL = (
+    "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, '') || ' ' "
+    "|| coalesce(memory, '') || ' ' || coalesce(color, ''))"
+)
 
 class Item(Base):
     """Модель товара для базы данных."""
@@ -10,16 +20,40 @@ class Item(Base):
     name = Column(String(100), index=True, nullable=False)
     description = Column(String)
     price = Column(Float, nullable=False)
-    image_url = Column(String) 
     is_active = Column(Boolean, default=True) 
     
     # --- НОВЫЕ ПОЛЯ ---
-    # Связь с категорией
-    category_id = Column(Integer, nullable=False) 
+    # Связь с категорией. Отдельный индекс не нужен: category_id — первая
+    # колонка составного ix_items_category_active_id (см. __table_args__).
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="RESTRICT"), nullable=False) 
     
     # Специфические поля для устройств
     memory = Column(String(50), nullable=True) # Пример: '64 GB', '256 GB'
     color = Column(String(50), nullable=True)  # Пример: 'Space Gray', 'Midnight'
 
-    # Отношение к категории
-    # <--- Добавили
\ No newline at end of file
+    # Отношение к категории: many-to-one, загружается тем же SELECT (JOIN),
+    # поэтому схема Item читает item.category без отдельного запроса.
+    category = relationship("Category", lazy="joined")
+
+    # Изображения: одна выборка SELECT ... WHERE item_id IN (...) на всю страницу товаров
+    images = relationship(
+        ItemImage,
+        order_by=ItemImage.position,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="selectin",
+    )
+
+    @property
+    def image_urls(self):
+        """Абсолютные URL изображений по порядку (для схемы Item, from_attributes)."""
+        return [image.url for image in self.images]
+
+    # Составные индексы под фильтры и keyset-пагинацию (ORDER BY id) клиентского каталога
+    __table_args__ = (
+        Index("ix_items_category_active_id", "category_id", "is_active", "id"),
+        Index("ix_items_active_id", "is_active", "id"),
+        Index("ix_items_active_price", "is_active", "price"),
+        # Полнотекстовый поиск; в SQLite не создается (там in-memory индекс)
+        Index("ix_items_search", text(SEARCH_VECTOR_SQL), postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
\ No newline at end of file
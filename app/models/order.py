@@ -0,0 +1,59 @@
+from sqlalchemy import BigInteger, Column, DateTime, Float, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.orm import relationship
+
+from app.db.base import Base
+
+class OrderItem(Base):
+    """Позиция заказа — снимок товара на момент заказа (название и цена могут измениться)."""
+    __tablename__ = "order_items"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    order_id = Column(BigInteger, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Порядок позиций, как в корзине
+    position = Column(Integer, nullable=False)
+    name = Column(String(100), nullable=False)
+    price = Column(Float, nullable=False)   # -1 — "Под заказ"
+    memory = Column(String(50), nullable=True)
+    color = Column(String(50), nullable=True)
+
+class Order(Base):
+    """
+    Заказ из Mini App. ID выдает последовательность БД (BIGSERIAL в Postgres),
+    поэтому номера уникальны и растут независимо от процесса API.
+    """
+    __tablename__ = "orders"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    # Ключ от клиента: повтор того же запроса (обрыв сети, двойной клик) не создает второй заказ
+    idempotency_key = Column(String(64), nullable=True, unique=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    status = Column(String(20), nullable=False, default="new")
+
+    fio = Column(String(200), nullable=False)
+    phone = Column(String(50), nullable=False)
+    # Только цифры телефона — для поиска независимо от формата ввода
+    phone_digits = Column(String(20), nullable=False)
+    email = Column(String(200), nullable=False)
+    telegram_username = Column(String(100), nullable=True)
+    address = Column(Text, nullable=False)
+    comment = Column(Text, nullable=True)
+    delivery_method = Column(String(20), nullable=False)
+    payment_method = Column(String(50), nullable=True)
+    total_price = Column(Float, nullable=False)
+
+    items = relationship(
+        OrderItem,
+        lazy="selectin",
+        order_by=OrderItem.position,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    __table_args__ = (
+        # Поиск по телефону (новые первыми) и по дате
+        Index("ix_orders_phone_created", "phone_digits", "created_at"),
+        Index("ix_orders_created_at", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<Order(id={self.id}, phone='{self.phone}')>"
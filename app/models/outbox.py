@@ -0,0 +1,29 @@
+from sqlalchemy import JSON, BigInteger, Column, DateTime, Index, Integer, String, Text
+
+from app.db.base import Base
+
+class OutboxMessage(Base):
+    """
+    Исходящее уведомление (transactional outbox). Пишется в той же транзакции,
+    что и данные, о которых оно сообщает (например, заказ), и отправляется
+    фоновым диспетчером (app.core.outbox) — запрос клиента не ждет внешний API.
+    """
+    __tablename__ = "outbox"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    # Куда отправлять: пока только "telegram" (payload — параметры sendMessage)
+    channel = Column(String(20), nullable=False)
+    payload = Column(JSON, nullable=False)
+    # pending -> sent | failed
+    status = Column(String(10), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    # Когда можно (снова) пытаться отправить: повтор с задержкой и аренда сообщения воркером
+    available_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        # Выборка готовых к отправке: WHERE status = 'pending' AND available_at <= now
+        Index("ix_outbox_status_available", "status", "available_at"),
+    )
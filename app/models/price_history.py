@@ -0,0 +1,29 @@
+from sqlalchemy import BigInteger, Column, DateTime, Float, ForeignKey, Index, Integer, String
+
+from app.db.base import Base
+
+class PriceHistory(Base):
+    """
+    Журнал изменений цен (только добавление строк, без UPDATE/DELETE).
+
+    Все строки одной операции (загрузка прайс-листа, откат) имеют общие
+    batch_id и changed_at, поэтому "цены на момент T" — это последняя
+    строка каждого товара с changed_at <= T.
+    """
+    __tablename__ = "price_history"
+
+    # BigInteger в Postgres; в SQLite автоинкремент есть только у INTEGER PRIMARY KEY
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), nullable=False)
+    old_price = Column(Float, nullable=True)   # None — первая запись о товаре
+    price = Column(Float, nullable=False)
+    changed_at = Column(DateTime(timezone=True), nullable=False)
+    # Источник: initial / create / manual / upload / restore
+    source = Column(String(20), nullable=False)
+    batch_id = Column(String(32), nullable=True)
+
+    __table_args__ = (
+        # История товара и выборка "последняя цена до момента T"
+        Index("ix_price_history_item_changed", "item_id", "changed_at"),
+        Index("ix_price_history_batch_id", "batch_id"),
+    )
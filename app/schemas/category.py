@@ -44,4 +44,8 @@ class Category(BaseModel):
         from_attributes = True
 
 # Обязательно для рекурсивных схем
-Category.model_rebuild()
\ No newline at end of file
+Category.model_rebuild()
+
+class CategoryCreate(BaseModel):
+    """Схема для создания категории (POST запросы)."""
+    name: str = Field(..., max_length=50)
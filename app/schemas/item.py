@@ -40,12 +40,28 @@
 #     class Config:
 #         from_attributes = True
 
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, ValidationInfo, field_validator
+from typing import Any, Dict, Optional, List
+
+from app.core.config import settings
 
 # Импортируем схему категории
 from .category import Category as CategorySchema 
 
+
+def format_image_url(relative_url: str) -> str:
+    """Конвертирует относительный путь в абсолютный (относительно STATIC_URL)."""
+    if not settings.STATIC_URL:
+        return ''
+    # Абсолютные ссылки (например, вернувшиеся из /upload/images/) оставляем как есть
+    if relative_url.startswith(('http://', 'https://')):
+        return relative_url
+    base_url = settings.STATIC_URL.rstrip('/') + '/'
+    # Убираем возможный дубликат /static/ (если он есть в БД) и начальный слеш
+    if relative_url.startswith('/static/'):
+        relative_url = relative_url.replace('/static/', '', 1)
+    return f"{base_url}{relative_url.lstrip('/')}"
+
 # Базовая схема
 class ItemBase(BaseModel):
     name: str = Field(..., max_length=100)
@@ -72,14 +88,104 @@ class ItemUpdate(ItemBase):
     # image_urls теперь также опционально для обновления
     image_urls: Optional[List[str]] = Field(None, description="Список URL-адресов изображений")
 
+    @field_validator('name', 'price', 'category_id')
+    @classmethod
+    def _not_null_if_set(cls, value: Any) -> Any:
+        # Поле можно не передавать, но явный null в NOT NULL-колонку не пишем.
+        # Значения по умолчанию валидатор не проверяет, поэтому None здесь — только явный
+        if value is None:
+            raise ValueError('не может быть null')
+        return value
+
+# Уменьшенная копия изображения (см. app.core.images)
+class ImageVariant(BaseModel):
+    url: str
+    width: int
+    height: int
+    format: str
+
+class ItemImage(BaseModel):
+    """Изображение товара с уменьшенными копиями для <img srcset> и заглушкой."""
+    url: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    # data: URI крошечной копии — показывается до загрузки картинки
+    placeholder: Optional[str] = None
+    variants: List[ImageVariant] = Field(default_factory=list)
+    # Готовая строка для srcset ("url 320w, url 640w"), пустая, если вариантов нет
+    srcset: str = ''
+
+    class Config:
+        from_attributes = True
+
+    @field_validator('variants', mode='before')
+    @classmethod
+    def _variants_or_empty(cls, value: Any) -> Any:
+        return value or []
+
+    @field_validator('srcset', mode='before')
+    @classmethod
+    def _srcset_or_empty(cls, value: Any) -> Any:
+        return value or ''
+
+def image_payload(image: Any) -> Dict[str, Any]:
+    """Изображение из ORM в форме схемы ItemImage (те же поля и порядок)."""
+    return {
+        'url': image.url,
+        'width': image.width,
+        'height': image.height,
+        'placeholder': image.placeholder,
+        'variants': image.variants or [],
+        'srcset': image.srcset,
+    }
+
 # Схема для чтения (отправка клиенту)
 class Item(ItemBase):
+    """
+    Читается напрямую из ORM-модели (from_attributes):
+    - image_urls — абсолютные URL из таблицы item_images (вычислены при записи);
+    - images — те же изображения с размерами, уменьшенными копиями и srcset;
+    - category берется из связи Item.category. Если в контексте валидации
+      передано дерево категорий ({"category_tree": CategoryTree}), категория
+      подставляется из него вместе с подкатегориями, без запросов к БД.
+    """
     id: int 
     category: CategorySchema 
+    # Подробности изображений (размеры, варианты, srcset) в порядке image_urls
+    images: List[ItemImage] = Field(default_factory=list)
 
     class Config:
         from_attributes = True
 
+    @field_validator('category', mode='before')
+    @classmethod
+    def _category_from_tree(cls, value: Any, info: ValidationInfo) -> Any:
+        if value is None or isinstance(value, (dict, CategorySchema)):
+            return value
+        # ORM-объект категории: подкатегории у него не загружены (lazy="raise")
+        tree = (info.context or {}).get('category_tree')
+        node = tree.get(value.id) if tree is not None else None
+        return node if node is not None else {'id': value.id, 'name': value.name}
+
+def item_payload(item: Any, category: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Товар из ORM как dict в форме схемы Item (те же поля и порядок), без валидации.
+    Для быстрых списков через app.core.fast_json; при изменении Item правится вместе с ней.
+    """
+    return {
+        'name': item.name,
+        'description': item.description,
+        'price': item.price,
+        'image_urls': item.image_urls,
+        'is_active': item.is_active,
+        'category_id': item.category_id,
+        'memory': item.memory,
+        'color': item.color,
+        'id': item.id,
+        'category': category,
+        'images': [image_payload(image) for image in item.images],
+    }
+
 # ---------------------------------------------------------
 # Схемы для Заказов (оставлены без изменений для контекста)
 # ---------------------------------------------------------
@@ -107,7 +213,8 @@ class ItemAdminList(BaseModel):
     """
     id: int 
     name: str = Field(..., max_length=100)
-    price: float = Field(..., gt=0)
+    # Как в ItemBase: -1 допустимо (цена не задана)
+    price: float = Field(..., ge=-1.0)
     
     # Требуемые характеристики
     memory: Optional[str] = None
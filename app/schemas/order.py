@@ -1,57 +1,66 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from datetime import datetime, timezone
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Literal, Optional
 # =========================================================
 # НОВЫЕ СХЕМЫ ДЛЯ ПРИЕМА ДАННЫХ С ФРОНТЕНДА (SPA-магазина)
 # =========================================================
 
 class FrontendItemDetails(BaseModel):
     """Модель одного товара, как он приходит с JavaScript фронтенда."""
-    name: str
+    # Длины строк — как у колонок order_items (иначе Postgres ответит DataError, т.е. 500)
+    name: str = Field(..., max_length=100)
     price: float
-    memory: Optional[str] = None
-    color: Optional[str] = None
+    memory: Optional[str] = Field(None, max_length=50)
+    color: Optional[str] = Field(None, max_length=50)
 
 class OrderSubmission(BaseModel):
     """Полная модель заказа, приходящая с фронтенда для отправки в чат-бот."""
-    fio: str = Field(..., description="ФИО клиента")
-    phone: str = Field(..., description="Телефон клиента")
-    email: str = Field(..., description="Почта клиента") # Новое поле с фронтенда
-    telegram_username: Optional[str] = Field(None, description="Никнейм в Telegram")
+    # Длины строк — как у колонок orders (address и comment — Text, без ограничения)
+    fio: str = Field(..., max_length=200, description="ФИО клиента")
+    phone: str = Field(..., max_length=50, description="Телефон клиента")
+    email: str = Field(..., max_length=200, description="Почта клиента") # Новое поле с фронтенда
+    telegram_username: Optional[str] = Field(None, max_length=100, description="Никнейм в Telegram")
     address: str = Field(..., description="Адрес доставки или 'Самовывоз'")
     comment: Optional[str] = Field(None, description="Комментарии к заказу")
-    delivery_method: str = Field(..., description="Способ получения ('delivery' или 'pickup')")
-    payment_method: Optional[str] = Field(None, description="Способ оплаты")
+    delivery_method: Literal['delivery', 'pickup'] = Field(..., description="Способ получения")
+    payment_method: Optional[str] = Field(None, max_length=50, description="Способ оплаты")
     total_price: float = Field(..., description="Общая сумма заказа")
     items: List[FrontendItemDetails]
 
-class OrderItemBase(BaseModel):
-    item_id: int
-    quantity: int = Field(..., gt=0) # Количество должно быть больше 0
-    
-class OrderItemCreate(OrderItemBase):
-    pass
+# =========================================================
+# СОХРАНЕННЫЕ ЗАКАЗЫ (таблицы orders / order_items)
+# =========================================================
+
+class OrderItem(FrontendItemDetails):
+    """Позиция сохраненного заказа (снимок товара на момент заказа)."""
 
-class OrderItem(OrderItemBase):
-    id: int
-    order_id: int
-    
     class Config:
         from_attributes = True
 
-class OrderBase(BaseModel):
-    # Данные, которые приходят с фронтенда
-    user_id: int               # Telegram ID пользователя, который делает заказ
-    full_name: str
-    phone_number: str
-    shipping_address: str
-    items: List[OrderItemCreate] # Список товаров в заказе
-
-class OrderCreate(OrderBase):
-    pass
-
-class Order(OrderBase):
+class Order(BaseModel):
     id: int
-    status: str = "PENDING"
-    
+    created_at: datetime
+    status: str
+    fio: str
+    phone: str
+    email: str
+    telegram_username: Optional[str] = None
+    address: str
+    comment: Optional[str] = None
+    delivery_method: str
+    payment_method: Optional[str] = None
+    total_price: float
+    items: List[OrderItem]
+
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+    @field_validator('created_at')
+    @classmethod
+    def _utc(cls, value: datetime) -> datetime:
+        # SQLite возвращает время без часового пояса (хранится UTC)
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+class OrderSubmitResult(BaseModel):
+    message: str
+    order_id: int
@@ -0,0 +1,26 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from pydantic import BaseModel, field_validator
+
+class PriceHistoryEntry(BaseModel):
+    """Одно изменение цены товара."""
+    price: float
+    old_price: Optional[float] = None
+    changed_at: datetime
+    source: str
+    batch_id: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+    @field_validator('changed_at')
+    @classmethod
+    def _utc(cls, value: datetime) -> datetime:
+        # SQLite возвращает время без часового пояса (хранится UTC)
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+class PriceSnapshotRestoreResult(BaseModel):
+    restored: int
+    batch_id: str
+    snapshot_at: datetime
@@ -0,0 +1,20 @@
+from typing import Dict, List
+
+from pydantic import BaseModel, Field
+
+class DirectUploadRequest(BaseModel):
+    """Запрос на прямую загрузку файла в хранилище (только STORAGE_BACKEND=s3)."""
+    filename: str = Field(..., description="Имя файла (по расширению выбирается тип)")
+
+class DirectUpload(BaseModel):
+    """
+    Куда и как загрузить файл: POST multipart/form-data на url с полями fields
+    и файлом в поле "file" (последним). Затем — /upload/images/complete/ с key.
+    """
+    key: str
+    url: str
+    fields: Dict[str, str]
+    expires_in: int
+
+class DirectUploadComplete(BaseModel):
+    keys: List[str] = Field(..., min_length=1, description="Ключи из /upload/images/presign/")
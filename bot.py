@@ -5,7 +5,7 @@ import logging
 import asyncio
 import io 
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from aiogram import Bot, Dispatcher, types, F, Router
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
@@ -105,6 +105,16 @@ async def get_items(client: httpx.AsyncClient) -> list:
         logging.error(f"Error fetching items: {e}")
         return []
 
+async def get_admin_items(client: httpx.AsyncClient) -> list:
+    """Краткий список всех товаров (id, name, price, memory, color) для админ-команд."""
+    try:
+        response = await client.get(f"{API_URL}/items/admin-list")
+        response.raise_for_status()
+        return response.json()
+    except httpx.HTTPStatusError as e:
+        logging.error(f"Error fetching admin item list: {e}")
+        return []
+
 
 def flatten_categories_for_bot(categories: List[Dict[str, Any]], prefix: str = "") -> Dict[str, str]:
     """
@@ -878,7 +888,7 @@ async def cmd_delete_item(message: types.Message, state: FSMContext):
         return
 
     async with httpx.AsyncClient() as client:
-        items = await get_items(client)
+        items = await get_admin_items(client)
         if not items:
             await message.answer("❌ В базе данных нет товаров для удаления.")
             await state.clear()
@@ -931,7 +941,7 @@ async def cmd_update_price(message: types.Message, state: FSMContext):
         return
 
     async with httpx.AsyncClient() as client:
-        items = await get_items(client)
+        items = await get_admin_items(client)
         if not items:
             await message.answer("❌ В базе данных нет товаров для изменения цены.")
             await state.clear()
@@ -1102,8 +1112,8 @@ async def admin_list_items_handler(message: types.Message):
     # Используем асинхронный клиент httpx
     async with httpx.AsyncClient(timeout=10.0) as client:
         try:
-            # Запрос к роуту /items/all
-            response = await client.get(f"{API_URL}/items/all") 
+            # Запрос к краткому списку: бэкенд выбирает только нужные колонки
+            response = await client.get(f"{API_URL}/items/admin-list") 
             response.raise_for_status() # Вызывает исключение для 4xx/5xx ошибок
 
             # Ожидаем, что API вернет список объектов с полями: id, name, price, memory, color
@@ -1143,7 +1153,7 @@ async def admin_list_items_handler(message: types.Message):
             await message.answer(f"❌ **Ошибка API** ({e.response.status_code}): Не удалось получить список товаров. Проверьте лог.", parse_mode='Markdown')
         except httpx.RequestError as e:
             logging.error(f"API connection error: {e}")
-            await message.answer(f"❌ **Ошибка подключения к API:** Убедитесь, что бэкенд запущен и доступен по адресу: `{API_URL}/items/all`", parse_mode='Markdown')
+            await message.answer(f"❌ **Ошибка подключения к API:** Убедитесь, что бэкенд запущен и доступен по адресу: `{API_URL}/items/admin-list`", parse_mode='Markdown')
         except Exception as e:
             logging.exception(f"An unexpected error occurred: {e}")
             await message.answer("❌ Произошла непредвиденная ошибка при обработке запроса.")
@@ -1202,16 +1212,38 @@ async def cmd_get_prices(message: types.Message):
 @router.message(Command("update_prices"), F.from_user.id == ADMIN_ID)
 async def cmd_start_update_prices(message: types.Message, state: FSMContext):
     await message.answer(
-        "**Загрузите измененный .xlsx файл прайс-листа.**\n\n"
+        "**Загрузите измененный .xlsx файл прайс-листа** (или .csv / .parquet с колонками id, name, memory, color, price).\n\n"
         "Я обновлю цены в базе данных на основе колонок 'ID' и 'Цена'.\n"
         "Для отмены нажмите /cancel."
     )
     await state.set_state(PriceUpdateStates.waiting_for_file)
 
+# Как часто и сколько всего ждать завершения фонового импорта
+PRICE_JOB_POLL_INTERVAL = 2.0
+PRICE_JOB_MAX_WAIT = 30 * 60
+# Сколько текста ошибки импорта показывать в чате (лимит сообщения Telegram — 4096 символов)
+PRICE_JOB_ERROR_PREVIEW = 1000
+
+def truncate_text(text: str, limit: int = PRICE_JOB_ERROR_PREVIEW) -> str:
+    """Обрезает текст для сообщения в чат; полный текст пишется в лог отдельно."""
+    return text if len(text) <= limit else text[:limit] + "…"
+
+async def wait_for_price_job(client: httpx.AsyncClient, job_id: str, headers: dict) -> Optional[dict]:
+    """Опрашивает /price-list/jobs/{id}, пока задача не завершится (None — не дождались)."""
+    deadline = asyncio.get_running_loop().time() + PRICE_JOB_MAX_WAIT
+    while asyncio.get_running_loop().time() < deadline:
+        response = await client.get(f"{API_URL}/price-list/jobs/{job_id}", headers=headers)
+        response.raise_for_status()
+        job = response.json()
+        if job['status'] in ('done', 'failed'):
+            return job
+        await asyncio.sleep(PRICE_JOB_POLL_INTERVAL)
+    return None
+
 @router.message(PriceUpdateStates.waiting_for_file, F.document, F.from_user.id == ADMIN_ID)
 async def process_price_file_upload(message: Message, state: FSMContext, bot: Bot):
-    if not message.document.file_name.lower().endswith('.xlsx'): 
-        await message.answer("❌ Неверный тип файла. Пожалуйста, загрузите файл `.xlsx`.")
+    if not message.document.file_name.lower().endswith(('.xlsx', '.csv', '.parquet')): 
+        await message.answer("❌ Неверный тип файла. Пожалуйста, загрузите файл `.xlsx`, `.csv` или `.parquet`.")
         return
 
     await message.answer("⏳ Обрабатываю файл... Ожидайте.")
@@ -1227,7 +1259,8 @@ async def process_price_file_upload(message: Message, state: FSMContext, bot: Bo
         headers = {"X-Admin-Token": ADMIN_API_TOKEN}
         files_to_upload = {'file': (message.document.file_name, file_buffer, message.document.mime_type)}
 
-        async with httpx.AsyncClient(timeout=120.0) as client: 
+        async with httpx.AsyncClient(timeout=60.0) as client: 
+            # API только ставит импорт в очередь и сразу возвращает ID задачи
             response = await client.post(
                 f"{API_URL}/price-list/upload",
                 headers=headers,
@@ -1236,16 +1269,32 @@ async def process_price_file_upload(message: Message, state: FSMContext, bot: Bo
             
             response.raise_for_status() # 💡 Улучшенная проверка статуса
             
-            data = response.json()
+            job_id = response.json()['job_id']
+            job = await wait_for_price_job(client, job_id, headers)
+            if job is None:
+                await message.answer(
+                    f"⏳ Импорт еще выполняется (задача `{job_id}`). Итог можно будет посмотреть позже."
+                )
+                return
+            if job['status'] == 'failed':
+                error = str(job.get('error'))
+                logging.error(f"Price import job {job_id} failed: {error}")
+                # Текст ошибки произвольный: без Markdown, иначе Telegram может отклонить сообщение
+                await message.answer(f"❌ Импорт не выполнен: {truncate_text(error)}", parse_mode=None)
+                return
+
+            data = job['result']
             await message.answer(
                 f"✅ **Обновление завершено!**\n\n"
-                f"Успешно обновлено: {data.get('updated', 0)}\n"
-                f"Пропущено (ошибки): {data.get('skipped', 0)}\n"
+                f"Цена изменена: {data.get('updated', 0)}\n"
+                f"Без изменений: {data.get('unchanged', 0)}\n"
+                f"Неизвестный ID: {data.get('unknown', 0)}\n"
+                f"Ошибки в строках: {data.get('invalid', data.get('skipped', 0))}\n"
             )
             if data.get('errors'):
                 # Логируем ошибки
                 logging.warning(f"Price list upload errors: {data['errors']}")
-                await message.answer(f"Детали ошибок:\n{data['errors']}")
+                await message.answer(f"Детали ошибок:\n{truncate_text(str(data['errors']))}", parse_mode=None)
                 
     except httpx.HTTPStatusError as e:
         logging.error(f"API Error processing file: {e.response.text}")
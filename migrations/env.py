@@ -2,7 +2,10 @@ from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from app.core.config import settings
 from app.db.base import Base
+# Импортируем модели, чтобы они попали в Base.metadata
+from app.models import item, category, catalog, image, price_history, order, outbox  # noqa: F401
 
 from alembic import context
 
@@ -19,7 +22,10 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
-target_metadata = None
+target_metadata = Base.metadata
+
+# URL берем из настроек приложения (.env), а не из alembic.ini
+config.set_main_option("sqlalchemy.url", settings.DATABASE_URL.replace("%", "%%"))
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
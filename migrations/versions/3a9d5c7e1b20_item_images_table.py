@@ -0,0 +1,91 @@
+"""item images table
+
+Revision ID: 3a9d5c7e1b20
+Revises: 8f3c1d6e2a47
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.schemas.item import format_image_url
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3a9d5c7e1b20'
+down_revision: Union[str, Sequence[str], None] = '8f3c1d6e2a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table('item_images'):
+        op.create_table(
+            'item_images',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('item_id', sa.Integer(), sa.ForeignKey('items.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('position', sa.Integer(), nullable=False),
+            sa.Column('url', sa.String(), nullable=False),
+            sa.Column('width', sa.Integer(), nullable=True),
+            sa.Column('height', sa.Integer(), nullable=True),
+            sa.Column('content_hash', sa.String(length=64), nullable=True),
+            sa.Column('variants', sa.JSON(), nullable=True),
+            sa.UniqueConstraint('item_id', 'position', name='uq_item_images_item_position'),
+        )
+        op.create_index('ix_item_images_content_hash', 'item_images', ['content_hash'])
+
+    if 'image_url' not in {column['name'] for column in inspector.get_columns('items')}:
+        return
+
+    # Переносим строки "url1,url2" в отдельные записи; абсолютный URL считаем один раз здесь.
+    # Таблицу мог раньше создать create_all: у товаров, чьи изображения уже
+    # записало приложение, image_url устарел — их пропускаем.
+    rows = bind.execute(sa.text(
+        "SELECT id, image_url FROM items WHERE image_url IS NOT NULL AND image_url != '' "
+        "AND NOT EXISTS (SELECT 1 FROM item_images WHERE item_images.item_id = items.id)"
+    ))
+    images = []
+    for item_id, image_url in rows:
+        urls = [format_image_url(url.strip()) for url in image_url.split(',') if url.strip()]
+        images.extend(
+            {'item_id': item_id, 'position': position, 'url': url}
+            for position, url in enumerate(url for url in urls if url)
+        )
+    if images:
+        item_images = sa.table(
+            'item_images',
+            sa.column('item_id', sa.Integer),
+            sa.column('position', sa.Integer),
+            sa.column('url', sa.String),
+        )
+        op.bulk_insert(item_images, images)
+
+    with op.batch_alter_table('items') as batch_op:
+        batch_op.drop_column('image_url')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+
+    with op.batch_alter_table('items') as batch_op:
+        batch_op.add_column(sa.Column('image_url', sa.String(), nullable=True))
+
+    rows = bind.execute(sa.text("SELECT item_id, url FROM item_images ORDER BY item_id, position"))
+    joined = {}
+    for item_id, url in rows:
+        joined.setdefault(item_id, []).append(url)
+    if joined:
+        bind.execute(
+            sa.text("UPDATE items SET image_url = :image_url WHERE id = :item_id"),
+            [{'item_id': item_id, 'image_url': ','.join(urls)} for item_id, urls in joined.items()],
+        )
+
+    op.drop_index('ix_item_images_content_hash', table_name='item_images')
+    op.drop_table('item_images')
@@ -0,0 +1,39 @@
+"""items search index
+
+Revision ID: 5b7e2a91c4d3
+Revises: dc4e8f89d24d
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e2a91c4d3'
+down_revision: Union[str, Sequence[str], None] = 'dc4e8f89d24d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Должно совпадать с app.models.item.SEARCH_VECTOR_SQL
+SEARCH_VECTOR_SQL = (
+    "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, '') || ' ' "
+    "|| coalesce(memory, '') || ' ' || coalesce(color, ''))"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # GIN-индекс нужен только Postgres; на SQLite поиск идет по in-memory индексу
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(f"CREATE INDEX IF NOT EXISTS ix_items_search ON items USING gin ({SEARCH_VECTOR_SQL})")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP INDEX IF EXISTS ix_items_search")
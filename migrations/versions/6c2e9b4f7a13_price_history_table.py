@@ -0,0 +1,99 @@
+"""price history table
+
+Revision ID: 6c2e9b4f7a13
+Revises: 3a9d5c7e1b20
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c2e9b4f7a13'
+down_revision: Union[str, Sequence[str], None] = '3a9d5c7e1b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('price_history'):
+        op.create_table(
+            'price_history',
+            sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), primary_key=True),
+            sa.Column('item_id', sa.Integer(), sa.ForeignKey('items.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('old_price', sa.Float(), nullable=True),
+            sa.Column('price', sa.Float(), nullable=False),
+            sa.Column('changed_at', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('source', sa.String(length=20), nullable=False),
+            sa.Column('batch_id', sa.String(length=32), nullable=True),
+        )
+        op.create_index('ix_price_history_item_changed', 'price_history', ['item_id', 'changed_at'])
+        op.create_index('ix_price_history_batch_id', 'price_history', ['batch_id'])
+
+    # Отдельно от создания таблицы: на обычном деплое ее раньше создает
+    # create_all при старте приложения, а начальные цены все равно нужны
+    seed_initial_prices(bind)
+
+
+def seed_initial_prices(bind) -> None:
+    """
+    Первая точка истории ('initial') для товаров, у которых ее нет: от нее
+    считаются все снимки. Если изменения цены уже попали в журнал до миграции,
+    начальная цена — old_price первого изменения, на микросекунду раньше него.
+    """
+    items = sa.table('items', sa.column('id', sa.Integer), sa.column('price', sa.Float))
+    history = sa.table(
+        'price_history',
+        sa.column('id', sa.Integer),
+        sa.column('item_id', sa.Integer),
+        sa.column('old_price', sa.Float),
+        sa.column('price', sa.Float),
+        sa.column('changed_at', sa.DateTime(timezone=True)),
+        sa.column('source', sa.String),
+    )
+    has_initial = (
+        sa.select(history.c.id)
+        .where(history.c.item_id == items.c.id, history.c.source == 'initial')
+        .exists()
+    )
+    missing = bind.execute(
+        sa.select(items.c.id, items.c.price).where(items.c.price.isnot(None), ~has_initial)
+    ).all()
+    if not missing:
+        return
+
+    first_changes = {}
+    for item_id, old_price, changed_at in bind.execute(
+        sa.select(history.c.item_id, history.c.old_price, history.c.changed_at)
+        .order_by(history.c.item_id, history.c.changed_at, history.c.id)
+    ):
+        first_changes.setdefault(item_id, (old_price, changed_at))
+
+    now = datetime.now(timezone.utc)
+    rows = []
+    for item_id, price in missing:
+        old_price, changed_at = first_changes.get(item_id, (price, None))
+        if old_price is None:
+            continue
+        rows.append({
+            'item_id': item_id,
+            'old_price': None,
+            'price': old_price,
+            'changed_at': changed_at - timedelta(microseconds=1) if changed_at is not None else now,
+            'source': 'initial',
+        })
+    if rows:
+        op.bulk_insert(history, rows)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_price_history_batch_id', table_name='price_history')
+    op.drop_index('ix_price_history_item_changed', table_name='price_history')
+    op.drop_table('price_history')
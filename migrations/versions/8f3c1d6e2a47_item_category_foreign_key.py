@@ -0,0 +1,64 @@
+"""item category foreign key
+
+Revision ID: 8f3c1d6e2a47
+Revises: 5b7e2a91c4d3
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3c1d6e2a47'
+down_revision: Union[str, Sequence[str], None] = '5b7e2a91c4d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FALLBACK_CATEGORY_NAME = 'Без категории'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+
+    # Товары со ссылкой на несуществующую категорию не дадут создать внешний ключ.
+    # Переносим их в служебную категорию, чтобы не потерять данные. Выполняется
+    # и когда ключ уже есть (таблицу создал create_all): SQLite его не проверяет.
+    orphan_filter = "category_id NOT IN (SELECT id FROM categories)"
+    orphans = bind.execute(sa.text(f"SELECT count(*) FROM items WHERE {orphan_filter}")).scalar()
+    if orphans:
+        fallback_id = bind.execute(
+            sa.text("SELECT id FROM categories WHERE name = :name AND parent_id IS NULL"),
+            {"name": FALLBACK_CATEGORY_NAME},
+        ).scalar()
+        if fallback_id is None:
+            bind.execute(sa.text("INSERT INTO categories (name) VALUES (:name)"), {"name": FALLBACK_CATEGORY_NAME})
+            fallback_id = bind.execute(
+                sa.text("SELECT id FROM categories WHERE name = :name AND parent_id IS NULL"),
+                {"name": FALLBACK_CATEGORY_NAME},
+            ).scalar()
+        bind.execute(
+            sa.text(f"UPDATE items SET category_id = :fallback_id WHERE {orphan_filter}"),
+            {"fallback_id": fallback_id},
+        )
+
+    # На БД, созданной Base.metadata.create_all уже с новой моделью, ключ уже есть
+    foreign_keys = sa.inspect(bind).get_foreign_keys('items')
+    if any(fk['constrained_columns'] == ['category_id'] for fk in foreign_keys):
+        return
+
+    # batch_alter_table: SQLite не умеет ALTER TABLE ADD CONSTRAINT и пересоздает таблицу
+    with op.batch_alter_table('items') as batch_op:
+        batch_op.create_foreign_key(
+            'fk_items_category_id_categories', 'categories',
+            ['category_id'], ['id'], ondelete='RESTRICT',
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('items') as batch_op:
+        batch_op.drop_constraint('fk_items_category_id_categories', type_='foreignkey')
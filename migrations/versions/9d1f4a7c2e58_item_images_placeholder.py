@@ -0,0 +1,31 @@
+"""item images placeholder
+
+Revision ID: 9d1f4a7c2e58
+Revises: 6c2e9b4f7a13
+Create Date: 2026-10-16 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d1f4a7c2e58'
+down_revision: Union[str, Sequence[str], None] = '6c2e9b4f7a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('item_images')}
+    if 'placeholder' not in columns:
+        op.add_column('item_images', sa.Column('placeholder', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('item_images') as batch_op:
+        batch_op.drop_column('placeholder')
@@ -0,0 +1,65 @@
+"""orders and order_items tables
+
+Revision ID: b4e7d2a9c611
+Revises: 9d1f4a7c2e58
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e7d2a9c611'
+down_revision: Union[str, Sequence[str], None] = '9d1f4a7c2e58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if sa.inspect(op.get_bind()).has_table('orders'):
+        return
+
+    op.create_table(
+        'orders',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), primary_key=True),
+        sa.Column('idempotency_key', sa.String(length=64), nullable=True, unique=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('fio', sa.String(length=200), nullable=False),
+        sa.Column('phone', sa.String(length=50), nullable=False),
+        sa.Column('phone_digits', sa.String(length=20), nullable=False),
+        sa.Column('email', sa.String(length=200), nullable=False),
+        sa.Column('telegram_username', sa.String(length=100), nullable=True),
+        sa.Column('address', sa.Text(), nullable=False),
+        sa.Column('comment', sa.Text(), nullable=True),
+        sa.Column('delivery_method', sa.String(length=20), nullable=False),
+        sa.Column('payment_method', sa.String(length=50), nullable=True),
+        sa.Column('total_price', sa.Float(), nullable=False),
+    )
+    op.create_index('ix_orders_phone_created', 'orders', ['phone_digits', 'created_at'])
+    op.create_index('ix_orders_created_at', 'orders', ['created_at'])
+
+    op.create_table(
+        'order_items',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), primary_key=True),
+        sa.Column('order_id', sa.BigInteger(), sa.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('memory', sa.String(length=50), nullable=True),
+        sa.Column('color', sa.String(length=50), nullable=True),
+    )
+    op.create_index('ix_order_items_order_id', 'order_items', ['order_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_order_items_order_id', table_name='order_items')
+    op.drop_table('order_items')
+    op.drop_index('ix_orders_created_at', table_name='orders')
+    op.drop_index('ix_orders_phone_created', table_name='orders')
+    op.drop_table('orders')
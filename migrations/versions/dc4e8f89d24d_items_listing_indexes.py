@@ -0,0 +1,34 @@
+"""items listing indexes
+
+Revision ID: dc4e8f89d24d
+Revises: 
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dc4e8f89d24d'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Таблицы создаются Base.metadata.create_all при старте приложения,
+    # поэтому на свежей БД индексы уже могут существовать.
+    op.create_index('ix_items_category_active_id', 'items', ['category_id', 'is_active', 'id'], if_not_exists=True)
+    op.create_index('ix_items_active_id', 'items', ['is_active', 'id'], if_not_exists=True)
+    op.create_index('ix_items_active_price', 'items', ['is_active', 'price'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_items_active_price', table_name='items', if_exists=True)
+    op.drop_index('ix_items_active_id', table_name='items', if_exists=True)
+    op.drop_index('ix_items_category_active_id', table_name='items', if_exists=True)
@@ -0,0 +1,54 @@
+"""catalog_version table
+
+Revision ID: f2b6d8e4a913
+Revises: e1a8c3f5b702
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b6d8e4a913'
+down_revision: Union[str, Sequence[str], None] = 'e1a8c3f5b702'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Единственная строка таблицы (app.crud.catalog.CATALOG_VERSION_ID)
+CATALOG_VERSION_ID = 1
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('catalog_version'):
+        op.create_table(
+            'catalog_version',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('version', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        )
+
+    # Строку заводим отдельно от создания таблицы: ее мог создать create_all
+    catalog_version = sa.table(
+        'catalog_version',
+        sa.column('id', sa.Integer),
+        sa.column('version', sa.Integer),
+        sa.column('updated_at', sa.DateTime(timezone=True)),
+    )
+    exists = bind.execute(
+        sa.select(catalog_version.c.id).where(catalog_version.c.id == CATALOG_VERSION_ID)
+    ).first()
+    if exists is None:
+        op.bulk_insert(catalog_version, [
+            {'id': CATALOG_VERSION_ID, 'version': 1, 'updated_at': datetime.now(timezone.utc)},
+        ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('catalog_version')
@@ -0,0 +1,86 @@
+"""
+Бенчмарк кодирования списка товаров: схемы Pydantic против app.core.fast_json.
+
+Товары создаются в памяти (без БД), поэтому измеряется только сериализация.
+Запуск из корня репозитория (нужны переменные окружения из .env):
+
+    python -m scripts.bench_catalog_json
+    python -m scripts.bench_catalog_json 1000 10000 50000
+"""
+import sys
+import time
+
+from pydantic import TypeAdapter
+
+from app.core import fast_json
+from app.crud.category_tree import CategoryTree
+from app.models.category import Category as CategoryModel
+from app.models.image import ItemImage
+from app.models.item import Item as ItemModel
+from app.schemas.item import Item as ItemSchema, item_payload
+
+DEFAULT_SIZES = (1_000, 10_000, 50_000)
+REPEAT = 3
+
+
+def make_items(count: int, tree: CategoryTree):
+    categories = {
+        category_id: CategoryModel(id=category_id, name=node.name)
+        for category_id, node in tree.nodes.items()
+    }
+    category_ids = sorted(categories)
+    items = []
+    for item_id in range(1, count + 1):
+        category_id = category_ids[item_id % len(category_ids)]
+        items.append(ItemModel(
+            id=item_id,
+            name=f"iPhone 15 Pro {item_id}",
+            description="Смартфон Apple, официальная гарантия",
+            price=99990.0 + item_id,
+            is_active=True,
+            category_id=category_id,
+            category=categories[category_id],
+            memory="256",
+            color="Natural Titanium",
+            images=[
+                ItemImage(position=position, url=f"https://example.com/images/{item_id}_{position}.jpg")
+                for position in range(2)
+            ],
+        ))
+    return items
+
+
+def pydantic_path(items, tree):
+    """Прежний путь: model_validate на каждый товар + dump_json списка."""
+    adapter = TypeAdapter(list[ItemSchema])
+    context = {'category_tree': tree}
+    return adapter.dump_json([ItemSchema.model_validate(item, context=context) for item in items])
+
+
+def fast_path(items, tree):
+    """CATALOG_FAST_JSON: dict из ORM + orjson."""
+    return fast_json.dumps([item_payload(item, tree.payload(item.category_id)) for item in items])
+
+
+def best_of(func, *args):
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main(sizes):
+    tree = CategoryTree([(1, "iPhone", None), (2, "iPhone 15", 1), (3, "iPad", None), (4, "AirPods", None)])
+    print(f"{'товаров':>8} {'pydantic, мс':>14} {'fast_json, мс':>14} {'ускорение':>10}")
+    for size in sizes:
+        items = make_items(size, tree)
+        slow, slow_body = best_of(pydantic_path, items, tree)
+        fast, fast_body = best_of(fast_path, items, tree)
+        assert slow_body == fast_body, "ответы двух путей различаются"
+        print(f"{size:>8} {slow * 1000:>14.1f} {fast * 1000:>14.1f} {slow / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
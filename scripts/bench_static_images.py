@@ -0,0 +1,104 @@
+"""
+Бенчмарк раздачи изображений: прежний StaticFiles против app.core.static_files.
+
+Изображения (маленькое и большое) генерируются во временной папке и
+обрабатываются как при загрузке (WebP-копии). Запросы идут в ASGI-приложение
+в том же процессе (httpx + ASGITransport), без сети, поэтому цифры — верхняя
+граница для сервера; считаются запросы в секунду и байты на ответ.
+
+Сценарии:
+- first — первый просмотр (браузер Mini App шлет Accept: image/webp);
+- revalidate — повторный просмотр: прежний mount каждый раз перепроверяется
+  (If-None-Match -> 304), с immutable браузер запрос не делает вовсе.
+
+Запуск из корня репозитория (нужны переменные окружения из .env):
+
+    python -m scripts.bench_static_images
+    python -m scripts.bench_static_images 2000
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+from PIL import Image
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.staticfiles import StaticFiles
+
+from app.core import images
+from app.core.static_files import ImageStaticFiles
+
+DEFAULT_REQUESTS = 1_000
+CONCURRENCY = 20
+ACCEPT = "image/avif,image/webp,image/apng,image/*,*/*;q=0.8"
+SIZES = {"small": (320, 320), "large": (1280, 960)}
+
+
+def make_image(name: str, size) -> str:
+    """JPEG с шумом (плохо сжимается, как фото), сохраненный по хешу содержимого."""
+    path = os.path.join(images.UPLOAD_FOLDER, f"{name}.jpg")
+    Image.effect_noise(size, 64).convert("RGB").save(path, "JPEG", quality=90)
+    with open(path, "rb") as file:
+        digest = hashlib.sha256(file.read()).hexdigest()
+    relative_path = images.content_path(digest, ".jpg")
+    os.makedirs(os.path.join(images.UPLOAD_FOLDER, os.path.dirname(relative_path)), exist_ok=True)
+    os.replace(path, os.path.join(images.UPLOAD_FOLDER, relative_path))
+    target = os.path.join(images.UPLOAD_FOLDER, relative_path)
+    manifest = images.process_image(target, relative_path, images.UPLOAD_FOLDER)
+    with open(os.path.join(images.UPLOAD_FOLDER, images.manifest_key(relative_path)), "w") as file:
+        json.dump(manifest, file)
+    return relative_path
+
+
+async def run(app, path: str, count: int, headers: dict):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        url = f"/static/images/{path}"
+        etag = (await client.get(url, headers={"accept": ACCEPT})).headers["etag"]
+        headers = {key: value.replace("{etag}", etag) for key, value in headers.items()}
+        sizes = []
+
+        async def worker(requests: int):
+            for _ in range(requests):
+                response = await client.get(url, headers=headers)
+                sizes.append(len(response.content))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(count // CONCURRENCY) for _ in range(CONCURRENCY)))
+        elapsed = time.perf_counter() - started
+    return len(sizes) / elapsed, sum(sizes) // len(sizes)
+
+
+async def main(count: int):
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        os.makedirs(images.UPLOAD_FOLDER)
+        paths = {name: make_image(name, size) for name, size in SIZES.items()}
+        apps = {
+            "StaticFiles": Starlette(routes=[Mount("/static/images", StaticFiles(directory=images.UPLOAD_FOLDER))]),
+            "ImageStaticFiles": Starlette(routes=[Mount("/static/images", ImageStaticFiles(directory=images.UPLOAD_FOLDER))]),
+        }
+        scenarios = {
+            "first": {"accept": ACCEPT},
+            "revalidate": {"accept": ACCEPT, "if-none-match": "{etag}"},
+        }
+
+        print(f"{'изображение':>11} {'сценарий':>10} {'mount':>16} {'запросов/с':>11} {'байт/ответ':>11}")
+        for name, path in paths.items():
+            for scenario, headers in scenarios.items():
+                for mount, app in apps.items():
+                    if scenario == "revalidate" and mount == "ImageStaticFiles":
+                        # immutable: повторный просмотр обслуживается кэшем браузера
+                        print(f"{name:>11} {scenario:>10} {mount:>16} {'без запроса':>11} {0:>11}")
+                        continue
+                    rps, size = await run(app, path, count, headers)
+                    print(f"{name:>11} {scenario:>10} {mount:>16} {rps:>11.0f} {size:>11}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REQUESTS))
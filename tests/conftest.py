@@ -0,0 +1,34 @@
+"""
+Общие фикстуры тестов.
+
+Настройки читаются при импорте app.*, поэтому окружение (временная SQLite,
+токены) задается здесь, до первого импорта приложения. Рабочая папка —
+временная: туда попадают uploaded_images и jobs.db.
+"""
+import os
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="kingstore-tests-")
+os.chdir(_TMP_DIR)
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(_TMP_DIR, 'test.db')}",
+    BOT_TOKEN="test",
+    API_URL="http://testserver",
+    ADMIN_ID="1",
+    ADMIN_API_TOKEN="test-admin-token",
+    # Уведомления outbox не уходят в настоящий Telegram (соединение отклоняется сразу)
+    TELEGRAM_API_BASE="http://127.0.0.1:9",
+)
+
+import pytest
+from fastapi.testclient import TestClient
+
+ADMIN_HEADERS = {"X-Admin-Token": "test-admin-token"}
+
+
+@pytest.fixture(scope="session")
+def client():
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
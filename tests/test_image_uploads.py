@@ -0,0 +1,48 @@
+"""Потоковый прием изображений: сбой записи не должен подвешивать запрос."""
+import asyncio
+
+import pytest
+
+from app.core import image_uploads
+
+JPEG_HEAD = b"\xff\xd8\xff" + b"\x00" * 61
+
+
+class FailingFile:
+    """Файл, запись в который ждет сигнала и падает (как при нехватке места)."""
+
+    def __init__(self, release: asyncio.Event):
+        self.release = release
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def write(self, data):
+        await self.release.wait()
+        raise OSError(28, "No space left on device")
+
+
+@pytest.mark.parametrize("finish", ["feed", "close"])
+def test_writer_failure_with_full_queue_raises(monkeypatch, finish):
+    async def scenario():
+        release = asyncio.Event()
+        monkeypatch.setattr(image_uploads.aiofiles, "open", lambda *args, **kwargs: FailingFile(release))
+        sink = image_uploads._FileSink("photo.jpg")
+        try:
+            # Первый кусок забирает задача записи, следующие заполняют очередь
+            for _ in range(image_uploads._QUEUE_SIZE + 1):
+                await sink.feed(JPEG_HEAD)
+            await asyncio.sleep(0)
+            blocked = asyncio.ensure_future(sink.feed(JPEG_HEAD) if finish == "feed" else sink.close())
+            await asyncio.sleep(0.05)
+            assert not blocked.done()
+            release.set()
+            with pytest.raises(OSError, match="No space"):
+                await asyncio.wait_for(blocked, timeout=2)
+        finally:
+            await sink.discard()
+
+    asyncio.run(scenario())
@@ -0,0 +1,81 @@
+"""GET /items/all: число SQL-запросов не зависит от числа товаров (нет N+1)."""
+import os
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.crud.category_tree import category_tree_cache
+from app.db.session import engine
+from app.models.category import Category as CategoryModel
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def create_subcategory(name, parent_id):
+    """Подкатегория через модель: POST /categories/ не принимает parent_id."""
+    sync_engine = create_engine(os.environ["DATABASE_URL"])
+    try:
+        with Session(sync_engine) as session:
+            category = CategoryModel(name=name, parent_id=parent_id)
+            session.add(category)
+            session.commit()
+            return category.id
+    finally:
+        sync_engine.dispose()
+
+
+def seed_items(client, category_id, count):
+    for number in range(count):
+        response = client.post("/api/v1/items/", json={
+            "name": f"Товар {number}",
+            "price": 100 + number,
+            "category_id": category_id,
+            "image_urls": [f"/static/images/{number}-a.jpg", f"/static/images/{number}-b.jpg"],
+        })
+        assert response.status_code == 201, response.text
+
+
+def list_all_items(client):
+    # Дерево категорий читается заново, как в новом процессе
+    category_tree_cache.invalidate()
+    with count_statements() as statements:
+        response = client.get("/api/v1/items/all", params={"limit": 1000})
+    assert response.status_code == 200, response.text
+    return response.json(), statements
+
+
+def test_admin_listing_query_count_is_bounded(client):
+    root = client.post("/api/v1/categories/", json={"name": "Телефоны"}).json()
+    child = {"id": create_subcategory("iPhone", root["id"])}
+    category_tree_cache.invalidate()
+    roots = client.get("/api/v1/categories/").json()
+    parent = next(category for category in roots if category["id"] == root["id"])
+    assert [subcategory["id"] for subcategory in parent["subcategories"]] == [child["id"]]
+
+    seed_items(client, child["id"], 1)
+    items, one_item_statements = list_all_items(client)
+    assert len(items) == 1
+
+    seed_items(client, child["id"], 49)
+    items, many_items_statements = list_all_items(client)
+    assert len(items) == 50
+    assert all(len(item["images"]) == 2 for item in items)
+    assert items[0]["category"]["id"] == child["id"]
+    assert child["id"] not in {category["id"] for category in client.get("/api/v1/categories/").json()}
+
+    # Товары, их изображения (selectin) и дерево категорий
+    assert len(many_items_statements) == len(one_item_statements), many_items_statements
+    assert len(many_items_statements) <= 3, many_items_statements
@@ -0,0 +1,18 @@
+"""PUT /items/{id}: явный null в обязательных полях — 422, а не ошибка БД."""
+import pytest
+
+
+@pytest.mark.parametrize("field", ["category_id", "name", "price"])
+def test_explicit_null_in_required_field_is_rejected(client, field):
+    category = client.post("/api/v1/categories/", json={"name": "Планшеты"}).json()
+    item = client.post("/api/v1/items/", json={
+        "name": "iPad", "price": 500, "category_id": category["id"],
+    }).json()
+
+    response = client.put(f"/api/v1/items/{item['id']}", json={field: None})
+    assert response.status_code == 422, response.text
+
+    # Поле можно просто не передавать
+    response = client.put(f"/api/v1/items/{item['id']}", json={"color": "Silver"})
+    assert response.status_code == 200, response.text
+    assert response.json()["category_id"] == category["id"]
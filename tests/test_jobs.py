@@ -0,0 +1,67 @@
+"""Очередь фоновых задач: восстановление после перезапуска и остановка."""
+import asyncio
+import os
+import subprocess
+import sys
+
+from app.core.jobs import (
+    JOB_FAILED, JOB_QUEUED, JOB_RUNNING, InMemoryJobStore, Job, JobQueue, SQLiteJobStore, _boot_id, process_owner,
+)
+
+
+def dead_process_owner() -> str:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return f"{process.pid}:1:{_boot_id()}"
+
+
+def test_sqlite_store_fails_only_orphaned_jobs(tmp_path):
+    store = SQLiteJobStore(str(tmp_path / "jobs.db"), ttl=3600)
+    jobs = {
+        "alive": Job(id="alive", kind="test", status=JOB_RUNNING, owner=process_owner()),
+        "alive_queued": Job(id="alive_queued", kind="test", status=JOB_QUEUED, owner=process_owner()),
+        "dead": Job(id="dead", kind="test", status=JOB_RUNNING, owner=dead_process_owner()),
+        # Тот же pid, но другой процесс (pid переиспользован)
+        "reused_pid": Job(id="reused_pid", kind="test", status=JOB_RUNNING, owner=f"{os.getpid()}:1:{_boot_id()}"),
+        "no_owner": Job(id="no_owner", kind="test", status=JOB_QUEUED),
+    }
+
+    async def scenario():
+        for job in jobs.values():
+            await store.save(job)
+        failed = await store.fail_orphaned("restart")
+        return failed, {job_id: await store.get(job_id) for job_id in jobs}
+
+    failed, stored = asyncio.run(scenario())
+
+    assert failed == 3
+    assert stored["alive"].status == JOB_RUNNING
+    assert stored["alive_queued"].status == JOB_QUEUED
+    for job_id in ("dead", "reused_pid", "no_owner"):
+        assert stored[job_id].status == JOB_FAILED
+        assert stored[job_id].error == "restart"
+
+
+def test_stop_fails_queued_jobs_and_discards_their_files():
+    discarded = []
+
+    async def scenario():
+        queue = JobQueue(InMemoryJobStore(ttl=3600), workers=1)
+        await queue.start()
+        started = asyncio.Event()
+
+        async def blocking(job, report):
+            started.set()
+            await asyncio.Event().wait()
+
+        running = await queue.submit("test", blocking, on_discard=lambda: discarded.append("running"))
+        queued = await queue.submit("test", blocking, on_discard=lambda: discarded.append("queued"))
+        await started.wait()
+        await queue.stop()
+        return running, queued
+
+    running, queued = asyncio.run(scenario())
+
+    assert running.status == JOB_FAILED and queued.status == JOB_FAILED
+    assert running.owner == process_owner()
+    assert sorted(discarded) == ["queued", "running"]
@@ -0,0 +1,81 @@
+"""POST /orders/submit: проверка входных данных и уведомление админу."""
+import os
+from html.parser import HTMLParser
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.models.outbox import OutboxMessage
+
+ORDER = {
+    "fio": "Иванов Иван",
+    "phone": "+7 999 123-45-67",
+    "email": "ivan@example.com",
+    "address": "Москва, ул. Тверская, 1",
+    "delivery_method": "delivery",
+    "payment_method": "card",
+    "total_price": 100000,
+    "items": [{"name": "iPhone 15", "price": 100000, "memory": "128 GB", "color": "Black"}],
+}
+
+
+@pytest.mark.parametrize("changes", [
+    {"fio": "И" * 201},
+    {"phone": "1" * 51},
+    {"payment_method": "x" * 51},
+    {"delivery_method": "courier"},
+    {"items": [{"name": "i" * 101, "price": 1}]},
+    {"items": [{"name": "iPhone", "price": 1, "color": "c" * 51}]},
+])
+def test_invalid_order_is_rejected_before_db(client, changes):
+    # Ограничения схемы совпадают с колонками: иначе Postgres ответит DataError (500)
+    response = client.post("/api/v1/orders/submit", json={**ORDER, **changes})
+    assert response.status_code == 422, response.text
+
+
+class TagCollector(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.open_tags = []
+        self.tags = set()
+        self.text = ""
+
+    def handle_starttag(self, tag, attrs):
+        self.tags.add(tag)
+        self.open_tags.append(tag)
+
+    def handle_endtag(self, tag):
+        assert self.open_tags.pop() == tag
+
+    def handle_data(self, data):
+        self.text += data
+
+
+def outbox_payloads():
+    sync_engine = create_engine(os.environ["DATABASE_URL"])
+    try:
+        with Session(sync_engine) as session:
+            return list(session.scalars(select(OutboxMessage.payload)))
+    finally:
+        sync_engine.dispose()
+
+
+def test_notification_escapes_customer_text(client):
+    fio = "Иван_Петров *VIP* [тест] <b>"
+    order = {**ORDER, "fio": fio, "comment": "код_домофона 12#", "items": [
+        {"name": "iPhone 15 <Pro>", "price": 1, "memory": "128_GB", "color": "Black"},
+    ]}
+    response = client.post("/api/v1/orders/submit", json=order)
+    assert response.status_code == 201, response.text
+    order_id = response.json()["order_id"]
+
+    payload = next(p for p in outbox_payloads() if f"(ID: {order_id})" in p["text"])
+    # Markdown с "_" или "[" в ФИО Telegram отклоняет (400) — уведомление терялось
+    assert payload["parse_mode"] == "HTML"
+    parser = TagCollector()
+    parser.feed(payload["text"])
+    parser.close()
+    assert parser.tags <= {"b", "code"} and not parser.open_tags
+    assert f"Клиент: {fio}" in parser.text
+    assert "iPhone 15 <Pro> (128_GB, Black)" in parser.text
@@ -0,0 +1,38 @@
+"""Разбор прайс-листа: повторы ID и нечисловые цены."""
+from app.core.price_list_io import PriceImportStats, next_price_chunk
+
+
+def test_duplicate_ids_are_counted_once_and_reported():
+    rows = iter([
+        (1, "iPhone", None, None, "10"),
+        (1, "iPhone", None, None, "20"),
+        (2, "iPad", None, None, "7"),
+    ])
+    stats = PriceImportStats()
+
+    chunk = next_price_chunk(rows, 100, {1: 5.0, 2: 7.0}, stats)
+
+    assert chunk == [{"id": 1, "price": 10.0, "old_price": 5.0}]
+    assert stats.counts() == {"processed": 3, "changed": 1, "unchanged": 1, "unknown": 0, "invalid": 1}
+    assert "повторяется" in stats.errors[0]
+
+
+def test_duplicate_ids_across_chunks():
+    rows = iter([(1, "iPhone", None, None, "10"), (1, "iPhone", None, None, "20")])
+    stats = PriceImportStats()
+
+    assert next_price_chunk(rows, 1, {1: 5.0}, stats) == [{"id": 1, "price": 10.0, "old_price": 5.0}]
+    assert next_price_chunk(rows, 1, {1: 5.0}, stats) == []
+    assert stats.changed == 1 and stats.invalid == 1
+
+
+def test_nan_and_inf_prices_are_invalid():
+    rows = iter([
+        (1, "iPhone", None, None, "nan"),
+        (2, "iPad", None, None, "inf"),
+        (3, "Watch", None, None, float("-inf")),
+    ])
+    stats = PriceImportStats()
+
+    assert next_price_chunk(rows, 100, {1: 5.0, 2: 5.0, 3: 5.0}, stats) == []
+    assert stats.invalid == 3 and stats.changed == 0
@@ -0,0 +1,118 @@
+"""
+S3ImageStorage против moto (локальный S3-сервер): запись, проверка наличия,
+presigned POST и завершение прямой загрузки через API.
+"""
+import asyncio
+import hashlib
+import io
+import socket
+
+import httpx
+import pytest
+from PIL import Image
+
+from tests.conftest import ADMIN_HEADERS
+
+moto_server = pytest.importorskip("moto.server")
+pytest.importorskip("boto3")
+
+from app.api.v1.endpoints import uploads
+from app.core import image_uploads, images
+from app.core import storage as storage_module
+from app.core.images import content_path
+from app.core.storage import S3ImageStorage
+from app.crud import item as item_crud
+
+BUCKET = "images"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _jpeg() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (400, 300), (10, 120, 200)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope="module")
+def s3_endpoint():
+    port = _free_port()
+    server = moto_server.ThreadedMotoServer(port=port, verbose=False)
+    server.start()
+    yield f"http://127.0.0.1:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def s3_storage(s3_endpoint, monkeypatch):
+    s3 = S3ImageStorage(
+        bucket=BUCKET,
+        endpoint_url=s3_endpoint,
+        region="us-east-1",
+        access_key_id="test",
+        secret_access_key="test",
+        public_url=None,
+        multipart_chunk_size=5 * 1024 * 1024,
+        presign_expires=300,
+    )
+    s3.client.create_bucket(Bucket=BUCKET)
+    # Модули берут хранилище при импорте — подменяем во всех
+    for module in (storage_module, uploads, image_uploads, images, item_crud):
+        monkeypatch.setattr(module, "storage", s3)
+    yield s3
+    for obj in s3.client.list_objects_v2(Bucket=BUCKET).get("Contents", []):
+        s3.client.delete_object(Bucket=BUCKET, Key=obj["Key"])
+    s3.client.delete_bucket(Bucket=BUCKET)
+
+
+def test_put_exists_and_get(s3_storage):
+    async def scenario():
+        key = "ab/cd/test.jpg"
+        assert not await s3_storage.exists(key)
+        await s3_storage.put_bytes(key, b"data")
+        return await s3_storage.exists(key), await s3_storage.get_bytes(key)
+
+    assert asyncio.run(scenario()) == (True, b"data")
+    head = s3_storage.client.head_object(Bucket=BUCKET, Key="ab/cd/test.jpg")
+    assert head["ContentType"] == "image/jpeg"
+
+
+def test_presign_and_complete_direct_upload(client, s3_storage):
+    data = _jpeg()
+
+    response = client.post("/api/v1/upload/images/presign/", json={"filename": "photo.jpg"}, headers=ADMIN_HEADERS)
+    assert response.status_code == 200, response.text
+    upload = response.json()
+    assert upload["key"].startswith("incoming/")
+
+    uploaded = httpx.post(upload["url"], data=upload["fields"], files={"file": ("photo.jpg", data, "image/jpeg")})
+    assert uploaded.status_code in (200, 201, 204), uploaded.text
+
+    response = client.post("/api/v1/upload/images/complete/", json={"keys": [upload["key"]]}, headers=ADMIN_HEADERS)
+    assert response.status_code == 201, response.text
+    image = response.json()[0]
+    assert (image["width"], image["height"]) == (400, 300)
+    assert image["variants"]
+
+    key = content_path(hashlib.sha256(data).hexdigest(), ".jpg")
+    keys = {obj["Key"] for obj in s3_storage.client.list_objects_v2(Bucket=BUCKET)["Contents"]}
+    assert key in keys
+    assert not any(k.startswith("incoming/") for k in keys)
+
+
+def test_complete_rejects_non_image(client, s3_storage):
+    response = client.post("/api/v1/upload/images/presign/", json={"filename": "evil.jpg"}, headers=ADMIN_HEADERS)
+    upload = response.json()
+    httpx.post(upload["url"], data=upload["fields"], files={"file": ("evil.jpg", b"not an image" * 10, "image/jpeg")})
+
+    response = client.post("/api/v1/upload/images/complete/", json={"keys": [upload["key"]]}, headers=ADMIN_HEADERS)
+    assert response.status_code == 415
+
+
+def test_direct_upload_requires_admin_token(client, s3_storage):
+    assert client.post("/api/v1/upload/images/presign/", json={"filename": "photo.jpg"}).status_code == 403
+    assert client.post("/api/v1/upload/images/complete/", json={"keys": ["incoming/x.jpg"]}).status_code == 403
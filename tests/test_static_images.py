@@ -0,0 +1,83 @@
+"""Раздача /static/images/: ETag, выбор формата по Accept и служебные файлы."""
+import hashlib
+import io
+import json
+import os
+
+from PIL import Image
+
+from app.core import static_files
+from app.core.images import content_path, manifest_key, process_image
+from app.core.storage import UPLOAD_FOLDER
+
+DIGEST = "ab" * 32
+
+
+def put_file(relative_path: str, data: bytes) -> str:
+    path = os.path.join(UPLOAD_FOLDER, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(data)
+    return relative_path
+
+
+def test_etag_differs_between_formats_of_same_variant(client):
+    webp = put_file(f"ab/ab/{DIGEST}_320w.webp", b"webp bytes")
+    avif = put_file(f"ab/ab/{DIGEST}_320w.avif", b"avif bytes")
+
+    webp_response = client.get(f"/static/images/{webp}")
+    avif_response = client.get(f"/static/images/{avif}")
+
+    assert webp_response.status_code == avif_response.status_code == 200
+    assert webp_response.headers["etag"] != avif_response.headers["etag"]
+    # Чужой ETag не дает 304
+    response = client.get(f"/static/images/{avif}", headers={"If-None-Match": webp_response.headers["etag"]})
+    assert response.status_code == 200
+
+
+def test_tmp_folder_and_manifests_are_not_served(client):
+    manifest = put_file(f"ab/ab/{DIGEST}.json", b"{}")
+    partial = put_file("tmp/upload.part", b"partial upload")
+
+    for path in (manifest, partial, "tmp/../tmp/upload.part", "TMP/../tmp/upload.part"):
+        assert client.get(f"/static/images/{path}").status_code == 404, path
+
+
+def test_wide_original_is_negotiated_to_full_size_webp(client):
+    buffer = io.BytesIO()
+    Image.new("RGB", (2000, 1000), (200, 30, 30)).save(buffer, "JPEG")
+    data = buffer.getvalue()
+    original = put_file(content_path(hashlib.sha256(data).hexdigest(), ".jpg"), data)
+    manifest = process_image(os.path.join(UPLOAD_FOLDER, original), original, UPLOAD_FOLDER)
+    put_file(manifest_key(original), json.dumps(manifest).encode())
+
+    assert 2000 in {variant["width"] for variant in manifest["variants"]}
+    response = client.get(f"/static/images/{original}", headers={"Accept": "image/webp,*/*"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    assert "Accept" in response.headers["vary"]
+    assert Image.open(io.BytesIO(response.content)).size == (2000, 1000)
+
+    response = client.get(f"/static/images/{original}", headers={"Accept": "image/jpeg"})
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.content == data
+
+
+def test_missing_manifest_is_cached_and_variants_skip_disk(client, monkeypatch):
+    reads = []
+    read_local_manifest = static_files.read_local_manifest
+    monkeypatch.setattr(static_files, "read_local_manifest", lambda path: reads.append(path) or read_local_manifest(path))
+    original = put_file(f"cd/cd/{'cd' * 32}.jpg", b"jpeg bytes")
+    variant = put_file(f"cd/cd/{'cd' * 32}_320w.webp", b"webp bytes")
+
+    for _ in range(3):
+        assert client.get(f"/static/images/{original}").status_code == 200
+        assert client.get(f"/static/images/{variant}").status_code == 200
+    assert reads == [original]
+
+    # Отсутствие манифеста помнится недолго: обработка могла его дописать
+    monkeypatch.setattr(static_files, "MISSING_MANIFEST_TTL", 0.0)
+    static_files._full_size_variants.clear()
+    client.get(f"/static/images/{original}")
+    client.get(f"/static/images/{original}")
+    assert reads == [original] * 3